@@ -0,0 +1,82 @@
+import json
+import threading
+from collections import deque
+
+class BrokerEmMemoria:
+    """
+    Substituto em memória do RabbitMQ para testes e benchmarks.
+
+    Expõe a mesma interface de publicação do RabbitMQPublisher (`publicar` e
+    `publicar_lote`) e entrega as mensagens a um ConsumidorSentimentos
+    respeitando o prefetch, como o broker real.
+    """
+    def __init__(self, prefetch: int = 10):
+        self.__prefetch = prefetch
+        self.__fila = deque()
+        self.__sem_ack = {}
+        self.__proxima_tag = 1
+        self.__lock = threading.Condition()
+        self.confirmadas = 0
+        self.rejeitadas = []
+
+    def publicar(self, body, routing_key: str | None = None):
+        self.publicar_lote([body], routing_key)
+
+    def publicar_lote(self, bodies: list, routing_key: str | None = None):
+        with self.__lock:
+            self.__fila.extend((json.dumps(body).encode(), False) for body in bodies)
+
+    def aquecer(self):
+        pass
+
+    def fechar(self, timeout: float = 10.0):
+        pass
+
+    def pendentes(self) -> int:
+        with self.__lock:
+            return len(self.__fila) + len(self.__sem_ack)
+
+    def __ack(self, tag):
+        with self.__lock:
+            self.__sem_ack.pop(tag)
+            self.confirmadas += 1
+            self.__lock.notify_all()
+
+    def __nack(self, tag, requeue: bool):
+        with self.__lock:
+            body, redelivered = self.__sem_ack.pop(tag)
+            if requeue and not redelivered:
+                self.__fila.appendleft((body, True))
+            else:
+                self.rejeitadas.append(body)
+            self.__lock.notify_all()
+
+    def entregar(self, consumidor, timeout: float = 5.0):
+        """
+        Entrega as mensagens ao consumidor até a fila esvaziar e todas terem ack/nack.
+        """
+        while True:
+            with self.__lock:
+                if not self.__fila and not self.__sem_ack:
+                    return
+                entregas = []
+                while self.__fila and len(self.__sem_ack) < self.__prefetch:
+                    tag = self.__proxima_tag
+                    self.__proxima_tag += 1
+                    self.__sem_ack[tag] = self.__fila.popleft()
+                    entregas.append((tag, self.__sem_ack[tag][0]))
+
+            for tag, body in entregas:
+                consumidor.receber(
+                    body,
+                    ack=lambda tag=tag: self.__ack(tag),
+                    nack=lambda requeue, tag=tag: self.__nack(tag, requeue)
+                )
+
+            consumidor.verificar_tempo()
+            with self.__lock:
+                pronto = lambda: not self.__sem_ack or (self.__fila and len(self.__sem_ack) < self.__prefetch)
+                if not self.__lock.wait_for(pronto, timeout=0.01):
+                    timeout -= 0.01
+                    if timeout <= 0:
+                        raise TimeoutError("Mensagens sem ack após o tempo limite")
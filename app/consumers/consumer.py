@@ -0,0 +1,260 @@
+import pika
+import json
+import threading
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from os import getenv
+from dotenv import load_dotenv
+from ..producers.producer import (
+    RABBITMQ_EXCHANGE,
+    RABBITMQ_HEARTBEAT,
+    RABBITMQ_HOST,
+    RABBITMQ_PASSWORD,
+    RABBITMQ_PORT,
+    RABBITMQ_ROUTING_KEY,
+    RABBITMQ_USERNAME,
+)
+
+load_dotenv()
+
+RABBITMQ_QUEUE = getenv("RABBITMQ_QUEUE", "sentimentos")
+# Quantidade de mensagens entregues ao consumer sem ack
+RABBITMQ_PREFETCH = int(getenv("RABBITMQ_PREFETCH", "10"))
+# Quantidade de chamadas de inferência executadas em paralelo
+CONSUMER_CONCORRENCIA = int(getenv("CONSUMER_CONCORRENCIA", "2"))
+# Um micro-lote é enviado ao modelo ao atingir o tamanho ou o tempo de espera máximo
+MICROLOTE_TAMANHO = int(getenv("MICROLOTE_TAMANHO", "32"))
+MICROLOTE_ESPERA_MS = int(getenv("MICROLOTE_ESPERA_MS", "50"))
+CALLBACK_URL = getenv("CALLBACK_URL", "http://localhost:8000/sentimento/recebido")
+# "http" chama o serviço de análise remoto; "local" roda o classificador no próprio processo
+INFERENCIA_BACKEND = getenv("INFERENCIA_BACKEND", "http")
+
+class _Mensagem:
+    """
+    Uma mensagem do broker e quantas de suas ações ainda não foram processadas.
+    """
+    def __init__(self, ack, nack, pendentes: int):
+        self.ack = ack
+        self.nack = nack
+        self.pendentes = pendentes
+        self.falhou = False
+
+
+class ConsumidorSentimentos:
+    """
+    Agrupa as ações recebidas em micro-lotes e faz uma chamada de inferência por lote.
+
+    Independe do broker: o adaptador entrega cada mensagem em `receber` junto
+    com as funções de ack/nack e chama `verificar_tempo` periodicamente.
+    Uma mensagem só recebe ack depois que todas as suas ações foram inferidas
+    e persistidas; se qualquer uma falhar, a mensagem recebe nack.
+
+    Args:
+        inferir: Recebe uma lista de textos e retorna um resultado por texto.
+        persistir: Recebe a lista de ações e a lista de resultados correspondente.
+    """
+    def __init__(
+        self,
+        inferir,
+        persistir,
+        tamanho_lote: int = MICROLOTE_TAMANHO,
+        espera_max: float = MICROLOTE_ESPERA_MS / 1000,
+        concorrencia: int = CONSUMER_CONCORRENCIA,
+    ):
+        self.__inferir = inferir
+        self.__persistir = persistir
+        self.__tamanho_lote = tamanho_lote
+        self.__espera_max = espera_max
+        self.__executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="inferencia")
+        self.__lock = threading.Lock()
+        self.__acoes = []
+        self.__mensagens = []
+        self.__inicio_lote = None
+
+    def receber(self, body: bytes, ack, nack):
+        try:
+            dados = json.loads(body)
+        except json.JSONDecodeError as e:
+            print(f"Mensagem inválida descartada: {repr(e)}")
+            nack(requeue=False)
+            return
+
+        # O endpoint de lote publica listas de ações; o endpoint unitário, uma ação
+        acoes = dados if isinstance(dados, list) else [dados]
+        acoes = [acao for acao in acoes if isinstance(acao, dict) and acao.get("descricao")]
+        if not acoes:
+            ack()
+            return
+
+        mensagem = _Mensagem(ack, nack, len(acoes))
+        with self.__lock:
+            if not self.__acoes:
+                self.__inicio_lote = time.monotonic()
+            self.__acoes.extend(acoes)
+            self.__mensagens.extend([mensagem] * len(acoes))
+            lotes = self.__retirar_lotes(todos=False)
+
+        for lote in lotes:
+            self.__executor.submit(self.__processar, *lote)
+
+    def verificar_tempo(self):
+        """
+        Envia o micro-lote pendente se ele já esperou o tempo máximo.
+        """
+        with self.__lock:
+            if not self.__acoes or time.monotonic() - self.__inicio_lote < self.__espera_max:
+                return
+            lotes = self.__retirar_lotes(todos=True)
+
+        for lote in lotes:
+            self.__executor.submit(self.__processar, *lote)
+
+    def __retirar_lotes(self, todos: bool) -> list:
+        lotes = []
+        while len(self.__acoes) >= self.__tamanho_lote or (todos and self.__acoes):
+            lotes.append((self.__acoes[:self.__tamanho_lote], self.__mensagens[:self.__tamanho_lote]))
+            del self.__acoes[:self.__tamanho_lote]
+            del self.__mensagens[:self.__tamanho_lote]
+        if self.__acoes:
+            self.__inicio_lote = time.monotonic()
+        return lotes
+
+    def __processar(self, acoes: list, mensagens: list):
+        try:
+            resultados = self.__inferir([acao["descricao"] for acao in acoes])
+            self.__persistir(acoes, resultados)
+            falhou = False
+        except Exception as e:
+            print(f"Erro ao processar micro-lote de {len(acoes)} ações: {repr(e)}")
+            falhou = True
+
+        concluidas = []
+        with self.__lock:
+            for mensagem in mensagens:
+                mensagem.falhou = mensagem.falhou or falhou
+                mensagem.pendentes -= 1
+                if mensagem.pendentes == 0:
+                    concluidas.append(mensagem)
+
+        for mensagem in concluidas:
+            if mensagem.falhou:
+                mensagem.nack(requeue=True)
+            else:
+                mensagem.ack()
+
+    def fechar(self):
+        """
+        Processa o micro-lote pendente e aguarda os lotes em andamento.
+        """
+        with self.__lock:
+            lotes = self.__retirar_lotes(todos=True)
+        for lote in lotes:
+            self.__executor.submit(self.__processar, *lote)
+        self.__executor.shutdown(wait=True)
+
+
+class PersistenciaCallback:
+    """
+    Persiste os resultados do micro-lote em uma única chamada ao endpoint
+    /sentimento/recebido, que os grava juntos no mesmo flush.
+    """
+    def __init__(self, url: str = CALLBACK_URL, transport=None):
+        self.__client = httpx.Client(timeout=10, transport=transport)
+        self.__url = url
+
+    def __call__(self, acoes: list, resultados: list):
+        resposta = self.__client.post(self.__url, json=[
+            {"acao_id": acao.get("acao_id"), "texto": acao["descricao"], "resultado": resultado}
+            for acao, resultado in zip(acoes, resultados)
+        ])
+        resposta.raise_for_status()
+
+    def close(self):
+        self.__client.close()
+
+
+class RabbitMQConsumer:
+    """
+    Adaptador pika: consome a fila ligada ao exchange `datas_exchanges` e
+    entrega as mensagens ao ConsumidorSentimentos.
+
+    O pika não é thread-safe, então os acks feitos pelas threads de inferência
+    são agendados na thread da conexão com add_callback_threadsafe.
+    """
+    def __init__(self, consumidor: ConsumidorSentimentos, prefetch: int = RABBITMQ_PREFETCH):
+        self.__consumidor = consumidor
+        self.__prefetch = prefetch
+        self.__parar = threading.Event()
+
+    def __on_message(self, connection, channel, method, properties, body):
+        def ack():
+            connection.add_callback_threadsafe(partial(channel.basic_ack, method.delivery_tag))
+
+        def nack(requeue: bool):
+            # Mensagens que já falharam uma vez não voltam para a fila (vão para a DLQ, se configurada)
+            requeue = requeue and not method.redelivered
+            connection.add_callback_threadsafe(partial(channel.basic_nack, method.delivery_tag, requeue=requeue))
+
+        self.__consumidor.receber(body, ack, nack)
+
+    def executar(self):
+        connection = pika.BlockingConnection(pika.ConnectionParameters(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            heartbeat=RABBITMQ_HEARTBEAT,
+            credentials=pika.PlainCredentials(
+                username=RABBITMQ_USERNAME,
+                password=RABBITMQ_PASSWORD
+            )
+        ))
+        channel = connection.channel()
+        channel.exchange_declare(exchange=RABBITMQ_EXCHANGE, exchange_type="direct", durable=True)
+        channel.queue_declare(queue=RABBITMQ_QUEUE, durable=True)
+        channel.queue_bind(queue=RABBITMQ_QUEUE, exchange=RABBITMQ_EXCHANGE, routing_key=RABBITMQ_ROUTING_KEY)
+        channel.basic_qos(prefetch_count=self.__prefetch)
+        channel.basic_consume(
+            queue=RABBITMQ_QUEUE,
+            on_message_callback=partial(self.__on_message, connection)
+        )
+
+        try:
+            while not self.__parar.is_set():
+                connection.process_data_events(time_limit=MICROLOTE_ESPERA_MS / 2000)
+                self.__consumidor.verificar_tempo()
+        finally:
+            self.__consumidor.fechar()
+            # Envia os acks agendados pelas últimas threads de inferência
+            connection.process_data_events(time_limit=0)
+            connection.close()
+
+    def parar(self):
+        self.__parar.set()
+
+
+def criar_inferencia():
+    from ..services import cache_inferencia
+
+    if INFERENCIA_BACKEND == "local":
+        from ..services.inferencia_local import MotorInferencia, carregar_modelo
+        modelo = carregar_modelo()
+        inferir, versao = MotorInferencia(modelo), modelo.nome
+    else:
+        from ..services.inferencia import ClienteInferencia
+        inferir, versao = ClienteInferencia(), None
+
+    if not cache_inferencia.INFERENCIA_CACHE:
+        return inferir
+    disco = None
+    if cache_inferencia.INFERENCIA_CACHE_ARQUIVO:
+        disco = cache_inferencia.SqliteCacheBackend(cache_inferencia.INFERENCIA_CACHE_ARQUIVO)
+    return cache_inferencia.CacheInferencia(inferir, modelo=versao, disco=disco)
+
+
+if __name__ == "__main__":
+    consumer = RabbitMQConsumer(ConsumidorSentimentos(criar_inferencia(), PersistenciaCallback()))
+    try:
+        consumer.executar()
+    except KeyboardInterrupt:
+        consumer.parar()
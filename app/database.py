@@ -1,25 +1,247 @@
+import asyncio
 import os
-from sqlalchemy import create_engine
+import sqlite3
+import time
+from fastapi import Header
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from .services import metricas
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-print(f"DATABASE_URL em database.py: {DATABASE_URL}")
-
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL environment variable is not set!")
 
-engine = create_engine(DATABASE_URL)
+# Configuração do pool de conexões (não se aplica ao SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Réplicas de leitura: URLs (no formato da DATABASE_URL) separadas por vírgula
+DATABASE_READ_URLS = [url.strip() for url in os.getenv("DATABASE_READ_URLS", "").split(",") if url.strip()]
+# "replica": as leituras vão para as réplicas, tolerando o atraso de replicação;
+# "primario": todas as leituras vão para o primário (o header X-Leitura sobrescreve)
+DB_LEITURA = os.getenv("DB_LEITURA", "replica")
+# Intervalo entre as verificações de cada réplica e atraso máximo aceito (PostgreSQL)
+DB_REPLICA_VERIFICACAO_S = float(os.getenv("DB_REPLICA_VERIFICACAO_S", "5"))
+DB_REPLICA_MAX_ATRASO_S = float(os.getenv("DB_REPLICA_MAX_ATRASO_S", "30"))
+DB_REPLICA_TIMEOUT_S = float(os.getenv("DB_REPLICA_TIMEOUT_S", "2"))
+
+# Driver assíncrono usado para cada driver síncrono da DATABASE_URL
+DRIVERS_ASSINCRONOS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+class _MedirEsperaCheckout:
+    """
+    Mede em metricas.pool_espera_segundos o tempo para obter uma conexão do pool.
+    """
+    nome_pool = ""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metricas.pool_espera_segundos.observar(time.perf_counter() - inicio, self.nome_pool)
+
+class QueuePoolInstrumentado(_MedirEsperaCheckout, QueuePool):
+    nome_pool = "sync"
+
+class AsyncQueuePoolInstrumentado(_MedirEsperaCheckout, AsyncAdaptedQueuePool):
+    nome_pool = "async"
+
+def opcoes_pool(url: str, poolclass=QueuePoolInstrumentado) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def url_assincrona(url: str) -> str:
+    """
+    Converte a URL síncrona (ex.: postgresql://) para o driver assíncrono equivalente.
+    """
+    url = make_url(url)
+    return url.set(drivername=DRIVERS_ASSINCRONOS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or url_assincrona(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, **opcoes_pool(DATABASE_URL))
+metricas.instrumentar_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **opcoes_pool(ASYNC_DATABASE_URL, AsyncQueuePoolInstrumentado))
+metricas.instrumentar_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+class ReplicaLeitura:
+    """
+    Uma réplica de leitura, com engine assíncrona própria e o resultado da última verificação.
+    """
+    def __init__(self, url: str):
+        self.nome = make_url(url).render_as_string(hide_password=True)
+        self.__sqlite = make_url(url).database if make_url(url).get_backend_name() == "sqlite" else None
+        url_async = url_assincrona(url)
+        self.engine = create_async_engine(url_async, **opcoes_pool(url_async, AsyncQueuePoolInstrumentado))
+        metricas.instrumentar_engine(self.engine.sync_engine)
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        self.saudavel = False
+        # Atraso de replicação medido na última verificação bem-sucedida, em segundos
+        self.atraso = None
+        self.verificado_em = None
+        self.verificando = False
+
+    def __verificar_sqlite(self):
+        # mode=rw: um arquivo ausente é uma réplica indisponível, não um banco novo vazio
+        conexao = sqlite3.connect(f"file:{self.__sqlite}?mode=rw", uri=True)
+        try:
+            conexao.execute("SELECT 1")
+        finally:
+            conexao.close()
+
+    async def __atraso(self) -> float:
+        if self.__sqlite:
+            # O aiosqlite deixa a thread da conexão viva quando o arquivo não abre,
+            # então réplicas SQLite (uso local) são verificadas com o sqlite3 direto
+            await asyncio.to_thread(self.__verificar_sqlite)
+            return 0.0
+        async with self.engine.connect() as conexao:
+            if self.engine.dialect.name != "postgresql":
+                await conexao.execute(text("SELECT 1"))
+                return 0.0
+            # NULL fora de uma réplica em recuperação (ex.: apontando para o próprio primário)
+            atraso = await conexao.execute(text(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            ))
+            return float(atraso.scalar())
+
+    async def verificar(self):
+        """
+        Marca a réplica como saudável se responder dentro do timeout e com atraso aceitável.
+        """
+        self.verificando = True
+        try:
+            atraso = await asyncio.wait_for(self.__atraso(), timeout=DB_REPLICA_TIMEOUT_S)
+            saudavel = atraso <= DB_REPLICA_MAX_ATRASO_S
+            self.atraso = atraso
+            if not saudavel and self.saudavel:
+                print(f"Réplica {self.nome} com {atraso:.1f}s de atraso, fora do rodízio")
+        except Exception as e:
+            saudavel = False
+            # Descarta as conexões da réplica (e a thread do driver de uma conexão que falhou ao abrir)
+            await self.engine.dispose()
+            if self.saudavel or self.verificado_em is None:
+                print(f"Réplica {self.nome} indisponível: {repr(e)}")
+        self.saudavel = saudavel
+        self.verificado_em = time.monotonic()
+        self.verificando = False
+
+
+class RoteadorLeitura:
+    """
+    Distribui as sessões de leitura entre as réplicas saudáveis em rodízio.
+
+    Cada réplica é verificada a cada DB_REPLICA_VERIFICACAO_S segundos em
+    segundo plano, sem atrasar as requisições (só a primeira verificação é
+    aguardada). Sem réplicas saudáveis, ou com leitura forçada no primário,
+    usa a sessão do primário.
+    """
+    def __init__(self, urls: list[str]):
+        self.__replicas = [ReplicaLeitura(url) for url in urls]
+        self.__proxima = 0
+        self.__tarefas = set()
+
+    async def verificar_todas(self):
+        await asyncio.gather(*(replica.verificar() for replica in self.__replicas))
+
+    def __agendar(self, replica: ReplicaLeitura):
+        replica.verificando = True
+        tarefa = asyncio.create_task(replica.verificar())
+        self.__tarefas.add(tarefa)
+        tarefa.add_done_callback(self.__tarefas.discard)
+
+    async def sessionmaker(self, forcar_primario: bool = False):
+        """
+        Retorna a fábrica de sessões a usar na próxima leitura.
+        """
+        if forcar_primario or not self.__replicas:
+            return AsyncSessionLocal
+
+        agora = time.monotonic()
+        for replica in self.__replicas:
+            if replica.verificado_em is None and not replica.verificando:
+                await replica.verificar()
+            elif not replica.verificando and agora - replica.verificado_em >= DB_REPLICA_VERIFICACAO_S:
+                self.__agendar(replica)
+
+        saudaveis = [replica for replica in self.__replicas if replica.saudavel]
+        if not saudaveis:
+            return AsyncSessionLocal
+        replica = saudaveis[self.__proxima % len(saudaveis)]
+        self.__proxima += 1
+        return replica.sessionmaker
+
+    def atraso(self) -> float:
+        """
+        Maior atraso medido entre as réplicas saudáveis; DB_REPLICA_MAX_ATRASO_S enquanto nenhuma foi medida.
+        """
+        atrasos = [replica.atraso for replica in self.__replicas if replica.saudavel and replica.atraso is not None]
+        return max(atrasos) if atrasos else DB_REPLICA_MAX_ATRASO_S
+
+    def estado(self) -> dict:
+        return {replica.nome: "ok" if replica.saudavel else "indisponivel" for replica in self.__replicas}
+
+    async def fechar(self):
+        for replica in self.__replicas:
+            await replica.engine.dispose()
+
+
+roteador_leitura = RoteadorLeitura(DATABASE_READ_URLS)
+
+async def sessao_leitura(forcar_primario: bool | None = None):
+    """
+    Fábrica de sessões para leituras, conforme DB_LEITURA (ou `forcar_primario`, se informado).
+    """
+    if forcar_primario is None:
+        forcar_primario = DB_LEITURA == "primario"
+    return await roteador_leitura.sessionmaker(forcar_primario)
+
+async def get_read_db(leitura: str | None = Header(None, alias="X-Leitura", pattern="^(replica|primario)$")):
+    """
+    Sessão para endpoints somente leitura, em uma réplica ou no primário.
+
+    O header X-Leitura: primario força a leitura no primário (ex.: para ler
+    logo depois de uma gravação); X-Leitura: replica aceita o atraso das réplicas.
+    """
+    fabrica = await sessao_leitura(None if leitura is None else leitura == "primario")
+    async with fabrica() as db:
+        yield db
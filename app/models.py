@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, DECIMAL
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, TIMESTAMP, DECIMAL, Index, func
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -42,15 +42,16 @@ class Acao(Base):
     __tablename__ = "cs_acoes"
     
     acao_id = Column(Integer, primary_key=True, index=True)
-    event_id = Column(Integer, ForeignKey("cs_events.event_id"), nullable=False)
+    event_id = Column(Integer, ForeignKey("cs_events.event_id"), nullable=False, index=True)
     descricao = Column(Text, nullable=False)
-    agent_id = Column(Integer, ForeignKey("cs_agents.agent_id"))
-    user_id = Column(Integer, ForeignKey("cs_user.user_id"))
+    agent_id = Column(Integer, ForeignKey("cs_agents.agent_id"), index=True)
+    user_id = Column(Integer, ForeignKey("cs_user.user_id"), index=True)
     data_acao = Column(TIMESTAMP)
 
     event = relationship("Event", back_populates="acoes")
     agent = relationship("Agent", back_populates="acoes")
-    user = relationship("User", back_populates="acoes")
+    # Caminho completo: app.routers.create_user também declara uma classe User
+    user = relationship("app.models.User", back_populates="acoes")
     analises = relationship("AnaliseSentimento", back_populates="acao")
 
 
@@ -58,12 +59,78 @@ class AnaliseSentimento(Base):
     __tablename__ = "cs_analise_sentimento"
     
     analise_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    acao_id = Column(Integer, ForeignKey("cs_acoes.acao_id"), nullable=False)
+    acao_id = Column(Integer, ForeignKey("cs_acoes.acao_id"), nullable=False, index=True)
     sentimento = Column(String(50), nullable=False)
-    score = Column(DECIMAL(5,2))
+    score = Column(DECIMAL(5,2), index=True)
     modelo = Column(String(100))
-    data_analise = Column(TIMESTAMP)
+    data_analise = Column(TIMESTAMP, index=True)
 
     acao = relationship("Acao", back_populates="analises")
 
-
+    __table_args__ = (
+        # Busca case-insensitive por sentimento ordenada por score (get_sentimento_mais_negativo)
+        Index("ix_cs_analise_sentimento_lower_sentimento_score", func.lower(sentimento), score),
+    )
+
+
+class SentimentoRollup(Base):
+    """
+    Contagens pré-agregadas de cs_analise_sentimento, mantidas a cada gravação.
+
+    escopo "total" tem chave vazia; "agente" usa o agent_id e "dia" a data (AAAA-MM-DD)
+    da análise como chave. O score médio é soma_score / com_score (análises
+    sem score ficam fora da média, como no AVG da tabela).
+    """
+    __tablename__ = "cs_sentimento_rollup"
+
+    escopo = Column(String(20), primary_key=True)
+    chave = Column(String(50), primary_key=True)
+    sentimento = Column(String(50), primary_key=True)
+    quantidade = Column(Integer, nullable=False, default=0)
+    soma_score = Column(DECIMAL(14,2), nullable=False, default=0)
+    com_score = Column(Integer, nullable=False, default=0)
+
+
+
+class Scorecard(Base):
+    """
+    Resumo das análises de cada técnico (tipo "agente") e cliente (tipo "cliente"),
+    mantido a cada gravação.
+
+    positivo/neutro/negativo contam os sentimentos sem diferenciar maiúsculas;
+    outros rótulos entram apenas no total. O score médio é soma_score / com_score
+    (análises sem score ficam fora da média e do mínimo).
+    """
+    __tablename__ = "cs_scorecard"
+
+    tipo = Column(String(20), primary_key=True)
+    entidade_id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    positivo = Column(Integer, nullable=False, default=0)
+    neutro = Column(Integer, nullable=False, default=0)
+    negativo = Column(Integer, nullable=False, default=0)
+    soma_score = Column(DECIMAL(14,2), nullable=False, default=0)
+    com_score = Column(Integer, nullable=False, default=0)
+    score_minimo = Column(DECIMAL(5,2))
+    ultima_analise = Column(TIMESTAMP)
+
+
+class Outbox(Base):
+    """
+    Mensagens gravadas pelas requisições (RABBITMQ_PUBLISH_MODE=outbox) e
+    ainda não publicadas no RabbitMQ pelo RelayOutbox.
+
+    O índice único em acao_id descarta uma nova requisição da mesma ação
+    enquanto a anterior ainda não foi publicada.
+    """
+    __tablename__ = "cs_outbox"
+
+    outbox_id = Column(Integer, primary_key=True, autoincrement=True)
+    acao_id = Column(Integer, nullable=False)
+    routing_key = Column(String(100))
+    payload = Column(Text, nullable=False)
+    criado_em = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index("ix_cs_outbox_acao_id", acao_id, unique=True),
+    )
@@ -0,0 +1,228 @@
+import math
+import pika
+import threading
+from os import getenv
+from dotenv import load_dotenv
+from .producer import (
+    RABBITMQ_EXCHANGE,
+    RABBITMQ_HEARTBEAT,
+    RABBITMQ_HOST,
+    RABBITMQ_PASSWORD,
+    RABBITMQ_PORT,
+    RABBITMQ_PUBLISH_MODE,
+    RABBITMQ_ROUTING_KEY,
+    RABBITMQ_USERNAME,
+    get_publicador_background,
+)
+from . import outbox
+from ..consumers.consumer import RABBITMQ_QUEUE
+
+load_dotenv()
+
+ADMISSAO_ATIVA = getenv("ADMISSAO_ATIVA", "true").lower() == "true"
+# Backlog (mensagens na fila do broker + aguardando publicação) a partir do qual
+# o tráfego de baixa prioridade é desviado e a partir do qual tudo é recusado
+ADMISSAO_LIMITE_BAIXA_PRIORIDADE = int(getenv("ADMISSAO_LIMITE_BAIXA_PRIORIDADE", "50000"))
+ADMISSAO_LIMITE_REJEICAO = int(getenv("ADMISSAO_LIMITE_REJEICAO", "200000"))
+# Intervalo entre as leituras da profundidade das filas no broker
+ADMISSAO_INTERVALO_S = float(getenv("ADMISSAO_INTERVALO_S", "1"))
+# Tempo mínimo sugerido no Retry-After das requisições recusadas
+ADMISSAO_RETRY_AFTER = int(getenv("ADMISSAO_RETRY_AFTER", "5"))
+# Fila separada para o tráfego de baixa prioridade; com a routing key vazia,
+# o tráfego de baixa prioridade é recusado em vez de desviado
+RABBITMQ_QUEUE_BAIXA_PRIORIDADE = getenv("RABBITMQ_QUEUE_BAIXA_PRIORIDADE", "sentimentos_baixa_prioridade")
+RABBITMQ_ROUTING_KEY_BAIXA_PRIORIDADE = getenv("RABBITMQ_ROUTING_KEY_BAIXA_PRIORIDADE", "baixa_prioridade")
+
+PRIORIDADES = ("normal", "baixa")
+
+class AdmissaoRecusada(Exception):
+    """
+    O backlog está acima do limite; o cliente deve tentar novamente após `retry_after` segundos.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__(f"Backlog acima do limite, tente novamente em {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ProfundidadeFilas:
+    """
+    Lê a quantidade de mensagens prontas nas filas com queue_declare passivo.
+
+    Usa uma conexão própria, separada do pool de publicação. As filas são
+    declaradas (com os mesmos argumentos do consumer) na conexão, para que as
+    mensagens desviadas não sejam descartadas antes de um worker consumi-las.
+    """
+    def __init__(self, filas: dict[str, str]):
+        self.__filas = filas
+        self.__connection = None
+        self.__channel = None
+
+    def __conectar(self):
+        self.__connection = pika.BlockingConnection(pika.ConnectionParameters(
+            host=RABBITMQ_HOST,
+            port=RABBITMQ_PORT,
+            heartbeat=RABBITMQ_HEARTBEAT,
+            credentials=pika.PlainCredentials(
+                username=RABBITMQ_USERNAME,
+                password=RABBITMQ_PASSWORD
+            )
+        ))
+        self.__channel = self.__connection.channel()
+        self.__channel.exchange_declare(exchange=RABBITMQ_EXCHANGE, exchange_type="direct", durable=True)
+        for fila, routing_key in self.__filas.items():
+            self.__channel.queue_declare(queue=fila, durable=True)
+            self.__channel.queue_bind(queue=fila, exchange=RABBITMQ_EXCHANGE, routing_key=routing_key)
+
+    def ler(self) -> dict[str, int]:
+        try:
+            if self.__connection is None or self.__connection.is_closed or self.__channel.is_closed:
+                self.fechar()
+                self.__conectar()
+            return {
+                fila: self.__channel.queue_declare(queue=fila, passive=True).method.message_count
+                for fila in self.__filas
+            }
+        except Exception:
+            self.fechar()
+            raise
+
+    def fechar(self):
+        try:
+            if self.__connection is not None and self.__connection.is_open:
+                self.__connection.close()
+        except Exception:
+            pass
+        self.__connection = None
+
+
+class ControleAdmissao:
+    """
+    Decide se uma nova mensagem pode ser publicada, conforme o backlog atual.
+
+    Uma thread atualiza a profundidade das filas a cada `intervalo` segundos,
+    então `admitir` não faz I/O e pode ser chamado no event loop. O backlog
+    soma a fila do broker com as mensagens que ainda não foram publicadas.
+
+    Args:
+        ler_profundidades: Retorna a profundidade de cada fila (ex.: ProfundidadeFilas.ler).
+        pendentes_locais: Retorna as mensagens aguardando publicação neste processo, sem I/O.
+        ler_pendentes: Retorna as mensagens aguardando publicação que exigem I/O para
+            contar (ex.: outbox.pendentes); lido pela thread junto com as filas.
+    """
+    def __init__(
+        self,
+        ler_profundidades,
+        pendentes_locais,
+        ler_pendentes=None,
+        limite_baixa_prioridade: int = ADMISSAO_LIMITE_BAIXA_PRIORIDADE,
+        limite_rejeicao: int = ADMISSAO_LIMITE_REJEICAO,
+        routing_key_baixa_prioridade: str = RABBITMQ_ROUTING_KEY_BAIXA_PRIORIDADE,
+        intervalo: float = ADMISSAO_INTERVALO_S,
+    ):
+        self.__ler_profundidades = ler_profundidades
+        self.__pendentes_locais = pendentes_locais
+        self.__ler_pendentes = ler_pendentes
+        self.__pendentes = 0
+        self.__limite_baixa_prioridade = limite_baixa_prioridade
+        self.__limite_rejeicao = limite_rejeicao
+        self.__routing_key_baixa_prioridade = routing_key_baixa_prioridade
+        self.__intervalo = intervalo
+        self.__profundidades = {}
+        # Taxa de consumo observada (mensagens/s), usada para estimar o Retry-After
+        self.__taxa_consumo = 0.0
+        self.__parar = threading.Event()
+        self.__thread = threading.Thread(target=self.__executar, name="rabbitmq-admissao", daemon=True)
+        self.__thread.start()
+
+    def __executar(self):
+        while not self.__parar.is_set():
+            try:
+                profundidades = self.__ler_profundidades()
+                anterior = self.__profundidades.get(RABBITMQ_QUEUE)
+                atual = profundidades.get(RABBITMQ_QUEUE, 0)
+                if anterior is not None and atual < anterior:
+                    taxa = (anterior - atual) / self.__intervalo
+                    self.__taxa_consumo = 0.8 * self.__taxa_consumo + 0.2 * taxa
+                self.__profundidades = profundidades
+            except Exception as e:
+                # Mantém a última leitura; a publicação em si trata a indisponibilidade do broker
+                print(f"Erro ao ler a profundidade das filas: {repr(e)}")
+            if self.__ler_pendentes is not None:
+                try:
+                    self.__pendentes = self.__ler_pendentes()
+                except Exception as e:
+                    print(f"Erro ao ler as mensagens pendentes: {repr(e)}")
+            self.__parar.wait(self.__intervalo)
+
+    def backlog(self) -> int:
+        return self.__profundidades.get(RABBITMQ_QUEUE, 0) + self.__pendentes + self.__pendentes_locais()
+
+    def __recusar(self, backlog: int, limite: int):
+        excedente = backlog - limite + 1
+        retry_after = ADMISSAO_RETRY_AFTER
+        if self.__taxa_consumo > 0:
+            retry_after = max(retry_after, math.ceil(excedente / self.__taxa_consumo))
+        raise AdmissaoRecusada(min(retry_after, 300))
+
+    def admitir(self, prioridade: str = "normal") -> str | None:
+        """
+        Retorna a routing key a usar na publicação (None para a padrão).
+
+        Raises:
+            AdmissaoRecusada: Se o backlog estiver acima do limite para esta prioridade.
+        """
+        backlog = self.backlog()
+        if backlog >= self.__limite_rejeicao:
+            self.__recusar(backlog, self.__limite_rejeicao)
+
+        if prioridade == "baixa" and backlog >= self.__limite_baixa_prioridade:
+            if not self.__routing_key_baixa_prioridade:
+                self.__recusar(backlog, self.__limite_baixa_prioridade)
+            # A fila de baixa prioridade também é limitada
+            if self.__profundidades.get(RABBITMQ_QUEUE_BAIXA_PRIORIDADE, 0) >= self.__limite_rejeicao:
+                raise AdmissaoRecusada(ADMISSAO_RETRY_AFTER)
+            return self.__routing_key_baixa_prioridade
+        return None
+
+    def fechar(self):
+        self.__parar.set()
+        self.__thread.join(timeout=self.__intervalo + 1)
+
+
+_controle = None
+_profundidade = None
+_controle_lock = threading.Lock()
+
+def get_controle_admissao() -> ControleAdmissao | None:
+    """
+    Retorna o controle de admissão do processo, ou None se ADMISSAO_ATIVA for false.
+    """
+    global _controle, _profundidade
+    if not ADMISSAO_ATIVA:
+        return None
+    if _controle is None:
+        with _controle_lock:
+            if _controle is None:
+                filas = {RABBITMQ_QUEUE: RABBITMQ_ROUTING_KEY}
+                if RABBITMQ_ROUTING_KEY_BAIXA_PRIORIDADE:
+                    filas[RABBITMQ_QUEUE_BAIXA_PRIORIDADE] = RABBITMQ_ROUTING_KEY_BAIXA_PRIORIDADE
+                _profundidade = ProfundidadeFilas(filas)
+                ler_pendentes = None
+                if RABBITMQ_PUBLISH_MODE in ("sync", "outbox"):
+                    pendentes_locais = lambda: 0
+                else:
+                    pendentes_locais = lambda: get_publicador_background().pendentes()
+                if RABBITMQ_PUBLISH_MODE == "outbox":
+                    # COUNT no banco: lido pela thread, nunca no event loop
+                    ler_pendentes = outbox.pendentes
+                _controle = ControleAdmissao(_profundidade.ler, pendentes_locais, ler_pendentes)
+    return _controle
+
+def fechar_controle_admissao():
+    global _controle, _profundidade
+    with _controle_lock:
+        if _controle is not None:
+            _controle.fechar()
+            _profundidade.fechar()
+            _controle = None
+            _profundidade = None
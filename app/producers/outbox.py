@@ -0,0 +1,198 @@
+import json
+import threading
+from datetime import datetime
+from os import getenv
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import SessionLocal
+from .. import models
+from .producer import ACOES_POR_MENSAGEM, get_publisher
+
+load_dotenv()
+
+# Linhas de cs_outbox lidas e publicadas por iteração do relay
+OUTBOX_LOTE = int(getenv("OUTBOX_LOTE", "1000"))
+# Espera do relay quando o outbox está vazio (novas gravações no processo o acordam antes)
+OUTBOX_INTERVALO_MS = int(getenv("OUTBOX_INTERVALO_MS", "500"))
+# false quando o relay roda em um processo separado (python -m app.producers.outbox)
+OUTBOX_RELAY_NA_API = getenv("OUTBOX_RELAY_NA_API", "true").lower() == "true"
+
+async def gravar(db: AsyncSession, acoes: list[dict], routing_key: str | None = None):
+    """
+    Grava as ações em cs_outbox e faz o commit; a publicação fica com o RelayOutbox.
+
+    Ações repetidas (no lote ou ainda pendentes no outbox) são gravadas uma vez.
+
+    Args:
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
+        acoes (list[dict]): As ações já validadas e convertidas para JSON.
+        routing_key (str | None): A routing key definida pelo controle de admissão; None usa a padrão.
+    """
+    tabela = models.Outbox.__table__
+    agora = datetime.now()
+    valores = list({
+        acao["acao_id"]: {"acao_id": acao["acao_id"], "routing_key": routing_key, "payload": json.dumps(acao), "criado_em": agora}
+        for acao in acoes
+    }.values())
+
+    dialeto = db.get_bind().dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+        stmt = dialect_insert(tabela).on_conflict_do_nothing(index_elements=[tabela.c.acao_id])
+    else:
+        stmt = insert(tabela)
+
+    await db.execute(stmt, valores)
+    await db.commit()
+
+    if _relay is not None:
+        _relay.notificar()
+
+def pendentes(session_factory=SessionLocal) -> int:
+    """
+    Quantidade de mensagens no outbox aguardando publicação (de todos os processos).
+    """
+    db = session_factory()
+    try:
+        return db.execute(select(func.count()).select_from(models.Outbox)).scalar()
+    finally:
+        db.close()
+
+
+class RelayOutbox:
+    """
+    Thread que publica as mensagens de cs_outbox no RabbitMQ.
+
+    A cada iteração lê até OUTBOX_LOTE linhas em ordem de gravação, publica
+    as ações agrupadas em mensagens de ACOES_POR_MENSAGEM (uma única vez por
+    acao_id) e apaga as linhas na mesma transação, depois da confirmação do
+    broker. A entrega é at-least-once: se o processo cair entre a confirmação
+    e o commit, o lote é publicado de novo. Com o broker fora, as linhas
+    continuam no outbox e o relay tenta novamente com espera exponencial.
+
+    No PostgreSQL as linhas são lidas com FOR UPDATE SKIP LOCKED, então
+    vários relays (um por processo da API) não publicam a mesma linha.
+    """
+    def __init__(
+        self,
+        publisher,
+        session_factory=SessionLocal,
+        tamanho_lote: int = OUTBOX_LOTE,
+        intervalo: float = OUTBOX_INTERVALO_MS / 1000,
+    ):
+        self.__publisher = publisher
+        self.__session_factory = session_factory
+        self.__tamanho_lote = tamanho_lote
+        self.__intervalo = intervalo
+        self.__acordar = threading.Event()
+        self.__parar = threading.Event()
+        self.__thread = threading.Thread(target=self.__executar, name="outbox-relay", daemon=True)
+        self.__thread.start()
+
+    def notificar(self):
+        """
+        Acorda o relay logo após uma gravação, sem esperar o intervalo.
+        """
+        self.__acordar.set()
+
+    def drenar(self) -> int:
+        """
+        Publica e remove um lote do outbox.
+
+        Returns:
+            int: A quantidade de linhas removidas.
+        """
+        outbox = models.Outbox
+        db = self.__session_factory()
+        try:
+            consulta = select(outbox.outbox_id, outbox.acao_id, outbox.routing_key, outbox.payload) \
+                .order_by(outbox.outbox_id).limit(self.__tamanho_lote)
+            if db.get_bind().dialect.name == "postgresql":
+                consulta = consulta.with_for_update(skip_locked=True)
+            linhas = db.execute(consulta).all()
+            if not linhas:
+                db.rollback()
+                return 0
+
+            por_routing_key = {}
+            for _, acao_id, routing_key, payload in linhas:
+                por_routing_key.setdefault(routing_key, {})[acao_id] = payload
+
+            for routing_key, payloads in por_routing_key.items():
+                acoes = [json.loads(payload) for payload in payloads.values()]
+                bodies = [acoes[inicio:inicio + ACOES_POR_MENSAGEM] for inicio in range(0, len(acoes), ACOES_POR_MENSAGEM)]
+                self.__publisher.publicar_lote(bodies, routing_key)
+
+            db.execute(delete(outbox).where(outbox.outbox_id.in_([linha.outbox_id for linha in linhas])))
+            db.commit()
+            return len(linhas)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def __executar(self):
+        espera = 0.5
+        while not self.__parar.is_set():
+            self.__acordar.clear()
+            try:
+                removidas = self.drenar()
+                espera = 0.5
+            except Exception as e:
+                print(f"Erro ao publicar mensagens do outbox: {repr(e)}")
+                self.__parar.wait(espera)
+                espera = min(espera * 2, 30)
+                continue
+
+            # Lote incompleto: o outbox esvaziou, aguarda novas gravações
+            if removidas < self.__tamanho_lote:
+                self.__acordar.wait(self.__intervalo)
+
+    def fechar(self, timeout: float = 10.0):
+        """
+        Encerra a thread; as linhas não publicadas ficam no outbox para o próximo relay.
+        """
+        self.__parar.set()
+        self.__acordar.set()
+        self.__thread.join(timeout=timeout)
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+def get_relay_outbox() -> RelayOutbox:
+    """
+    Retorna o relay do processo, criando-o na primeira chamada.
+    """
+    global _relay
+    if _relay is None:
+        publisher = get_publisher()
+        with _relay_lock:
+            if _relay is None:
+                _relay = RelayOutbox(publisher)
+    return _relay
+
+def fechar_relay_outbox():
+    global _relay
+    with _relay_lock:
+        if _relay is not None:
+            _relay.fechar()
+            _relay = None
+
+
+if __name__ == "__main__":
+    # python -m app.producers.outbox (com OUTBOX_RELAY_NA_API=false na API)
+    from .producer import fechar_publisher
+
+    get_relay_outbox()
+    print("Relay do outbox em execução. Para sair, pressione CTRL+C")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fechar_relay_outbox()
+        fechar_publisher()
@@ -1,48 +1,387 @@
-import pika 
-import json 
+import pika
+import json
+import queue
+import threading
+import time
+from itertools import takewhile
+from os import getenv
+from dotenv import load_dotenv
+from pika.exceptions import AMQPChannelError, AMQPConnectionError, StreamLostError
+from ..services import metricas
+
+load_dotenv()
+
+RABBITMQ_HOST = getenv("RABBITMQ_HOST", "localhost")
+RABBITMQ_PORT = int(getenv("RABBITMQ_PORT", "5672"))
+RABBITMQ_USERNAME = getenv("RABBITMQ_USERNAME", "guest")
+RABBITMQ_PASSWORD = getenv("RABBITMQ_PASSWORD", "guest")
+RABBITMQ_EXCHANGE = getenv("RABBITMQ_EXCHANGE", "datas_exchanges")
+RABBITMQ_ROUTING_KEY = getenv("RABBITMQ_ROUTING_KEY", "minha_routing_key")
+RABBITMQ_HEARTBEAT = int(getenv("RABBITMQ_HEARTBEAT", "60"))
+# Quantidade de conexões (cada uma com seu canal) mantidas abertas pelo processo
+RABBITMQ_POOL_SIZE = int(getenv("RABBITMQ_POOL_SIZE", "4"))
+# Quantidade máxima de mensagens confirmadas pelo broker de uma só vez
+RABBITMQ_CONFIRM_BATCH_SIZE = int(getenv("RABBITMQ_CONFIRM_BATCH_SIZE", "100"))
+RABBITMQ_MAX_TENTATIVAS = int(getenv("RABBITMQ_MAX_TENTATIVAS", "3"))
+# Espera antes da primeira nova tentativa de publicação; dobra a cada tentativa
+RABBITMQ_ESPERA_TENTATIVA_MS = int(getenv("RABBITMQ_ESPERA_TENTATIVA_MS", "200"))
+# "thread": a requisição apenas entrega a mensagem a uma thread publicadora;
+# "sync": a requisição aguarda a confirmação do broker (fora do event loop);
+# "outbox": a requisição grava a mensagem em cs_outbox e o RelayOutbox a publica
+RABBITMQ_PUBLISH_MODE = getenv("RABBITMQ_PUBLISH_MODE", "thread")
+# Quantidade de ações agrupadas em uma única mensagem do broker
+ACOES_POR_MENSAGEM = int(getenv("ACOES_POR_MENSAGEM", "100"))
+# Quantidade máxima de mensagens aguardando a thread publicadora
+RABBITMQ_PUBLISH_QUEUE_SIZE = int(getenv("RABBITMQ_PUBLISH_QUEUE_SIZE", "10000"))
+
+ERROS_CONEXAO = (AMQPConnectionError, AMQPChannelError, StreamLostError)
+
+class PublicacaoIncompleta(Exception):
+    """
+    A publicação falhou após RABBITMQ_MAX_TENTATIVAS; as `confirmadas`
+    primeiras mensagens já foram confirmadas pelo broker e não devem ser reenviadas.
+    """
+    def __init__(self, confirmadas: int, causa: Exception):
+        super().__init__(f"Falha após {confirmadas} mensagens confirmadas: {repr(causa)}")
+        self.confirmadas = confirmadas
+
 
 class RabbitMQProducer:
+    """
+    Conexão de longa duração com o RabbitMQ.
+
+    O canal é aberto em modo transacional: um lote de mensagens é publicado e
+    confirmado pelo broker com um único Tx.Commit, em vez de uma ida e volta por
+    mensagem (o BlockingChannel do pika aguarda cada publisher confirm
+    individualmente). Se a conexão cair, ela é recriada na próxima publicação.
+    """
     def __init__(self):
-        self.__host="localhost"
-        self.__port=5672
-        self.__username="guest"
-        self.__password="guest"
-        self.__routingKey="minha_routing_key"
-        self.__exchange="datas_exchanges"
+        self.__host=RABBITMQ_HOST
+        self.__port=RABBITMQ_PORT
+        self.__username=RABBITMQ_USERNAME
+        self.__password=RABBITMQ_PASSWORD
+        self.__routingKey=RABBITMQ_ROUTING_KEY
+        self.__exchange=RABBITMQ_EXCHANGE
+        self.__connection=None
         self.__channel=self.__create_channel()
 
     def __create_channel(self):
         connection_parameters = pika.ConnectionParameters(
         host=self.__host,
         port=self.__port,
+        heartbeat=RABBITMQ_HEARTBEAT,
         credentials=pika.PlainCredentials(
             username=self.__username,
             password=self.__password
         )
         )
 
-        channel = pika.BlockingConnection(connection_parameters).channel()
+        self.__connection = pika.BlockingConnection(connection_parameters)
+        channel = self.__connection.channel()
 
         channel.exchange_declare(
             exchange=self.__exchange,
             exchange_type="direct",
             durable=True
         )
+        channel.tx_select()
 
         return channel
-    
-    def send_menssage(self, body):
-        self.__channel.basic_publish(
-            exchange=self.__exchange,
-            routing_key=self.__routingKey,
-            body=json.dumps(body), 
-            properties=pika.BasicProperties(
-                delivery_mode=2
-            )
-        )
+
+    def __ensure_channel(self):
+        """
+        Garante que a conexão e o canal estão abertos, reconectando se necessário.
+        """
+        if self.__connection is None or self.__connection.is_closed or self.__channel.is_closed:
+            self.__discard_connection()
+            self.__channel = self.__create_channel()
+            return
+
+        # Processa heartbeats pendentes de uma conexão que ficou ociosa no pool
+        self.__connection.process_data_events(time_limit=0)
+
+    def __discard_connection(self):
+        try:
+            if self.__connection is not None and self.__connection.is_open:
+                self.__connection.close()
+        except Exception:
+            pass
+        self.__connection = None
+
+    def send_menssage(self, body, routing_key: str | None = None):
+        self.send_batch([body], routing_key)
+
+    def send_batch(self, bodies, routing_key: str | None = None):
+        """
+        Publica uma lista de mensagens, confirmando-as em lotes de
+        RABBITMQ_CONFIRM_BATCH_SIZE.
+
+        Em caso de queda da conexão, reconecta (com espera exponencial a partir
+        de RABBITMQ_ESPERA_TENTATIVA_MS) e reenvia apenas os lotes que ainda
+        não foram confirmados.
+
+        Args:
+            routing_key (str | None): Sobrescreve RABBITMQ_ROUTING_KEY (ex.: a fila de baixa prioridade).
+
+        Raises:
+            PublicacaoIncompleta: Se a conexão não se recuperar; informa quantas mensagens foram confirmadas.
+        """
+        enviados = 0
+        tentativa = 0
+        while enviados < len(bodies):
+            try:
+                self.__ensure_channel()
+                lote = bodies[enviados:enviados + RABBITMQ_CONFIRM_BATCH_SIZE]
+                inicio = time.perf_counter()
+                for body in lote:
+                    self.__channel.basic_publish(
+                        exchange=self.__exchange,
+                        routing_key=routing_key or self.__routingKey,
+                        body=json.dumps(body),
+                        properties=pika.BasicProperties(
+                            delivery_mode=2
+                        )
+                    )
+                self.__channel.tx_commit()
+                metricas.rabbitmq_publicacao_segundos.observar(time.perf_counter() - inicio)
+                metricas.rabbitmq_mensagens_publicadas_total.inc(valor=len(lote))
+                enviados += len(lote)
+                tentativa = 0
+            except ERROS_CONEXAO as e:
+                metricas.rabbitmq_falhas_publicacao_total.inc(type(e).__name__)
+                tentativa += 1
+                print(f"Falha ao publicar no RabbitMQ (tentativa {tentativa}): {repr(e)}")
+                self.__discard_connection()
+                if tentativa >= RABBITMQ_MAX_TENTATIVAS:
+                    raise PublicacaoIncompleta(enviados, e) from e
+                time.sleep(RABBITMQ_ESPERA_TENTATIVA_MS / 1000 * 2 ** (tentativa - 1))
+
+    def verificar(self):
+        """
+        Confirma que a conexão com o broker está ativa, reconectando se necessário.
+        """
+        self.__ensure_channel()
 
     def close_connection(self):
-        if self.__channel:
+        if self.__channel and self.__channel.is_open:
             self.__channel.close()
-        if self.__channel.connection:
-            self.__channel.connection.close()
+        self.__discard_connection()
+
+
+class RabbitMQPublisher:
+    """
+    Pool de produtores compartilhado pelo processo.
+
+    Cada produtor é usado por uma única thread por vez (o pika não é
+    thread-safe) e volta para o pool ao final da publicação, mantendo as
+    conexões abertas entre requisições.
+    """
+    def __init__(self, tamanho: int = RABBITMQ_POOL_SIZE):
+        self.__tamanho = tamanho
+        self.__livres = queue.LifoQueue()
+        self.__criados = 0
+        self.__lock = threading.Lock()
+        self.__fechado = False
+
+    def __obter(self) -> RabbitMQProducer:
+        try:
+            return self.__livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.__lock:
+            criar = self.__criados < self.__tamanho
+            if criar:
+                self.__criados += 1
+
+        if not criar:
+            return self.__livres.get()
+
+        try:
+            return RabbitMQProducer()
+        except Exception:
+            with self.__lock:
+                self.__criados -= 1
+            raise
+
+    def publicar(self, body, routing_key: str | None = None):
+        self.publicar_lote([body], routing_key)
+
+    def publicar_lote(self, bodies: list, routing_key: str | None = None):
+        if self.__fechado:
+            raise RuntimeError("Publisher do RabbitMQ já foi encerrado")
+
+        producer = self.__obter()
+        try:
+            producer.send_batch(bodies, routing_key)
+        finally:
+            self.__livres.put(producer)
+
+    def verificar(self):
+        """
+        Verifica uma conexão livre do pool; se todas estiverem publicando, não espera por elas.
+
+        Raises:
+            Exception: O erro do pika se o broker estiver inacessível.
+        """
+        with self.__lock:
+            ocupados = self.__criados >= self.__tamanho and self.__livres.empty()
+        if ocupados:
+            return
+
+        producer = self.__obter()
+        try:
+            producer.verificar()
+        finally:
+            self.__livres.put(producer)
+
+    def aquecer(self):
+        """
+        Abre antecipadamente todas as conexões do pool.
+        """
+        producers = [self.__obter() for _ in range(self.__tamanho)]
+        for producer in producers:
+            self.__livres.put(producer)
+
+    def fechar(self, timeout: float = 10.0):
+        """
+        Aguarda as publicações em andamento terminarem e fecha as conexões.
+        """
+        self.__fechado = True
+        with self.__lock:
+            restantes = self.__criados
+            self.__criados = 0
+
+        for _ in range(restantes):
+            try:
+                producer = self.__livres.get(timeout=timeout)
+            except queue.Empty:
+                print("Tempo esgotado aguardando publicações em andamento")
+                break
+            try:
+                producer.close_connection()
+            except Exception as e:
+                print(f"Erro ao fechar conexão com o RabbitMQ: {repr(e)}")
+
+
+class FilaDePublicacaoCheia(Exception):
+    """
+    A fila da thread publicadora atingiu RABBITMQ_PUBLISH_QUEUE_SIZE.
+    """
+
+
+class PublicadorEmSegundoPlano:
+    """
+    Thread dedicada que publica as mensagens entregues pelas requisições.
+
+    enfileirar() apenas coloca a mensagem em uma fila em memória e retorna,
+    sem bloquear o event loop. A thread agrupa as mensagens pendentes em lotes
+    e as publica pelo pool de RabbitMQPublisher; se o broker estiver fora, o
+    lote é mantido e reenviado até a fila ser encerrada.
+    """
+    def __init__(self, publisher: RabbitMQPublisher, tamanho_fila: int = RABBITMQ_PUBLISH_QUEUE_SIZE):
+        self.__publisher = publisher
+        self.__fila = queue.Queue(maxsize=tamanho_fila)
+        self.__parar = threading.Event()
+        self.__thread = threading.Thread(target=self.__executar, name="rabbitmq-publisher", daemon=True)
+        self.__thread.start()
+
+    def enfileirar(self, body, routing_key: str | None = None):
+        if self.__parar.is_set():
+            raise RuntimeError("Publicador em segundo plano já foi encerrado")
+        try:
+            self.__fila.put_nowait((routing_key, body))
+        except queue.Full:
+            raise FilaDePublicacaoCheia("Fila de publicação cheia")
+
+    def pendentes(self) -> int:
+        return self.__fila.qsize()
+
+    def __proximo_lote(self) -> list:
+        try:
+            lote = [self.__fila.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while len(lote) < RABBITMQ_CONFIRM_BATCH_SIZE:
+            try:
+                lote.append(self.__fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def __executar(self):
+        lote = []
+        espera = 0.5
+        while True:
+            if not lote:
+                if self.__parar.is_set() and self.__fila.empty():
+                    return
+                lote = self.__proximo_lote()
+                if not lote:
+                    continue
+            try:
+                # Publica em sequência os trechos do lote com a mesma routing key,
+                # removendo cada trecho confirmado para não reenviá-lo após uma falha
+                while lote:
+                    routing_key = lote[0][0]
+                    trecho = list(takewhile(lambda item: item[0] == routing_key, lote))
+                    try:
+                        self.__publisher.publicar_lote([body for _, body in trecho], routing_key)
+                    except PublicacaoIncompleta as e:
+                        # O início do trecho já foi confirmado antes da falha
+                        del lote[:e.confirmadas]
+                        raise
+                    del lote[:len(trecho)]
+                espera = 0.5
+            except Exception as e:
+                print(f"Erro ao publicar lote de {len(lote)} mensagens: {repr(e)}")
+                if self.__parar.is_set():
+                    print(f"Descartando {len(lote) + self.__fila.qsize()} mensagens no encerramento")
+                    return
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    def fechar(self, timeout: float = 10.0):
+        """
+        Publica o que ainda está na fila e encerra a thread.
+        """
+        self.__parar.set()
+        self.__thread.join(timeout=timeout)
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+_publicador_background = None
+
+def get_publisher() -> RabbitMQPublisher:
+    """
+    Retorna o publisher compartilhado pelo processo, criando-o na primeira chamada.
+    """
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = RabbitMQPublisher()
+    return _publisher
+
+def get_publicador_background() -> PublicadorEmSegundoPlano:
+    """
+    Retorna a thread publicadora do processo, criando-a na primeira chamada.
+    """
+    global _publicador_background
+    if _publicador_background is None:
+        publisher = get_publisher()
+        with _publisher_lock:
+            if _publicador_background is None:
+                _publicador_background = PublicadorEmSegundoPlano(publisher)
+    return _publicador_background
+
+def fechar_publisher():
+    global _publisher, _publicador_background
+    with _publisher_lock:
+        if _publicador_background is not None:
+            _publicador_background.fechar()
+            _publicador_background = None
+        if _publisher is not None:
+            _publisher.fechar()
+            _publisher = None
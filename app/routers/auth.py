@@ -5,8 +5,11 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import os
-from .. import models, database
-from sqlalchemy.orm import Session
+from .. import database
+from .create_user import User
+from ..services.cache import MemoryCacheBackend
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["authentication"])
 
@@ -18,6 +21,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Cache do 'sub' do token para o usuário, evitando um SELECT por requisição autenticada
+AUTH_CACHE_TTL_SEGUNDOS = float(os.environ.get("AUTH_CACHE_TTL_SEGUNDOS", "30"))
+AUTH_CACHE_MAX_ITENS = int(os.environ.get("AUTH_CACHE_MAX_ITENS", "10000"))
+cache_usuarios = MemoryCacheBackend(max_itens=AUTH_CACHE_MAX_ITENS)
+
+def invalidar_usuario(user_id: int):
+    """
+    Remove o usuário do cache; deve ser chamada sempre que o usuário for alterado.
+    """
+    cache_usuarios.remover(str(user_id))
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _usuario_alterado(mapper, connection, target):
+    invalidar_usuario(target.user_id)
+
 def criar_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
     if expires_delta:
@@ -28,7 +47,7 @@ def criar_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def obter_usuario_atual(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def obter_usuario_atual(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Não foi possível validar as credenciais",
@@ -39,24 +58,29 @@ async def obter_usuario_atual(token: str = Depends(oauth2_scheme), db: Session =
         user_id: int = payload.get("sub") # Assumindo que o ID do usuário está no 'sub'
         if user_id is None:
             raise credentials_exception
-        user = db.query(models.User).filter(models.User.user_id == user_id).first()
+        user = cache_usuarios.obter(str(user_id))
         if user is None:
-            raise credentials_exception
+            resultado = await db.execute(select(User).where(User.user_id == int(user_id)))
+            user = resultado.scalars().first()
+            if user is None:
+                raise credentials_exception
+            cache_usuarios.salvar(str(user_id), user, AUTH_CACHE_TTL_SEGUNDOS)
         return user
     except JWTError:
         raise credentials_exception
 
 # (Dentro da sua função de login no auth.py)
 @router.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_db)):
     try: 
-        user = db.query(models.User).filter(models.User.username == form_data.username).first()
+        resultado = await db.execute(select(User).where(User.username == form_data.username))
+        user = resultado.scalars().first()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro inesperado: {str(e)}")
     
     if not user:
         raise HTTPException(status_code=400, detail="Usuário incorreto")
-    if not user.verify_password(form_data.password):
+    if not await user.verify_password_async(form_data.password):
         raise HTTPException(status_code=400, detail="Senha incorreta")
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -1,3 +1,6 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
@@ -6,6 +9,10 @@ from ..database import Base, engine, SessionLocal
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# O bcrypt custa ~100ms de CPU por hash: roda em um pool limitado, fora do event loop
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "4"))
+hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")
+
 class User(Base):
     __tablename__ = "users"
     user_id = Column(Integer, primary_key=True, index=True)
@@ -15,6 +22,10 @@ class User(Base):
     def verify_password(self, plain_password):
         return pwd_context.verify(plain_password, self.hashed_password)
 
+    async def verify_password_async(self, plain_password):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hash_executor, pwd_context.verify, plain_password, self.hashed_password)
+
     @staticmethod
     def create_hashed_password(plain_password):
         return pwd_context.hash(plain_password)
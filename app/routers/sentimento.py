@@ -1,31 +1,84 @@
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas
-from ..database import get_db
-from ..services import services_sentimentos
+from ..database import get_async_db, get_read_db
+from ..services import exportacao, scorecards, services_sentimentos, tendencias
+from ..producers.producer import FilaDePublicacaoCheia
+from ..producers.admissao import AdmissaoRecusada, get_controle_admissao
+from ..services.persistencia import PERSISTENCIA_TIMEOUT_S, BufferPersistenciaCheio
+from ..services.paginacao import PAGINA_TAMANHO_MAX, proximo_cursor
+from ..services.cache import cache_respostas
+from ..services.serializacao import RespostaJSON
+from ..services.notificacoes import LimiteDeAssinantes, eventos_sse, hub
 import httpx
+import asyncio
 import datetime
+import json
 from os import getenv
 
 load_dotenv()
 
 ANALISE_URL = getenv("ANALISE_URL")
+# Quantidade máxima de ações aceitas em uma requisição de lote
+LOTE_MAX_ITENS = int(getenv("LOTE_MAX_ITENS", "5000"))
 
 router = APIRouter(
     prefix="",
     tags=["sentimento"]
 )
 
+# Parâmetro de tamanho de página compartilhado pelos endpoints de listagem
+Limit = Query(None, ge=1, le=PAGINA_TAMANHO_MAX)
+
+def definir_cursor(response: Response, itens: list, limit: int | None, chave):
+    """
+    Informa no header X-Proximo-Cursor o valor de `after` da próxima página.
+    """
+    cursor = proximo_cursor(itens, limit, chave)
+    if cursor is not None:
+        response.headers["X-Proximo-Cursor"] = str(cursor)
+
+def stream_response(gerador):
+    return StreamingResponse(gerador, media_type="application/json")
+
+def admitir(prioridade: str = Header("normal", alias="X-Prioridade", pattern="^(normal|baixa)$")) -> str | None:
+    """
+    Aplica o controle de admissão antes da publicação.
+
+    Retorna a routing key a usar (None para a padrão) ou responde 429 com
+    Retry-After quando o backlog das filas está acima do limite.
+    """
+    controle = get_controle_admissao()
+    if controle is None:
+        return None
+    try:
+        return controle.admitir(prioridade)
+    except AdmissaoRecusada as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas mensagens aguardando análise, tente novamente mais tarde.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
 # POST /sentimento
 @router.post("/sentimento/create")
-async def create_sentimento(acao: schemas.Acao, db: Session = Depends(get_db)):
+async def create_sentimento(acao: schemas.Acao, db: AsyncSession = Depends(get_async_db), routing_key: str | None = Depends(admitir)):
     """
     Requisita o modelo para analisar o sentimento
+
+    Com o header X-Prioridade: baixa, a ação pode ser desviada para a fila
+    de baixa prioridade quando os consumers estão atrasados.
     """
     try:
-       services_sentimentos.enviar_menssagem(acao,db)
+       await services_sentimentos.enviar_menssagem(acao,db,routing_key)
+    except FilaDePublicacaoCheia:
+        raise HTTPException(
+            status_code=503,
+            detail="Fila de publicação cheia, tente novamente.",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
         print(f"Erro ao processar a requisição: {repr(e)}")
         raise HTTPException(status_code=500, detail=f"Erro inesperado: {str(e)}")
@@ -35,37 +88,133 @@ async def create_sentimento(acao: schemas.Acao, db: Session = Depends(get_db)):
     })
 
 
+# POST /sentimento/create/lote
+@router.post("/sentimento/create/lote", response_model=schemas.ResultadoLote)
+async def create_sentimento_lote(request: Request, db: AsyncSession = Depends(get_async_db), routing_key: str | None = Depends(admitir)):
+    """
+    Requisita a análise de várias ações em uma única requisição.
+
+    Aceita um array JSON de ações ou, com Content-Type application/x-ndjson,
+    uma ação por linha. Retorna o resultado (aceito/rejeitado) de cada item;
+    no NDJSON, uma linha que não é JSON válido é rejeitada como os demais itens inválidos.
+    """
+    itens = []
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            # As linhas seguem em bytes e são decodificadas na validação de cada item
+            pendente = b""
+            async for chunk in request.stream():
+                pendente += chunk
+                *linhas, pendente = pendente.split(b"\n")
+                itens.extend(linha for linha in linhas if linha.strip())
+                if len(itens) > LOTE_MAX_ITENS:
+                    break
+            if pendente.strip():
+                itens.append(pendente)
+        else:
+            itens = json.loads(await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"JSON inválido: {str(e)}")
+
+    if not isinstance(itens, list):
+        raise HTTPException(status_code=400, detail="O corpo deve ser um array JSON ou NDJSON.")
+    if len(itens) > LOTE_MAX_ITENS:
+        raise HTTPException(status_code=413, detail=f"O lote excede o limite de {LOTE_MAX_ITENS} ações.")
+
+    try:
+        resultado = await services_sentimentos.enviar_lote_menssagens(itens, db, routing_key)
+    except Exception as e:
+        print(f"Erro ao processar a requisição: {repr(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro inesperado: {str(e)}")
+
+    return JSONResponse(status_code=201, content=resultado.model_dump())
+
+
 # POST /sentimento/recebido
 @router.post("/sentimento/recebido")
-async def receber_sentimento(dados: dict, db: Session = Depends(get_db)):
+async def receber_sentimento(dados: dict | list[dict], db: AsyncSession = Depends(get_async_db)):
     """
     Recebe os dados enviados pelo consumer e salva no banco de dados.
+
+    Aceita um resultado ou a lista de resultados de um micro-lote, gravados
+    juntos no mesmo flush do buffer. A resposta só é enviada depois do
+    commit, então o consumer pode confirmar a mensagem com segurança ao
+    receber o 201.
     """
-    try:
-        texto = dados.get("texto")
-        resultado = dados.get("resultado")
-        print(dados)
+    itens = dados if isinstance(dados, list) else [dados]
+    if len(itens) > LOTE_MAX_ITENS:
+        raise HTTPException(status_code=413, detail=f"O lote excede o limite de {LOTE_MAX_ITENS} resultados.")
 
-        if not texto or not resultado:
+    try:
+        if not itens or any(not item.get("texto") or not item.get("resultado") for item in itens):
             raise HTTPException(status_code=400, detail="Texto e resultado são obrigatórios.")
 
-    
+        futuros = [asyncio.wrap_future(futuro) for futuro in services_sentimentos.salvar_resultados(itens)]
+        # shield: o timeout não cancela os resultados que já estão no buffer
+        await asyncio.wait_for(asyncio.shield(asyncio.gather(*futuros)), PERSISTENCIA_TIMEOUT_S)
+
         return JSONResponse(status_code=201, content={
             "message": "Sentimento recebido"
         })
 
+    except HTTPException:
+        raise
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except (BufferPersistenciaCheio, asyncio.TimeoutError):
+        raise HTTPException(
+            status_code=503,
+            detail="Banco de dados sobrecarregado, tente novamente.",
+            headers={"Retry-After": "1"}
+        )
+
     except Exception as e:
         print(f"Erro ao processar a requisição: {repr(e)}")
         raise HTTPException(status_code=500, detail=f"Erro inesperado: {str(e)}")
     
+# GET /sentimento/eventos
+@router.get("/sentimento/eventos")
+async def get_eventos(
+    acao_id: list[int] | None = Query(None),
+    agent_id: int | None = None,
+    user_id: int | None = None,
+):
+    """
+    Envia cada análise assim que é gravada, por Server-Sent Events.
+
+    Filtra por acao_id (um ou vários), agent_id e/ou user_id; sem filtros,
+    recebe todas as análises gravadas por este processo.
+    """
+    try:
+        assinatura = hub.assinar(set(acao_id) if acao_id else None, agent_id, user_id)
+    except LimiteDeAssinantes as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return StreamingResponse(
+        eventos_sse(assinatura),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # GET /sentimento
 @router.get("/sentimento/all")
-def get_sentimentos(db: Session = Depends(get_db)):
+async def get_sentimentos(after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera todos os sentimentos.
+
+    Use `after`/`limit` para paginar (o cursor da próxima página vem no header
+    X-Proximo-Cursor) ou `stream=true` para receber a lista em streaming.
     """
     try:
-        return services_sentimentos.get_sentimentos(db)
+        if stream:
+            return stream_response(services_sentimentos.stream_sentimentos(after))
+
+        sentimentos = await services_sentimentos.get_sentimentos(db, after, limit)
+        resposta = RespostaJSON(sentimentos)
+        definir_cursor(resposta, sentimentos, limit, lambda s: s["analise_id"])
+        return resposta
         
     except Exception as e:
         raise HTTPException(
@@ -75,12 +224,12 @@ def get_sentimentos(db: Session = Depends(get_db)):
 
 # GET /sentimentosRecorrentes
 @router.get("/sentimento/recorrente")
-def sentimentos_recorrentes(db: Session = Depends(get_db)):
+async def sentimentos_recorrentes(request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera todos os sentimentos recorrentes.
     """
     try:
-        return services_sentimentos.sentimentos_recorrentes(db)
+        return await cache_respostas.responder(request, lambda: services_sentimentos.sentimentos_recorrentes(db))
     
     except Exception as e:
         raise HTTPException(
@@ -90,12 +239,12 @@ def sentimentos_recorrentes(db: Session = Depends(get_db)):
 
 # GET /sentimento/tecnico/{id}
 @router.get("/sentimento/tecnico/{id}")
-def get_sentimento_by_tecnico(id: int, db: Session = Depends(get_db)):
+async def get_sentimento_by_tecnico(id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera todos os sentimentos de um técnico.
     """
     try:    
-        return services_sentimentos.get_sentimentos_por_id(id, db)
+        return RespostaJSON(await services_sentimentos.get_sentimentos_por_id(id, db))
        
     
     except Exception as e:
@@ -106,13 +255,18 @@ def get_sentimento_by_tecnico(id: int, db: Session = Depends(get_db)):
 
 # GET /atendimento
 @router.get("/atendimento")
-def get_atendimento(db: Session = Depends(get_db)):
+async def get_atendimento(after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera as informações de atendimento incluindo conversas, sentimentos, atendenctes e clientes.
     """
     try: 
-        
-        return services_sentimentos.get_atendimento(db)
+        if stream:
+            return stream_response(services_sentimentos.stream_atendimento(after))
+
+        atendimentos = await services_sentimentos.get_atendimento(db, after, limit)
+        resposta = RespostaJSON(atendimentos)
+        definir_cursor(resposta, atendimentos["sentimento"], limit, lambda a: a["analise_id"])
+        return resposta
     
     except Exception as e:
         raise HTTPException(
@@ -122,16 +276,46 @@ def get_atendimento(db: Session = Depends(get_db)):
     
     
 
+# GET /atendimento/export
+@router.get("/atendimento/export")
+async def exportar_atendimento(
+    formato: str = "csv",
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    agent_id: int | None = None,
+    after: int | None = None
+):
+    """
+    Exporta todos os atendimentos em CSV, NDJSON ou Parquet, em streaming.
+
+    Lê o JOIN de /atendimento por um cursor no servidor, com memória
+    constante; `start`/`end` (dias inclusivos) e `agent_id` filtram as
+    análises, e `after` retoma uma exportação interrompida pelo analise_id.
+    """
+    try:
+        exportacao.validar(formato, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        exportacao.stream_exportacao(formato, start, end, agent_id, after),
+        media_type=exportacao.TIPOS_DE_CONTEUDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="atendimentos.{formato}"'}
+    )
+
 # GET /tecnico/{id}
 @router.get("/tecnico/{id}")
-def get_tecnico(id: int, db: Session = Depends(get_db)):
+async def get_tecnico(id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera informações de um técnico específico.
     """
     try:    
             
-        return services_sentimentos.get_tecnico(id, db)
+        return await cache_respostas.responder(request, lambda: services_sentimentos.get_tecnico(id, db))
     
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -142,59 +326,144 @@ def get_tecnico(id: int, db: Session = Depends(get_db)):
 
 # GET /cliente/{id}
 @router.get("/cliente/{id}")
-def get_cliente(id: int, db: Session = Depends(get_db)):
+async def get_cliente(id: int, request: Request, db: AsyncSession = Depends(get_read_db)):
     """
     Recupera informações de um cliente específico.
     """
     try:    
-        return services_sentimentos.get_cliente(id, db)
+        return await cache_respostas.responder(request, lambda: services_sentimentos.get_cliente(id, db))
     
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=str(e)
         )
     
+# GET /scorecard/{tipo}
+@router.get("/scorecard/{tipo}")
+async def get_scorecards(tipo: str, request: Request, ids: list[int] = Query(...), db: AsyncSession = Depends(get_read_db)):
+    """
+    Scorecards (totais por sentimento, score médio e mínimo, última análise)
+    dos técnicos (tipo=agente) ou clientes (tipo=cliente) em `ids`, em uma consulta.
+    """
+    try:
+        scorecards.validar(tipo, ids=ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await cache_respostas.responder(request, lambda: scorecards.buscar(db, tipo, ids))
+
+# GET /scorecard/{tipo}/ranking
+@router.get("/scorecard/{tipo}/ranking")
+async def get_ranking_scorecards(
+    tipo: str,
+    request: Request,
+    ordem: str = "score_medio",
+    decrescente: bool = True,
+    limit: int = Query(20, ge=1, le=PAGINA_TAMANHO_MAX),
+    minimo_analises: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Técnicos ou clientes ordenados por um campo do scorecard (ex.: menor score médio).
+    """
+    try:
+        scorecards.validar(tipo, ordem=ordem)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await cache_respostas.responder(
+        request, lambda: scorecards.ranking(db, tipo, ordem, decrescente, limit, minimo_analises)
+    )
+
 # GET /tecnicos
 @router.get("/tecnicos-lista")
-def get_tecnicos(db: Session = Depends(get_db)):
+async def get_tecnicos(response: Response, after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
     try:
-        return services_sentimentos.get_tecnicos(db)
+        if stream:
+            return stream_response(services_sentimentos.stream_tecnicos(after))
+
+        tecnicos = await services_sentimentos.get_tecnicos(db, after, limit)
+        definir_cursor(response, tecnicos, limit, lambda t: t.agent_id)
+        return tecnicos
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao buscar técnicos: {str(e)}")
 
 # GET /clientes
 @router.get("/clientes-lista")
-def get_clientes(db: Session = Depends(get_db)):
-    return services_sentimentos.get_clientes(db)
+async def get_clientes(response: Response, after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
+    if stream:
+        return stream_response(services_sentimentos.stream_clientes(after))
+
+    clientes = await services_sentimentos.get_clientes(db, after, limit)
+    definir_cursor(response, clientes, limit, lambda c: c.user_id)
+    return clientes
 
 # GET /sentimento/by-score
 @router.get("/sentimento/by-score")
-def get_sentimentos_by_score(min: float = 0.0, max: float = 1.0, db: Session = Depends(get_db)):
-    return services_sentimentos.get_sentimentos_by_score(min, max, db)
+async def get_sentimentos_by_score(response: Response, min: float = 0.0, max: float = 1.0, after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
+    if stream:
+        return stream_response(services_sentimentos.stream_sentimentos_by_score(min, max, after))
+
+    sentimentos = await services_sentimentos.get_sentimentos_by_score(min, max, db, after, limit)
+    definir_cursor(response, sentimentos, limit, lambda s: s.analise_id)
+    return sentimentos
 
 # GET /sentimento/by-data
 @router.get("/sentimento/by-data")
-def get_sentimentos_by_data(start: datetime.date, end: datetime.date, db: Session = Depends(get_db)):
-    return services_sentimentos.get_sentimentos_by_data(start, end, db)
+async def get_sentimentos_by_data(response: Response, start: datetime.date, end: datetime.date, after: int | None = None, limit: int | None = Limit, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
+    if stream:
+        return stream_response(services_sentimentos.stream_sentimentos_by_data(start, end, after))
+
+    sentimentos = await services_sentimentos.get_sentimentos_by_data(start, end, db, after, limit)
+    resposta = RespostaJSON(sentimentos)
+    definir_cursor(resposta, sentimentos, limit, lambda s: s["analise_id"])
+    return resposta
+
+# GET /sentimento/tendencia
+@router.get("/sentimento/tendencia")
+async def get_tendencia(
+    request: Request,
+    start: datetime.date,
+    end: datetime.date,
+    intervalo: str = "dia",
+    agrupar: str | None = None,
+    fonte: str = "auto",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Quantidade por sentimento e score médio em buckets de hora, dia ou semana.
+
+    Agregado no banco, opcionalmente por agente ou cliente (agrupar); em
+    períodos longos sem agrupamento usa os rollups diários.
+    """
+    try:
+        tendencias.validar(start, end, intervalo, agrupar, fonte)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await cache_respostas.responder(
+        request, lambda: tendencias.calcular(db, start, end, intervalo, agrupar, fonte)
+    )
 
 # Sentimento mais negativo
 @router.get("/sentimento/mais-negativo")
-def get_mais_negativo(db: Session = Depends(get_db)):
-    sentimento_negativo = services_sentimentos.get_sentimento_mais_negativo(db)
-
-    return sentimento_negativo
+async def get_mais_negativo(request: Request, db: AsyncSession = Depends(get_read_db)):
+    return await cache_respostas.responder(request, lambda: services_sentimentos.get_sentimento_mais_negativo(db))
 
 # GET /sentimento/quantidade
 @router.get("/sentimento/quantidade")
-def get_quantidade_sentimentos(db: Session = Depends(get_db)):
+async def get_quantidade_sentimentos(db: AsyncSession = Depends(get_read_db)):
     print("Chamando a função get_quantidade_sentimentos")
-    quantidade = services_sentimentos.get_quantidade_sentimentos(db)
+    quantidade = await services_sentimentos.get_quantidade_sentimentos(db)
     print(f"Quantidade de sentimentos: {quantidade}")
     return {"quantidade": quantidade}
 
 
 # Get/ sentimento/mais-frequente
 @router.get("/sentimento/mais-frequente")
-def get_sentimento_mais_frequente(db: Session = Depends(get_db)):
-    return services_sentimentos.get_sentimento_mais_frequente(db)
\ No newline at end of file
+async def get_sentimento_mais_frequente(request: Request, db: AsyncSession = Depends(get_read_db)):
+    return await cache_respostas.responder(request, lambda: services_sentimentos.get_sentimento_mais_frequente(db))
\ No newline at end of file
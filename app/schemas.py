@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
 
 class User(BaseModel):
@@ -74,6 +74,7 @@ class AnaliseSentimento(BaseModel):
     }
 
 class Atendimento(BaseModel):
+    analise_id: Optional[int] = None
     conversa: str
     score: float
     termo: str
@@ -84,3 +85,14 @@ class Atendimento(BaseModel):
 class SentimentoRecorrente(BaseModel):
     sentimento: str
     count: int
+
+class ResultadoItemLote(BaseModel):
+    indice: int
+    status: str
+    acao_id: Optional[int] = None
+    erros: Optional[list[Any]] = None
+
+class ResultadoLote(BaseModel):
+    aceitos: int
+    rejeitados: int
+    resultados: list[ResultadoItemLote]
@@ -0,0 +1,263 @@
+import argparse
+import datetime
+import glob
+import os
+from collections import defaultdict
+from os import getenv
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .. import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+load_dotenv()
+
+# Análises antigas ficam em arquivos Parquet imutáveis, um diretório por mês:
+# ARQUIVO_DIRETORIO/ano=AAAA/mes=MM/parte-<menor analise_id>-<maior analise_id>.parquet
+ARQUIVO_DIRETORIO = getenv("ARQUIVO_DIRETORIO", "./arquivo")
+# Idade mínima (pela data_analise) das análises movidas para o arquivo
+ARQUIVO_IDADE_DIAS = int(getenv("ARQUIVO_IDADE_DIAS", "90"))
+# Análises movidas por transação
+ARQUIVO_LOTE = int(getenv("ARQUIVO_LOTE", "50000"))
+ARQUIVO_COMPRESSAO = getenv("ARQUIVO_COMPRESSAO", "zstd")
+
+COLUNAS_ANALISE = [coluna.name for coluna in models.AnaliseSentimento.__table__.columns]
+
+def _esquema():
+    return pa.schema([
+        ("analise_id", pa.int64()),
+        ("acao_id", pa.int64()),
+        ("sentimento", pa.string()),
+        ("score", pa.decimal128(5, 2)),
+        ("modelo", pa.string()),
+        ("data_analise", pa.timestamp("us")),
+        ("agent_id", pa.int64()),
+        ("user_id", pa.int64()),
+    ])
+
+def _exigir_pyarrow():
+    if pa is None:
+        raise RuntimeError("O arquivo de análises requer o pacote pyarrow")
+
+def _diretorio_mes(ano: int, mes: int, diretorio: str) -> str:
+    return os.path.join(diretorio, f"ano={ano:04d}", f"mes={mes:02d}")
+
+def _meses(inicio: datetime.datetime, fim: datetime.datetime):
+    """
+    (ano, mês) de cada mês que intersecta [inicio, fim].
+    """
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        yield ano, mes
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+def _partes(ano: int, mes: int, diretorio: str, after: int | None = None) -> list[str]:
+    """
+    Arquivos da partição do mês; com `after`, ignora os que só têm analise_id <= after.
+    """
+    partes = sorted(glob.glob(os.path.join(_diretorio_mes(ano, mes, diretorio), "parte-*.parquet")))
+    if after is None:
+        return partes
+    # parte-<menor analise_id>-<maior analise_id>.parquet
+    return [parte for parte in partes if int(os.path.basename(parte)[:-len(".parquet")].split("-")[2]) > after]
+
+def _ler(partes: list[str], colunas: list[str], filtros: list):
+    if not partes:
+        return None
+    _exigir_pyarrow()
+    return pa.concat_tables([pq.read_table(parte, columns=colunas, filters=filtros) for parte in partes])
+
+def _gravar_parte(linhas: list[dict], diretorio: str) -> str:
+    """
+    Grava as linhas em um arquivo temporário ao lado do destino e retorna o seu caminho.
+
+    O arquivo só é publicado (renomeado para parte-*.parquet, o nome que os
+    leitores procuram) por _publicar, depois do commit do DELETE.
+    """
+    data = linhas[0]["data_analise"]
+    destino = _diretorio_mes(data.year, data.month, diretorio)
+    os.makedirs(destino, exist_ok=True)
+    caminho = os.path.join(destino, f"parte-{linhas[0]['analise_id']:012d}-{linhas[-1]['analise_id']:012d}.parquet")
+    temporario = caminho + ".tmp"
+    pq.write_table(pa.Table.from_pylist(linhas, schema=_esquema()), temporario, compression=ARQUIVO_COMPRESSAO)
+    return temporario
+
+def _publicar(temporario: str):
+    # O nome é definido pelos analise_id do lote: regravar o mesmo lote substitui o arquivo
+    os.replace(temporario, temporario[:-len(".tmp")])
+
+def _recuperar(db: Session, diretorio: str):
+    """
+    Resolve os temporários deixados por uma execução interrompida entre o commit e a publicação.
+
+    Se as análises do arquivo ainda estão na tabela, o DELETE não foi
+    confirmado (ou o arquivo nem terminou de ser gravado) e o temporário é
+    descartado, pois o lote será arquivado de novo; senão, o commit
+    aconteceu e o arquivo é publicado.
+    """
+    analise = models.AnaliseSentimento
+    for temporario in sorted(glob.glob(os.path.join(diretorio, "ano=*", "mes=*", "parte-*.parquet.tmp"))):
+        # O lote inteiro é apagado (ou não) no mesmo commit: basta verificar a menor analise_id, que está no nome
+        menor = int(os.path.basename(temporario).split("-")[1])
+        if db.execute(select(analise.analise_id).where(analise.analise_id == menor)).first():
+            os.remove(temporario)
+        else:
+            _publicar(temporario)
+    db.rollback()
+
+def arquivar(db: Session, corte: datetime.datetime, tamanho_lote: int = ARQUIVO_LOTE, diretorio: str = ARQUIVO_DIRETORIO) -> int:
+    """
+    Move as análises com data_analise anterior a `corte` para o arquivo.
+
+    Cada lote é gravado em arquivos temporários, apagado da tabela e só
+    depois do commit os arquivos são publicados; se o commit falhar, os
+    temporários são descartados e as análises continuam só na tabela, então
+    nenhuma análise aparece nas duas fontes. Temporários de uma execução
+    interrompida são resolvidos no início da seguinte.
+
+    Returns:
+        int: A quantidade de análises arquivadas.
+    """
+    _exigir_pyarrow()
+    _recuperar(db, diretorio)
+    analise = models.AnaliseSentimento
+    colunas = [analise.__table__.c[nome] for nome in COLUNAS_ANALISE]
+    total = 0
+    while True:
+        linhas = db.execute(
+            select(*colunas, models.Acao.agent_id, models.Acao.user_id)
+            .outerjoin(models.Acao, models.Acao.acao_id == analise.acao_id)
+            .where(analise.data_analise < corte)
+            .order_by(analise.analise_id)
+            .limit(tamanho_lote)
+        ).mappings().all()
+        if not linhas:
+            return total
+
+        por_mes = defaultdict(list)
+        for linha in linhas:
+            por_mes[(linha["data_analise"].year, linha["data_analise"].month)].append(dict(linha))
+        temporarios = []
+        try:
+            for linhas_mes in por_mes.values():
+                temporarios.append(_gravar_parte(linhas_mes, diretorio))
+
+            # As linhas lidas são exatamente as anteriores ao corte até o maior analise_id do lote
+            maior = linhas[-1]["analise_id"]
+            db.execute(delete(analise).where(analise.analise_id <= maior, analise.data_analise < corte))
+            db.commit()
+        except Exception:
+            db.rollback()
+            for temporario in temporarios:
+                os.remove(temporario)
+            raise
+
+        for temporario in temporarios:
+            _publicar(temporario)
+        total += len(linhas)
+
+def ler_analises_mes(ano: int, mes: int, inicio: datetime.datetime, fim: datetime.datetime, after: int | None = None, diretorio: str = ARQUIVO_DIRETORIO) -> list[dict]:
+    """
+    Análises arquivadas do mês com inicio <= data_analise <= fim e analise_id > after, em ordem de analise_id.
+    """
+    filtros = [("data_analise", ">=", inicio), ("data_analise", "<=", fim)]
+    if after is not None:
+        filtros.append(("analise_id", ">", after))
+    tabela = _ler(_partes(ano, mes, diretorio, after), COLUNAS_ANALISE, filtros)
+    if tabela is None:
+        return []
+    return tabela.sort_by("analise_id").to_pylist()
+
+def ler_analises(inicio: datetime.datetime, fim: datetime.datetime, after: int | None = None, limit: int | None = None, diretorio: str = ARQUIVO_DIRETORIO) -> list[dict]:
+    """
+    Análises arquivadas no período (extremos inclusivos), em ordem de analise_id.
+    """
+    linhas = []
+    for ano, mes in _meses(inicio, fim):
+        linhas.extend(ler_analises_mes(ano, mes, inicio, fim, after, diretorio))
+    linhas.sort(key=lambda linha: linha["analise_id"])
+    return linhas[:limit] if limit is not None else linhas
+
+async def iterar_analises(inicio: datetime.datetime, fim: datetime.datetime, after: int | None = None, diretorio: str = ARQUIVO_DIRETORIO):
+    """
+    Gera as análises arquivadas do período mês a mês, sem carregar o período inteiro na memória.
+    """
+    for ano, mes in _meses(inicio, fim):
+        for linha in await run_in_threadpool(ler_analises_mes, ano, mes, inicio, fim, after, diretorio):
+            yield linha
+
+def lotes(diretorio: str = ARQUIVO_DIRETORIO):
+    """
+    Gera todas as análises arquivadas, um arquivo por vez, para reconstruir os rollups e scorecards.
+
+    Yields:
+        tuple[list[dict], dict]: As linhas e {acao_id: (agent_id, user_id)}, no formato de rollups.atualizar.
+    """
+    for parte in sorted(glob.glob(os.path.join(diretorio, "ano=*", "mes=*", "parte-*.parquet"))):
+        _exigir_pyarrow()
+        linhas = pq.read_table(parte).to_pylist()
+        yield linhas, {linha["acao_id"]: (linha["agent_id"], linha["user_id"]) for linha in linhas}
+
+_UNIDADES = {"hora": "hour", "dia": "day", "semana": "week"}
+
+def agregar(inicio: datetime.datetime, fim: datetime.datetime, intervalo: str, agrupar: str | None, diretorio: str = ARQUIVO_DIRETORIO) -> list[tuple]:
+    """
+    Agrega as análises arquivadas com inicio <= data_analise < fim nos mesmos
+    buckets de tendencias (semanas começam na segunda-feira).
+
+    Returns:
+        list[tuple]: Linhas (inicio, grupo, sentimento, quantidade, soma_score, com_score).
+    """
+    coluna_grupo = {"agente": "agent_id", "cliente": "user_id"}.get(agrupar)
+    colunas = ["data_analise", "sentimento", "score"] + ([coluna_grupo] if coluna_grupo else [])
+    filtros = [("data_analise", ">=", inicio), ("data_analise", "<", fim)]
+
+    linhas = []
+    for ano, mes in _meses(inicio, fim):
+        tabela = _ler(_partes(ano, mes, diretorio), colunas, filtros)
+        if coluna_grupo and tabela is not None:
+            # Como o JOIN com cs_acoes na consulta da tabela, ações sem agente/cliente ficam de fora
+            tabela = tabela.filter(pc.is_valid(tabela[coluna_grupo]))
+        if tabela is None or tabela.num_rows == 0:
+            continue
+
+        bucket = pc.floor_temporal(tabela["data_analise"], unit=_UNIDADES[intervalo], week_starts_monday=True)
+        tabela = tabela.append_column("bucket", bucket)
+        chaves = ["bucket"] + ([coluna_grupo] if coluna_grupo else []) + ["sentimento"]
+        agregado = tabela.group_by(chaves).aggregate([("sentimento", "count"), ("score", "sum"), ("score", "count")])
+
+        grupos = agregado[coluna_grupo].to_pylist() if coluna_grupo else [None] * agregado.num_rows
+        linhas.extend(zip(
+            agregado["bucket"].to_pylist(),
+            grupos,
+            agregado["sentimento"].to_pylist(),
+            agregado["sentimento_count"].to_pylist(),
+            agregado["score_sum"].to_pylist(),
+            agregado["score_count"].to_pylist(),
+        ))
+    return linhas
+
+
+if __name__ == "__main__":
+    # python -m app.services.arquivo arquivar [--idade-dias 90]
+    parser = argparse.ArgumentParser(description="Move as análises antigas de cs_analise_sentimento para o arquivo em Parquet.")
+    parser.add_argument("comando", choices=["arquivar"])
+    parser.add_argument("--idade-dias", type=int, default=ARQUIVO_IDADE_DIAS)
+    parser.add_argument("--diretorio", default=ARQUIVO_DIRETORIO)
+    args = parser.parse_args()
+
+    corte = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=args.idade_dias), datetime.time())
+    db = SessionLocal()
+    try:
+        total = arquivar(db, corte, diretorio=args.diretorio)
+    finally:
+        db.close()
+    print(f"{total} análises anteriores a {corte.date().isoformat()} arquivadas em {args.diretorio}.")
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from ..database import DATABASE_READ_URLS, DB_LEITURA, roteador_leitura
+from .serializacao import dumps
+
+load_dotenv()
+
+CACHE_TTL_SEGUNDOS = float(getenv("CACHE_TTL_SEGUNDOS", "5"))
+CACHE_MAX_ITENS = int(getenv("CACHE_MAX_ITENS", "1024"))
+
+class CacheBackend:
+    """
+    Interface de armazenamento do cache de respostas.
+
+    No cache de respostas os valores são tuplas (corpo, etag). Um backend
+    compartilhado entre processos (ex.: Redis) deve implementar estes
+    métodos, com `remover` e `limpar` visíveis para todos os processos.
+    """
+    def obter(self, chave: str) -> tuple[bytes, str] | None:
+        raise NotImplementedError
+
+    def salvar(self, chave: str, valor: tuple[bytes, str], ttl: float):
+        raise NotImplementedError
+
+    def remover(self, chave: str):
+        raise NotImplementedError
+
+    def limpar(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Backend em memória do processo, com TTL e descarte LRU acima de `max_itens`.
+    """
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS):
+        self.__max_itens = max_itens
+        self.__itens = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def obter(self, chave: str):
+        with self.__lock:
+            item = self.__itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self.__itens[chave]
+                return None
+            self.__itens.move_to_end(chave)
+            return valor
+
+    def salvar(self, chave: str, valor, ttl: float):
+        with self.__lock:
+            self.__itens[chave] = (time.monotonic() + ttl, valor)
+            self.__itens.move_to_end(chave)
+            while len(self.__itens) > self.__max_itens:
+                self.__itens.popitem(last=False)
+
+    def remover(self, chave: str):
+        with self.__lock:
+            self.__itens.pop(chave, None)
+
+    def limpar(self):
+        with self.__lock:
+            self.__itens.clear()
+
+
+class CacheRespostas:
+    """
+    Cache das respostas JSON dos endpoints de leitura, com suporte a ETag.
+
+    O cliente que envia If-None-Match com o ETag atual recebe 304 sem corpo.
+    As entradas expiram após `ttl` segundos e são invalidadas sempre que novas
+    análises são gravadas.
+
+    Com réplicas de leitura, as entradas são separadas por modo de leitura e
+    uma resposta lida de uma réplica não é guardada se a leitura começou
+    dentro do atraso de replicação medido após a última invalidação, pois a
+    réplica pode ainda não ter a gravação que invalidou o cache. Requisições
+    com X-Leitura: primario não usam o cache.
+
+    Args:
+        atraso_replicas: Retorna o atraso atual das réplicas em segundos
+            (por padrão, o medido pelo roteador de leitura).
+    """
+    def __init__(self, backend: CacheBackend, ttl: float = CACHE_TTL_SEGUNDOS, atraso_replicas=None):
+        self.backend = backend
+        self.__ttl = ttl
+        self.__atraso_replicas = atraso_replicas or roteador_leitura.atraso
+        # Incrementada a cada invalidação: respostas produzidas antes dela não são guardadas
+        self.__geracao = 0
+        self.__invalidado_em = float("-inf")
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def __resposta(request: Request, corpo: bytes, etag: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=corpo, media_type="application/json", headers=headers)
+
+    async def responder(self, request: Request, produzir) -> Response:
+        """
+        Retorna a resposta em cache para a URL da requisição, ou aguarda
+        `produzir()` e guarda o resultado.
+        """
+        leitura = request.headers.get("x-leitura")
+        if leitura == "primario":
+            # Leitura logo após uma gravação: não pode receber o que uma réplica deixou no cache
+            corpo = dumps(await produzir())
+            return self.__resposta(request, corpo, '"' + hashlib.sha1(corpo).hexdigest() + '"')
+
+        da_replica = bool(DATABASE_READ_URLS) and (leitura == "replica" or DB_LEITURA != "primario")
+        chave = ("replica:" if da_replica else "primario:") + str(request.url.path) + "?" + str(request.url.query)
+        valor = self.backend.obter(chave)
+        if valor is None:
+            with self.__lock:
+                geracao = self.__geracao
+            inicio = time.monotonic()
+            corpo = dumps(await produzir())
+            etag = '"' + hashlib.sha1(corpo).hexdigest() + '"'
+            valor = (corpo, etag)
+
+            # Sob o lock, para uma invalidação não acontecer entre a verificação e o salvar
+            with self.__lock:
+                recente = da_replica and inicio - self.__invalidado_em < self.__atraso_replicas()
+                if geracao == self.__geracao and not recente:
+                    self.backend.salvar(chave, valor, self.__ttl)
+
+        return self.__resposta(request, *valor)
+
+    def invalidar(self):
+        with self.__lock:
+            self.__geracao += 1
+            self.__invalidado_em = time.monotonic()
+        self.backend.limpar()
+
+
+cache_respostas = CacheRespostas(MemoryCacheBackend())
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from os import getenv
+from dotenv import load_dotenv
+from .cache import CacheBackend, MemoryCacheBackend
+from . import metricas
+
+load_dotenv()
+
+INFERENCIA_CACHE = getenv("INFERENCIA_CACHE", "true").lower() == "true"
+INFERENCIA_CACHE_MAX_ITENS = int(getenv("INFERENCIA_CACHE_MAX_ITENS", "100000"))
+INFERENCIA_CACHE_TTL_SEGUNDOS = float(getenv("INFERENCIA_CACHE_TTL_SEGUNDOS", "86400"))
+# Arquivo SQLite que mantém o cache entre reinícios; vazio guarda só em memória
+INFERENCIA_CACHE_ARQUIVO = getenv("INFERENCIA_CACHE_ARQUIVO", "")
+# Intervalo entre os registros de acertos/faltas no log do worker; 0 desativa
+INFERENCIA_CACHE_LOG_S = float(getenv("INFERENCIA_CACHE_LOG_S", "300"))
+
+def normalizar(texto: str) -> str:
+    """
+    Normaliza o texto para que variações só de espaços ou de codificação Unicode gerem a mesma chave.
+    """
+    return " ".join(unicodedata.normalize("NFKC", texto).split())
+
+def chave(texto: str, modelo: str) -> str:
+    return hashlib.sha256(f"{modelo}\0{normalizar(texto)}".encode()).hexdigest()
+
+
+class SqliteCacheBackend(CacheBackend):
+    """
+    Backend em um arquivo SQLite, para o cache sobreviver a reinícios do worker.
+
+    Os valores são gravados em JSON. A expiração usa o relógio do sistema e,
+    acima de `max_itens`, são descartadas as entradas acessadas há mais tempo.
+    """
+    def __init__(self, caminho: str, max_itens: int = INFERENCIA_CACHE_MAX_ITENS):
+        self.__max_itens = max_itens
+        self.__lock = threading.Lock()
+        self.__conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self.__conexao.execute("PRAGMA journal_mode=WAL")
+        self.__conexao.execute(
+            "CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL NOT NULL, acesso REAL NOT NULL)"
+        )
+        self.__conexao.execute("CREATE INDEX IF NOT EXISTS ix_cache_acesso ON cache (acesso)")
+
+    def obter(self, chave: str):
+        agora = time.time()
+        with self.__lock:
+            linha = self.__conexao.execute("SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                return None
+            if linha[1] < agora:
+                self.__conexao.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+                return None
+            self.__conexao.execute("UPDATE cache SET acesso = ? WHERE chave = ?", (agora, chave))
+        return json.loads(linha[0])
+
+    def salvar(self, chave: str, valor, ttl: float):
+        agora = time.time()
+        with self.__lock:
+            self.__conexao.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, expira_em, acesso) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(valor), agora + ttl, agora)
+            )
+            excedente = self.__conexao.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.__max_itens
+            if excedente > 0:
+                self.__conexao.execute(
+                    "DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY acesso LIMIT ?)", (excedente,)
+                )
+
+    def remover(self, chave: str):
+        with self.__lock:
+            self.__conexao.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def limpar(self):
+        with self.__lock:
+            self.__conexao.execute("DELETE FROM cache")
+
+    def close(self):
+        with self.__lock:
+            self.__conexao.close()
+
+
+class CacheInferencia:
+    """
+    Cache de resultados na frente de uma função de inferência.
+
+    A chave é o hash SHA-256 do texto normalizado junto com a versão do modelo
+    (o campo `modelo` gravado em AnaliseSentimento), então trocar o modelo
+    invalida o cache naturalmente. Só os textos ausentes do cache, sem
+    repetição, são enviados a `inferir`.
+
+    Args:
+        inferir: Recebe uma lista de textos e retorna um resultado por texto.
+        modelo (str | None): A versão do modelo. Se None, usa o campo "modelo"
+            dos últimos resultados retornados por `inferir`.
+        backend: Armazenamento em memória (LRU com TTL).
+        disco: Segundo nível opcional, consultado quando a memória não tem a chave.
+        intervalo_log (float): Segundos entre os registros de `estatisticas()`
+            no log; 0 desativa. Os acertos e faltas também vão para o contador
+            inferencia_cache_total de metricas.
+    """
+    def __init__(
+        self,
+        inferir,
+        modelo: str | None = None,
+        backend: CacheBackend | None = None,
+        disco: CacheBackend | None = None,
+        ttl: float = INFERENCIA_CACHE_TTL_SEGUNDOS,
+        intervalo_log: float = INFERENCIA_CACHE_LOG_S,
+    ):
+        self.__inferir = inferir
+        self.__modelo = modelo
+        self.__backend = backend or MemoryCacheBackend(INFERENCIA_CACHE_MAX_ITENS)
+        self.__disco = disco
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.__intervalo_log = intervalo_log
+        self.__ultimo_log = time.monotonic()
+
+    def __obter(self, chave: str):
+        resultado = self.__backend.obter(chave)
+        if resultado is None and self.__disco is not None:
+            resultado = self.__disco.obter(chave)
+            if resultado is not None:
+                self.__backend.salvar(chave, resultado, self.__ttl)
+        return resultado
+
+    def __salvar(self, chave: str, resultado: dict):
+        self.__backend.salvar(chave, resultado, self.__ttl)
+        if self.__disco is not None:
+            self.__disco.salvar(chave, resultado, self.__ttl)
+
+    def __call__(self, textos: list[str]) -> list[dict]:
+        resultados = [None] * len(textos)
+        # Textos ausentes do cache, cada um com as posições em que aparece no lote
+        ausentes = {}
+        if self.__modelo is not None:
+            for i, texto in enumerate(textos):
+                resultado = self.__obter(chave(texto, self.__modelo))
+                if resultado is None:
+                    ausentes.setdefault(normalizar(texto), []).append(i)
+                else:
+                    resultados[i] = resultado
+        else:
+            for i, texto in enumerate(textos):
+                ausentes.setdefault(normalizar(texto), []).append(i)
+
+        # Repetições dentro do mesmo lote também deixam de ir ao modelo
+        acertos, faltas = len(textos) - len(ausentes), len(ausentes)
+        with self.__lock:
+            self.acertos += acertos
+            self.faltas += faltas
+            registrar = self.__intervalo_log > 0 and time.monotonic() - self.__ultimo_log >= self.__intervalo_log
+            if registrar:
+                self.__ultimo_log = time.monotonic()
+        metricas.inferencia_cache_total.inc("acerto", valor=acertos)
+        metricas.inferencia_cache_total.inc("falta", valor=faltas)
+        if registrar:
+            estatisticas = self.estatisticas()
+            print(
+                f"Cache de inferência: {estatisticas['acertos']} acertos, {estatisticas['faltas']} faltas "
+                f"(taxa de acerto {estatisticas['taxa_acerto']:.1%})"
+            )
+
+        if ausentes:
+            inferidos = self.__inferir([textos[posicoes[0]] for posicoes in ausentes.values()])
+            for posicoes, resultado in zip(ausentes.values(), inferidos):
+                modelo = resultado.get("modelo") or self.__modelo
+                if modelo is not None:
+                    self.__modelo = modelo
+                    self.__salvar(chave(textos[posicoes[0]], modelo), resultado)
+                for i in posicoes:
+                    resultados[i] = resultado
+        return resultados
+
+    def estatisticas(self) -> dict:
+        with self.__lock:
+            total = self.acertos + self.faltas
+            return {
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+            }
+
+    def close(self):
+        if self.__disco is not None:
+            self.__disco.close()
+        if hasattr(self.__inferir, "close"):
+            self.__inferir.close()
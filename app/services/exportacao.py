@@ -0,0 +1,234 @@
+import argparse
+import csv
+import datetime
+import io
+import sys
+from os import getenv
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from ..database import SessionLocal, sessao_leitura
+from .. import models
+from .serializacao import dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+load_dotenv()
+
+FORMATOS = ("csv", "ndjson", "parquet")
+TIPOS_DE_CONTEUDO = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Linhas buscadas do cursor do banco e codificadas por vez (um row group no Parquet)
+EXPORTACAO_YIELD_PER = int(getenv("EXPORTACAO_YIELD_PER", "10000"))
+EXPORTACAO_COMPRESSAO = getenv("EXPORTACAO_COMPRESSAO", "zstd")
+
+COLUNAS = (
+    "analise_id", "acao_id", "event_id", "conversa", "sentimento", "score",
+    "modelo", "data_analise", "agent_id", "atendente", "user_id",
+)
+
+def validar(formato: str, start: datetime.date | None = None, end: datetime.date | None = None):
+    """
+    Raises:
+        ValueError: Se os parâmetros forem inválidos.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"formato deve ser um de {', '.join(FORMATOS)}")
+    if formato == "parquet" and pa is None:
+        raise ValueError("O formato parquet requer o pacote pyarrow")
+    if start is not None and end is not None and end < start:
+        raise ValueError("end deve ser igual ou posterior a start")
+
+def _query(start: datetime.date | None, end: datetime.date | None, agent_id: int | None, after: int | None):
+    """
+    O mesmo JOIN de /atendimento, com os IDs e a data da análise, filtrado e ordenado por analise_id.
+    """
+    analise = models.AnaliseSentimento
+    query = select(
+        analise.analise_id,
+        analise.acao_id,
+        models.Acao.event_id,
+        models.Event.descricao.label("conversa"),
+        analise.sentimento,
+        analise.score,
+        analise.modelo,
+        analise.data_analise,
+        models.Acao.agent_id,
+        models.Agent.nome.label("atendente"),
+        models.Acao.user_id,
+    ).join(models.Acao, models.Acao.event_id == models.Event.event_id) \
+        .join(analise, analise.acao_id == models.Acao.acao_id) \
+        .join(models.Agent, models.Acao.agent_id == models.Agent.agent_id)
+
+    # Dias inclusivos, como em /sentimento/tendencia
+    if start is not None:
+        query = query.where(analise.data_analise >= datetime.datetime.combine(start, datetime.time()))
+    if end is not None:
+        query = query.where(analise.data_analise < datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time()))
+    if agent_id is not None:
+        query = query.where(models.Acao.agent_id == agent_id)
+    if after is not None:
+        query = query.where(analise.analise_id > after)
+    return query.order_by(analise.analise_id)
+
+
+class _CSV:
+    def __init__(self):
+        self.__cabecalho = True
+
+    def lote(self, linhas) -> bytes:
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        if self.__cabecalho:
+            escritor.writerow(COLUNAS)
+            self.__cabecalho = False
+        escritor.writerows(linhas)
+        return saida.getvalue().encode()
+
+    def fechar(self) -> bytes:
+        # Exportação vazia ainda traz o cabeçalho
+        return self.lote([]) if self.__cabecalho else b""
+
+
+class _NDJSON:
+    def lote(self, linhas) -> bytes:
+        return b"".join(dumps(linha._asdict()) + b"\n" for linha in linhas)
+
+    def fechar(self) -> bytes:
+        return b""
+
+
+class _Parquet:
+    """
+    Grava cada lote como um row group e devolve os bytes produzidos até ali,
+    sem manter o arquivo inteiro na memória.
+    """
+    def __init__(self):
+        self.__esquema = pa.schema([
+            ("analise_id", pa.int64()),
+            ("acao_id", pa.int64()),
+            ("event_id", pa.int64()),
+            ("conversa", pa.string()),
+            ("sentimento", pa.string()),
+            ("score", pa.decimal128(5, 2)),
+            ("modelo", pa.string()),
+            ("data_analise", pa.timestamp("us")),
+            ("agent_id", pa.int64()),
+            ("atendente", pa.string()),
+            ("user_id", pa.int64()),
+        ])
+        self.__partes = []
+        self.closed = False
+        self.__escritor = pq.ParquetWriter(self, self.__esquema, compression=EXPORTACAO_COMPRESSAO)
+
+    # Interface de arquivo usada pelo ParquetWriter
+    def write(self, dados) -> int:
+        self.__partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def __retirar(self) -> bytes:
+        dados, self.__partes = b"".join(self.__partes), []
+        return dados
+
+    def lote(self, linhas) -> bytes:
+        if linhas:
+            colunas = list(zip(*linhas))
+            self.__escritor.write_table(pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, self.__esquema)],
+                schema=self.__esquema,
+            ))
+        return self.__retirar()
+
+    def fechar(self) -> bytes:
+        self.__escritor.close()
+        return self.__retirar()
+
+
+def _codificador(formato: str):
+    return {"csv": _CSV, "ndjson": _NDJSON, "parquet": _Parquet}[formato]()
+
+async def stream_exportacao(
+    formato: str,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    agent_id: int | None = None,
+    after: int | None = None,
+):
+    """
+    Gera a exportação dos atendimentos no formato pedido, com memória constante.
+
+    As linhas vêm de um cursor no servidor (yield_per), EXPORTACAO_YIELD_PER
+    por vez, e cada lote é codificado fora do event loop. Abre a própria
+    sessão de leitura, como paginacao.stream_json.
+    """
+    codificador = _codificador(formato)
+    async with (await sessao_leitura())() as db:
+        resultado = await db.stream(_query(start, end, agent_id, after).execution_options(yield_per=EXPORTACAO_YIELD_PER))
+        async for linhas in resultado.partitions():
+            yield await run_in_threadpool(codificador.lote, linhas)
+    yield codificador.fechar()
+
+def exportar(
+    saida,
+    formato: str,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    agent_id: int | None = None,
+    after: int | None = None,
+    session_factory=SessionLocal,
+) -> int:
+    """
+    Grava a exportação em um arquivo binário aberto, com memória constante.
+
+    Returns:
+        int: A quantidade de linhas exportadas.
+    """
+    validar(formato, start, end)
+    codificador = _codificador(formato)
+    total = 0
+    db = session_factory()
+    try:
+        consulta = _query(start, end, agent_id, after).execution_options(stream_results=True, yield_per=EXPORTACAO_YIELD_PER)
+        for linhas in db.execute(consulta).partitions():
+            saida.write(codificador.lote(linhas))
+            total += len(linhas)
+        saida.write(codificador.fechar())
+    finally:
+        db.close()
+    return total
+
+
+if __name__ == "__main__":
+    # python -m app.services.exportacao --formato parquet --saida atendimentos.parquet [--start 2025-01-01 --end 2025-01-31 --agent-id 7]
+    parser = argparse.ArgumentParser(description="Exporta os atendimentos (eventos, ações, análises e atendentes).")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    parser.add_argument("--saida", default="-", help="arquivo de saída; - para a saída padrão")
+    parser.add_argument("--start", type=datetime.date.fromisoformat)
+    parser.add_argument("--end", type=datetime.date.fromisoformat)
+    parser.add_argument("--agent-id", type=int)
+    parser.add_argument("--after", type=int)
+    args = parser.parse_args()
+
+    try:
+        if args.saida == "-":
+            total = exportar(sys.stdout.buffer, args.formato, args.start, args.end, args.agent_id, args.after)
+        else:
+            with open(args.saida, "wb") as arquivo:
+                total = exportar(arquivo, args.formato, args.start, args.end, args.agent_id, args.after)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{total} atendimentos exportados.", file=sys.stderr)
@@ -0,0 +1,40 @@
+import httpx
+from os import getenv
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ANALISE_URL = getenv("ANALISE_URL")
+ANALISE_TIMEOUT = float(getenv("ANALISE_TIMEOUT", "10"))
+
+class ClienteInferencia:
+    """
+    Cliente HTTP do serviço de inferência BERT.
+
+    Envia um lote de textos em uma única chamada para {ANALISE_URL}/predict/batch:
+
+        request:  {"textos": ["...", "..."]}
+        response: {"modelo": "...", "resultados": [{"sentimento": "...", "score": 0.9}, ...]}
+
+    O cliente HTTP é reutilizado entre chamadas. Para testes, um servidor falso
+    pode ser injetado com `transport=httpx.MockTransport(...)`.
+    """
+    def __init__(self, url: str | None = ANALISE_URL, timeout: float = ANALISE_TIMEOUT, transport=None):
+        if url is None:
+            raise ValueError("ANALISE_URL environment variable is not set!")
+        self.__client = httpx.Client(base_url=url, timeout=timeout, transport=transport)
+
+    def __call__(self, textos: list[str]) -> list[dict]:
+        resposta = self.__client.post("/predict/batch", json={"textos": textos})
+        resposta.raise_for_status()
+        dados = resposta.json()
+
+        resultados = dados["resultados"]
+        if len(resultados) != len(textos):
+            raise ValueError(f"Serviço de inferência retornou {len(resultados)} resultados para {len(textos)} textos")
+
+        modelo = dados.get("modelo")
+        return [{"modelo": modelo, **resultado} for resultado in resultados]
+
+    def close(self):
+        self.__client.close()
@@ -0,0 +1,164 @@
+import math
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Mesmos parâmetros do notebook research/Sentimentos_Com_Bert.ipynb
+PRE_TRAINED_MODEL_NAME = "neuralmind/bert-base-portuguese-cased"
+MAX_LEN = 160
+CLASSES = ["negativo", "neutro", "positivo"]
+
+# Caminho do classificador exportado com exportar_modelo(), ou "deterministico" para o modelo de teste
+INFERENCIA_MODELO = getenv("INFERENCIA_MODELO", "deterministico")
+INFERENCIA_WORKERS = int(getenv("INFERENCIA_WORKERS", "2"))
+# Orçamento de tokens (linhas x comprimento após padding) de cada lote enviado ao modelo
+INFERENCIA_TOKENS_POR_LOTE = int(getenv("INFERENCIA_TOKENS_POR_LOTE", "4096"))
+
+class ModeloDeterministico:
+    """
+    Modelo de teste, sem dependências, com saída determinística.
+
+    Tokeniza por palavras e decide a classe por um pequeno léxico; serve
+    para testar o MotorInferencia e o consumer sem torch nem rede.
+    """
+    nome = "deterministico-v1"
+
+    POSITIVAS = {"bom", "boa", "ótimo", "otimo", "excelente", "obrigado", "obrigada", "resolvido", "adorei", "amei", "perfeito", "rápido"}
+    NEGATIVAS = {"ruim", "péssimo", "pessimo", "horrível", "horrivel", "demora", "problema", "erro", "cancelar", "insatisfeito", "reclamação", "nunca"}
+
+    def tokenizar(self, texto: str) -> list[int]:
+        palavras = texto.lower().split()[:MAX_LEN - 2]
+        # 1 e 2 fazem o papel de [CLS] e [SEP]; 0 é o padding
+        ids = [1]
+        for palavra in palavras:
+            palavra = palavra.strip(".,!?;:")
+            if palavra in self.POSITIVAS:
+                ids.append(3)
+            elif palavra in self.NEGATIVAS:
+                ids.append(4)
+            else:
+                ids.append(5 + zlib.crc32(palavra.encode()) % 30000)
+        ids.append(2)
+        return ids
+
+    def prever(self, lote: list[list[int]]) -> list[list[float]]:
+        probabilidades = []
+        for ids in lote:
+            positivas = ids.count(3)
+            negativas = ids.count(4)
+            logits = [float(negativas), 0.5, float(positivas)]
+            total = sum(math.exp(logit) for logit in logits)
+            probabilidades.append([math.exp(logit) / total for logit in logits])
+        return probabilidades
+
+
+class ModeloBertExportado:
+    """
+    Classificador BERT do notebook exportado em TorchScript (opcionalmente quantizado).
+
+    Requer torch e transformers instalados; ambos só são importados aqui.
+    """
+    def __init__(self, caminho: str, tokenizer: str = PRE_TRAINED_MODEL_NAME):
+        import torch
+        from transformers import BertTokenizerFast
+
+        self.__torch = torch
+        self.__modelo = torch.jit.load(caminho, map_location="cpu").eval()
+        self.__tokenizer = BertTokenizerFast.from_pretrained(tokenizer)
+        self.nome = os.path.splitext(os.path.basename(caminho))[0]
+
+    def tokenizar(self, texto: str) -> list[int]:
+        return self.__tokenizer.encode(texto, add_special_tokens=True, truncation=True, max_length=MAX_LEN)
+
+    def prever(self, lote: list[list[int]]) -> list[list[float]]:
+        torch = self.__torch
+        # Padding só até o maior texto do lote, não até MAX_LEN
+        comprimento = max(len(ids) for ids in lote)
+        input_ids = torch.zeros((len(lote), comprimento), dtype=torch.long)
+        attention_mask = torch.zeros((len(lote), comprimento), dtype=torch.long)
+        for i, ids in enumerate(lote):
+            input_ids[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[i, :len(ids)] = 1
+
+        with torch.inference_mode():
+            logits = self.__modelo(input_ids, attention_mask)
+        return torch.softmax(logits, dim=1).tolist()
+
+
+def exportar_modelo(modelo, caminho: str, quantizar: bool = True):
+    """
+    Exporta o SentimentClassifier treinado no notebook para TorchScript.
+
+    Com `quantizar`, as camadas Linear são convertidas para int8 (quantização
+    dinâmica), reduzindo o tamanho e o tempo de inferência em CPU.
+    """
+    import torch
+
+    modelo = modelo.to("cpu").eval()
+    if quantizar:
+        modelo = torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+    exemplo = torch.ones((1, MAX_LEN), dtype=torch.long)
+    traced = torch.jit.trace(modelo, (exemplo, exemplo), strict=False)
+    traced.save(caminho)
+
+
+def carregar_modelo(caminho: str = INFERENCIA_MODELO):
+    if caminho == "deterministico":
+        return ModeloDeterministico()
+    return ModeloBertExportado(caminho)
+
+
+class MotorInferencia:
+    """
+    Inferência em CPU no próprio processo, com a mesma interface do ClienteInferencia.
+
+    Os textos são ordenados por comprimento e agrupados em lotes de tamanho
+    dinâmico, limitados por `tokens_por_lote`: textos curtos formam lotes
+    grandes e quase não há padding. Os lotes rodam em um pool de threads
+    próprio (o torch libera o GIL), sem bloquear quem faz I/O.
+    """
+    def __init__(self, modelo, workers: int = INFERENCIA_WORKERS, tokens_por_lote: int = INFERENCIA_TOKENS_POR_LOTE):
+        self.__modelo = modelo
+        self.__tokens_por_lote = tokens_por_lote
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="modelo")
+
+    def __lotes(self, tokens: list[list[int]]) -> list[list[int]]:
+        """
+        Agrupa os índices dos textos, já ordenados por comprimento, respeitando o orçamento de tokens.
+        """
+        ordem = sorted(range(len(tokens)), key=lambda i: len(tokens[i]))
+        lotes = []
+        lote = []
+        for i in ordem:
+            # O lote é ordenado, então o texto atual é o maior e define o padding
+            if lote and (len(lote) + 1) * len(tokens[i]) > self.__tokens_por_lote:
+                lotes.append(lote)
+                lote = []
+            lote.append(i)
+        if lote:
+            lotes.append(lote)
+        return lotes
+
+    def __call__(self, textos: list[str]) -> list[dict]:
+        tokens = [self.__modelo.tokenizar(texto) for texto in textos]
+        lotes = self.__lotes(tokens)
+        futuros = [self.__executor.submit(self.__modelo.prever, [tokens[i] for i in lote]) for lote in lotes]
+
+        resultados = [None] * len(textos)
+        for lote, futuro in zip(lotes, futuros):
+            for i, probabilidades in zip(lote, futuro.result()):
+                classe = max(range(len(CLASSES)), key=probabilidades.__getitem__)
+                resultados[i] = {
+                    "sentimento": CLASSES[classe],
+                    "score": round(probabilidades[classe], 4),
+                    "modelo": self.__modelo.nome
+                }
+        return resultados
+
+    def close(self):
+        self.__executor.shutdown(wait=True)
@@ -0,0 +1,209 @@
+import bisect
+import re
+import threading
+import time
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _rotulos(nomes: tuple, valores: tuple) -> str:
+    if not nomes:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)) + "}"
+
+
+class Contador:
+    """
+    Contador monotônico com rótulos, no formato de texto do Prometheus.
+    """
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.__rotulos = rotulos
+        self.__valores = {}
+        self.__lock = threading.Lock()
+
+    def inc(self, *rotulos, valor: float = 1):
+        with self.__lock:
+            self.__valores[rotulos] = self.__valores.get(rotulos, 0) + valor
+
+    def amostras(self) -> list[str]:
+        with self.__lock:
+            valores = list(self.__valores.items())
+        return [f"{self.nome}{_rotulos(self.__rotulos, rotulos)} {valor}" for rotulos, valor in valores]
+
+
+class Histograma:
+    """
+    Histograma com buckets fixos e rótulos, no formato de texto do Prometheus.
+
+    `observar` só incrementa um bucket (busca binária), a soma e a contagem;
+    os buckets acumulados são calculados na leitura de /metrics.
+    """
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.__rotulos = rotulos
+        self.__buckets = buckets
+        self.__series = {}
+        self.__lock = threading.Lock()
+
+    def observar(self, valor: float, *rotulos):
+        indice = bisect.bisect_left(self.__buckets, valor)
+        with self.__lock:
+            serie = self.__series.get(rotulos)
+            if serie is None:
+                # Contagem de cada bucket (o último é o +Inf), soma e total
+                serie = self.__series[rotulos] = [[0] * (len(self.__buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def amostras(self) -> list[str]:
+        with self.__lock:
+            series = [(rotulos, list(contagens), soma, total) for rotulos, (contagens, soma, total) in self.__series.items()]
+
+        nomes = self.__rotulos + ("le",)
+        linhas = []
+        for rotulos, contagens, soma, total in series:
+            acumulado = 0
+            for limite, contagem in zip(self.__buckets + ("+Inf",), contagens):
+                acumulado += contagem
+                linhas.append(f"{self.nome}_bucket{_rotulos(nomes, rotulos + (limite,))} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.__rotulos, rotulos)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.__rotulos, rotulos)} {total}")
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self.__metricas = []
+
+    def registrar(self, metrica):
+        self.__metricas.append(metrica)
+        return metrica
+
+    def gerar(self) -> str:
+        """
+        Retorna todas as métricas no formato de texto do Prometheus.
+        """
+        linhas = []
+        for metrica in self.__metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.amostras())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+http_requisicao_segundos = registro.registrar(Histograma(
+    "http_requisicao_segundos", "Latência das requisições HTTP por rota.", ("metodo", "rota", "status")
+))
+sql_execucao_segundos = registro.registrar(Histograma(
+    "sql_execucao_segundos", "Tempo de execução dos comandos SQL por operação e tabela.", ("operacao", "tabela")
+))
+sql_linhas_total = registro.registrar(Contador(
+    "sql_linhas_total", "Linhas afetadas pelos comandos SQL (quando informado pelo driver).", ("operacao", "tabela")
+))
+pool_espera_segundos = registro.registrar(Histograma(
+    "pool_espera_segundos", "Espera para obter uma conexão do pool do banco.", ("pool",)
+))
+rabbitmq_publicacao_segundos = registro.registrar(Histograma(
+    "rabbitmq_publicacao_segundos", "Latência da publicação e confirmação (Tx.Commit) de cada lote no RabbitMQ."
+))
+rabbitmq_mensagens_publicadas_total = registro.registrar(Contador(
+    "rabbitmq_mensagens_publicadas_total", "Mensagens confirmadas pelo RabbitMQ."
+))
+rabbitmq_falhas_publicacao_total = registro.registrar(Contador(
+    "rabbitmq_falhas_publicacao_total", "Falhas ao publicar no RabbitMQ por tipo de erro.", ("erro",)
+))
+inferencia_cache_total = registro.registrar(Contador(
+    "inferencia_cache_total", "Textos consultados no cache de inferência por resultado (acerto ou falta).", ("resultado",)
+))
+
+
+# Operação e tabela principal de um comando SQL, usadas como rótulos
+_PADRAO_TABELA = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+_MAX_COMANDOS = 2048
+_comandos = {}
+
+def identificar_comando(sql: str) -> tuple[str, str]:
+    """
+    Retorna (operação, tabela) de um comando SQL, com cache por texto do comando.
+
+    Os comandos vêm do cache de compilação do SQLAlchemy, então a mesma
+    string se repete e a expressão regular roda uma vez por comando distinto.
+    """
+    identificado = _comandos.get(sql)
+    if identificado is None:
+        partes = sql.split(None, 1)
+        operacao = partes[0].upper() if partes else ""
+        tabela = _PADRAO_TABELA.search(sql)
+        identificado = (operacao, tabela.group(1) if tabela else "")
+        if len(_comandos) < _MAX_COMANDOS:
+            _comandos[sql] = identificado
+    return identificado
+
+def instrumentar_engine(engine):
+    """
+    Registra os eventos que medem o tempo e as linhas de cada comando SQL.
+
+    Para o AsyncEngine, passe `async_engine.sync_engine`.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metricas_inicio = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _fim(conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_metricas_inicio", None)
+        if inicio is None:
+            return
+        operacao, tabela = identificar_comando(statement)
+        sql_execucao_segundos.observar(time.perf_counter() - inicio, operacao, tabela)
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_linhas_total.inc(operacao, tabela, valor=cursor.rowcount)
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede a latência de cada requisição HTTP.
+
+    A rota é rotulada pelo caminho declarado (ex.: /tecnico/{id}), não pela
+    URL, para manter um número fixo de séries.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            rota = getattr(scope.get("route"), "path", "<sem rota>")
+            http_requisicao_segundos.observar(time.perf_counter() - inicio, scope["method"], rota, status)
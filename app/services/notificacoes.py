@@ -0,0 +1,162 @@
+import asyncio
+import threading
+from os import getenv
+from dotenv import load_dotenv
+from .serializacao import dumps
+
+load_dotenv()
+
+# Eventos aguardando envio por assinante; acima disso os novos são descartados (e contados)
+NOTIFICACOES_FILA_MAX = int(getenv("NOTIFICACOES_FILA_MAX", "256"))
+# Conexões de notificação abertas ao mesmo tempo no processo
+NOTIFICACOES_MAX_ASSINANTES = int(getenv("NOTIFICACOES_MAX_ASSINANTES", "1000"))
+# Intervalo do comentário enviado para manter a conexão aberta em proxies
+NOTIFICACOES_KEEPALIVE_S = float(getenv("NOTIFICACOES_KEEPALIVE_S", "15"))
+
+class LimiteDeAssinantes(Exception):
+    """
+    O processo já atingiu NOTIFICACOES_MAX_ASSINANTES.
+    """
+
+
+class Assinatura:
+    """
+    Um cliente conectado e os filtros dos eventos que ele recebe.
+
+    Filtros ausentes (None) aceitam qualquer valor; os informados precisam
+    coincidir todos.
+    """
+    def __init__(self, acao_ids: set | None, agent_id: int | None, user_id: int | None, tamanho_fila: int):
+        self.acao_ids = acao_ids
+        self.agent_id = agent_id
+        self.user_id = user_id
+        self.fila = asyncio.Queue(maxsize=tamanho_fila)
+        self.__descartados = 0
+
+    def aceita(self, evento: dict) -> bool:
+        return (
+            (self.acao_ids is None or evento["acao_id"] in self.acao_ids)
+            and (self.agent_id is None or evento["agent_id"] == self.agent_id)
+            and (self.user_id is None or evento["user_id"] == self.user_id)
+        )
+
+    def entregar(self, evento: dict):
+        # Nunca bloqueia: um cliente lento perde eventos em vez de atrasar os demais
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.__descartados += 1
+
+    def retirar_descartados(self) -> int:
+        descartados, self.__descartados = self.__descartados, 0
+        return descartados
+
+
+class HubNotificacoes:
+    """
+    Distribui as análises recém-gravadas para os clientes conectados no processo.
+
+    publicar() é chamado pela thread do BufferPersistencia depois de cada
+    commit e agenda a distribuição no event loop de cada assinante, sem
+    esperar por ele. Cada assinante tem uma fila limitada própria.
+    """
+    def __init__(self, tamanho_fila: int = NOTIFICACOES_FILA_MAX, max_assinantes: int = NOTIFICACOES_MAX_ASSINANTES):
+        self.__tamanho_fila = tamanho_fila
+        self.__max_assinantes = max_assinantes
+        # event loop -> assinaturas criadas nele
+        self.__assinaturas = {}
+        self.__total = 0
+        self.__lock = threading.Lock()
+
+    def assinar(self, acao_ids: set | None = None, agent_id: int | None = None, user_id: int | None = None) -> Assinatura:
+        """
+        Registra um assinante; deve ser chamado no event loop que vai ler a fila.
+
+        Raises:
+            LimiteDeAssinantes: Se o processo já tiver NOTIFICACOES_MAX_ASSINANTES conexões.
+        """
+        assinatura = Assinatura(acao_ids, agent_id, user_id, self.__tamanho_fila)
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            if self.__total >= self.__max_assinantes:
+                raise LimiteDeAssinantes("Limite de conexões de notificação atingido")
+            self.__assinaturas.setdefault(loop, set()).add(assinatura)
+            self.__total += 1
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        with self.__lock:
+            for loop, assinaturas in list(self.__assinaturas.items()):
+                if assinatura in assinaturas:
+                    assinaturas.discard(assinatura)
+                    self.__total -= 1
+                    if not assinaturas:
+                        del self.__assinaturas[loop]
+                    return
+
+    def assinantes(self) -> int:
+        return self.__total
+
+    def publicar(self, linhas: list[dict], acoes: dict):
+        """
+        Envia as análises gravadas aos assinantes interessados.
+
+        Args:
+            linhas (list[dict]): As análises gravadas, com analise_id, acao_id, sentimento, score, modelo e data_analise.
+            acoes (dict): {acao_id: (agent_id, user_id)}, como retornado por rollups.acoes_das_linhas.
+        """
+        with self.__lock:
+            loops = [(loop, list(assinaturas)) for loop, assinaturas in self.__assinaturas.items()]
+        if not loops:
+            return
+
+        eventos = []
+        for linha in linhas:
+            agent_id, user_id = acoes.get(linha["acao_id"], (None, None))
+            eventos.append({**linha, "agent_id": agent_id, "user_id": user_id})
+
+        for loop, assinaturas in loops:
+            try:
+                loop.call_soon_threadsafe(self.__distribuir, assinaturas, eventos)
+            except RuntimeError:
+                # Event loop já encerrado; as assinaturas dele são descartadas
+                with self.__lock:
+                    self.__total -= len(self.__assinaturas.pop(loop, ()))
+
+    @staticmethod
+    def __distribuir(assinaturas: list, eventos: list):
+        for assinatura in assinaturas:
+            for evento in eventos:
+                if assinatura.aceita(evento):
+                    assinatura.entregar(evento)
+
+
+async def eventos_sse(assinatura: Assinatura, keepalive: float = NOTIFICACOES_KEEPALIVE_S):
+    """
+    Gera o stream Server-Sent Events da assinatura e a cancela quando o cliente desconecta.
+
+    Cada análise é um evento "analise", com o analise_id também no campo
+    `id` do SSE, para o cliente descartar repetições e buscar a análise; se
+    eventos forem descartados por lentidão do cliente, um evento
+    "descartados" informa a quantidade, para o cliente ressincronizar pelos
+    endpoints de listagem.
+    """
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                evento = await asyncio.wait_for(assinatura.fila.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+
+            descartados = assinatura.retirar_descartados()
+            if descartados:
+                yield b"event: descartados\ndata: " + dumps({"quantidade": descartados}) + b"\n\n"
+            id_evento = b"" if evento.get("analise_id") is None else b"id: %d\n" % evento["analise_id"]
+            yield id_evento + b"event: analise\ndata: " + dumps(evento) + b"\n\n"
+    finally:
+        hub.cancelar(assinatura)
+
+
+hub = HubNotificacoes()
@@ -0,0 +1,65 @@
+from os import getenv
+from dotenv import load_dotenv
+from ..database import sessao_leitura
+from .serializacao import dumps
+
+load_dotenv()
+
+PAGINA_TAMANHO_MAX = int(getenv("PAGINA_TAMANHO_MAX", "1000"))
+# Linhas buscadas do banco por vez nas respostas em streaming
+STREAM_YIELD_PER = int(getenv("STREAM_YIELD_PER", "500"))
+
+def paginar(query, coluna, after: int | None, limit: int | None):
+    """
+    Aplica paginação por chave (keyset) a uma query.
+
+    Em vez de OFFSET, filtra pelas linhas cuja chave é maior que o cursor
+    `after`, usando o índice da coluna ordenada.
+
+    Args:
+        query: A query SQLAlchemy.
+        coluna: A coluna única e ordenável usada como cursor (ex.: a chave primária).
+        after (int | None): O último valor de `coluna` da página anterior.
+        limit (int | None): O tamanho da página; None retorna todas as linhas.
+    """
+    if after is not None:
+        query = query.filter(coluna > after)
+    query = query.order_by(coluna)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def proximo_cursor(itens: list, limit: int | None, chave):
+    """
+    Retorna o cursor da próxima página, ou None se esta for a última.
+    """
+    if limit is None or len(itens) < limit:
+        return None
+    return chave(itens[-1])
+
+async def stream_json(consulta, converter=None, prefixo: str = "[", sufixo: str = "]", escalar: bool = True, iniciais=None):
+    """
+    Gera um array JSON linha a linha, com memória constante.
+
+    Abre a própria sessão de leitura (em uma réplica, se configurada), pois
+    o gerador é consumido depois que a requisição já retornou.
+
+    Args:
+        consulta: O select a ser percorrido.
+        converter: Converte cada linha em um objeto serializável em JSON; None codifica a linha como está.
+        escalar (bool): Se a consulta retorna entidades ORM (True) ou linhas de colunas (False).
+        iniciais: Gerador assíncrono de objetos já serializáveis, emitidos antes das linhas da consulta.
+    """
+    async with (await sessao_leitura())() as db:
+        yield prefixo.encode()
+        separador = b""
+        if iniciais is not None:
+            async for item in iniciais:
+                yield separador + dumps(item)
+                separador = b","
+        consulta = consulta.execution_options(yield_per=STREAM_YIELD_PER)
+        resultado = await (db.stream_scalars(consulta) if escalar else db.stream(consulta))
+        async for linha in resultado:
+            yield separador + dumps(converter(linha) if converter else linha)
+            separador = b","
+        yield sufixo.encode()
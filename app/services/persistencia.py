@@ -0,0 +1,241 @@
+import csv
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from os import getenv
+from dotenv import load_dotenv
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DataError, IntegrityError
+from ..database import SessionLocal
+from .. import models
+from . import rollups, scorecards
+from .cache import cache_respostas
+from .notificacoes import hub
+
+load_dotenv()
+
+# Um flush é feito ao juntar PERSISTENCIA_LOTE resultados ou após PERSISTENCIA_INTERVALO_MS
+PERSISTENCIA_LOTE = int(getenv("PERSISTENCIA_LOTE", "500"))
+PERSISTENCIA_INTERVALO_MS = int(getenv("PERSISTENCIA_INTERVALO_MS", "200"))
+# Resultados aguardando gravação; acima disso novos resultados são recusados
+PERSISTENCIA_MAX_PENDENTES = int(getenv("PERSISTENCIA_MAX_PENDENTES", "10000"))
+PERSISTENCIA_USAR_COPY = getenv("PERSISTENCIA_USAR_COPY", "true").lower() == "true"
+# Tempo máximo que uma requisição aguarda o commit do seu resultado
+PERSISTENCIA_TIMEOUT_S = float(getenv("PERSISTENCIA_TIMEOUT_S", "30"))
+
+COLUNAS = ("acao_id", "sentimento", "score", "modelo", "data_analise")
+
+class BufferPersistenciaCheio(Exception):
+    """
+    O buffer atingiu PERSISTENCIA_MAX_PENDENTES: o banco não está acompanhando.
+    """
+
+
+class BufferPersistencia:
+    """
+    Buffer write-behind para os resultados de análise.
+
+    adicionar() enfileira a linha e retorna um Future que só é concluído
+    depois do commit do lote que a contém; quem recebeu o resultado deve
+    aguardar o Future antes de confirmar o recebimento. Uma thread grava os
+    lotes com um INSERT de várias linhas (ou COPY, no PostgreSQL).
+    """
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        tamanho_lote: int = PERSISTENCIA_LOTE,
+        intervalo: float = PERSISTENCIA_INTERVALO_MS / 1000,
+        max_pendentes: int = PERSISTENCIA_MAX_PENDENTES,
+    ):
+        self.__session_factory = session_factory
+        self.__tamanho_lote = tamanho_lote
+        self.__intervalo = intervalo
+        self.__fila = queue.Queue(maxsize=max_pendentes)
+        self.__parar = threading.Event()
+        self.__thread = threading.Thread(target=self.__executar, name="persistencia", daemon=True)
+        self.__thread.start()
+
+    def adicionar(self, linha: dict) -> Future:
+        if self.__parar.is_set():
+            raise RuntimeError("Buffer de persistência já foi encerrado")
+
+        futuro = Future()
+        try:
+            self.__fila.put_nowait((linha, futuro))
+        except queue.Full:
+            raise BufferPersistenciaCheio("Buffer de persistência cheio")
+        return futuro
+
+    def pendentes(self) -> int:
+        return self.__fila.qsize()
+
+    def __proximo_lote(self) -> list:
+        try:
+            lote = [self.__fila.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        limite = time.monotonic() + self.__intervalo
+        while len(lote) < self.__tamanho_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self.__fila.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def __executar(self):
+        while not (self.__parar.is_set() and self.__fila.empty()):
+            lote = self.__proximo_lote()
+            if not lote:
+                continue
+
+            try:
+                self.__gravar_lote(lote)
+            except Exception as e:
+                # Uma falha fora da gravação (ex.: ao invalidar o cache) não pode
+                # derrubar a thread e deixar os Futures sem resposta
+                print(f"Erro inesperado ao gravar lote de {len(lote)} análises: {repr(e)}")
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+    def __gravar_lote(self, lote: list):
+        """
+        Grava o lote e conclui os Futures.
+
+        Se uma linha violar uma restrição do banco (ex.: acao_id inexistente),
+        o lote é dividido ao meio e regravado até isolá-la, e só o Future da
+        linha inválida recebe o erro. Outras falhas (banco fora do ar, por
+        exemplo) são repassadas a todo o lote.
+        """
+        linhas = [linha for linha, _ in lote]
+        try:
+            acoes = self.gravar(linhas)
+        except (IntegrityError, DataError) as e:
+            if len(lote) > 1:
+                meio = len(lote) // 2
+                self.__gravar_lote(lote[:meio])
+                self.__gravar_lote(lote[meio:])
+                return
+            print(f"Análise recusada pelo banco (acao_id {linhas[0].get('acao_id')}): {repr(e)}")
+            lote[0][1].set_exception(e)
+            return
+        except Exception as e:
+            print(f"Erro ao gravar lote de {len(linhas)} análises: {repr(e)}")
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+
+        # As respostas em cache não refletem mais o banco
+        cache_respostas.invalidar()
+        for _, futuro in lote:
+            futuro.set_result(None)
+        hub.publicar(linhas, acoes)
+
+    def gravar(self, linhas: list[dict]) -> dict:
+        """
+        Grava as linhas em cs_analise_sentimento em uma única transação,
+        junto com a atualização dos rollups de sentimento e dos scorecards.
+
+        Depois do commit, cada linha recebe o analise_id gerado pelo banco.
+
+        Returns:
+            dict: {acao_id: (agent_id, user_id)} das ações das linhas gravadas.
+        """
+        db = self.__session_factory()
+        try:
+            bind = db.get_bind()
+            if PERSISTENCIA_USAR_COPY and bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2":
+                ids = self.__copiar(db, linhas)
+            else:
+                ids = self.__inserir(db, linhas)
+            acoes = rollups.acoes_das_linhas(db, linhas)
+            rollups.atualizar(db, linhas, acoes)
+            scorecards.atualizar(db, linhas, acoes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # Só depois do commit: se o lote for regravado após uma falha, as linhas não podem levar IDs de uma tentativa desfeita
+        for linha, analise_id in zip(linhas, ids):
+            linha["analise_id"] = analise_id
+        return acoes
+
+    def __inserir(self, db, linhas: list[dict]) -> list:
+        """
+        INSERT de várias linhas; retorna os analise_id na ordem das linhas, se o banco suportar RETURNING.
+        """
+        analise = models.AnaliseSentimento
+        if not db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+            db.execute(insert(analise), linhas)
+            return [None] * len(linhas)
+        return db.execute(insert(analise).returning(analise.analise_id, sort_by_parameter_order=True), linhas).scalars().all()
+
+    def __copiar(self, db, linhas: list[dict]) -> list[int]:
+        """
+        COPY das linhas, com os analise_id reservados antes na sequência da tabela (o COPY não tem RETURNING).
+        """
+        tabela = models.AnaliseSentimento.__tablename__
+        ids = db.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:tabela, 'analise_id')) FROM generate_series(1, :quantidade)"),
+            {"tabela": tabela, "quantidade": len(linhas)}
+        ).scalars().all()
+
+        dados = io.StringIO()
+        writer = csv.writer(dados)
+        for analise_id, linha in zip(ids, linhas):
+            writer.writerow([analise_id] + ["" if linha.get(coluna) is None else linha[coluna] for coluna in COLUNAS])
+        dados.seek(0)
+
+        sql = f"COPY {tabela} (analise_id, {', '.join(COLUNAS)}) FROM STDIN WITH (FORMAT csv)"
+        conexao = db.connection().connection
+        dbapi = db.get_bind().dialect.dbapi
+        cursor = conexao.cursor()
+        try:
+            cursor.copy_expert(sql, dados)
+        except (dbapi.IntegrityError, dbapi.DataError) as e:
+            # O COPY roda direto no psycopg2: desfaz a transação e converte o erro
+            # nas exceções do SQLAlchemy, para o lote ser dividido como no INSERT
+            conexao.rollback()
+            erro = IntegrityError if isinstance(e, dbapi.IntegrityError) else DataError
+            raise erro(sql, None, e) from e
+        finally:
+            cursor.close()
+        return ids
+
+    def fechar(self, timeout: float = 10.0):
+        """
+        Grava o que ainda está no buffer e encerra a thread.
+        """
+        self.__parar.set()
+        self.__thread.join(timeout=timeout)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+def get_buffer_persistencia() -> BufferPersistencia:
+    """
+    Retorna o buffer compartilhado pelo processo, criando-o na primeira chamada.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferPersistencia()
+    return _buffer
+
+def fechar_buffer_persistencia():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.fechar()
+            _buffer = None
@@ -0,0 +1,76 @@
+import sys
+import datetime
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .. import models
+from . import services_sentimentos
+
+# Tabelas grandes que nunca devem ser lidas por inteiro nas consultas frequentes
+TABELAS_QUENTES = (models.AnaliseSentimento.__tablename__, models.Acao.__tablename__)
+
+def consultas_frequentes() -> dict:
+    """
+    As consultas dos endpoints mais usados, montadas pelas mesmas funções dos serviços.
+    """
+    analise = models.AnaliseSentimento
+    inicio = datetime.datetime(2025, 1, 1)
+    return {
+        "by-score": services_sentimentos._query_by_score(0.2, 0.4),
+        "by-data": services_sentimentos._query_by_data(inicio, inicio + datetime.timedelta(days=1)),
+        "mais-negativo": services_sentimentos._query_mais_negativo(),
+        "sentimentos-por-tecnico": select(analise).join(models.Acao).where(models.Acao.agent_id == 1),
+    }
+
+def _varreduras_postgresql(db: Session, sql: str) -> list[str]:
+    # Com seq scans desabilitados o planner só usa leitura completa se não houver índice utilizável
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plano = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+
+    varreduras = []
+    nos = [plano[0]["Plan"]]
+    while nos:
+        no = nos.pop()
+        if no["Node Type"] == "Seq Scan" and no.get("Relation Name") in TABELAS_QUENTES:
+            varreduras.append(no["Relation Name"])
+        nos.extend(no.get("Plans", []))
+    return varreduras
+
+def _varreduras_sqlite(db: Session, sql: str) -> list[str]:
+    varreduras = []
+    for *_, detalhe in db.execute(text("EXPLAIN QUERY PLAN " + sql)):
+        partes = detalhe.split()
+        if partes[0] == "SCAN" and partes[1] in TABELAS_QUENTES and "INDEX" not in partes:
+            varreduras.append(partes[1])
+    return varreduras
+
+def verificar(db: Session) -> dict:
+    """
+    Retorna, para cada consulta frequente, as tabelas quentes lidas por inteiro.
+    """
+    dialeto = db.get_bind().dialect
+    varreduras_do_plano = _varreduras_postgresql if dialeto.name == "postgresql" else _varreduras_sqlite
+
+    falhas = {}
+    for nome, query in consultas_frequentes().items():
+        sql = str(query.compile(dialect=dialeto, compile_kwargs={"literal_binds": True}))
+        varreduras = varreduras_do_plano(db, sql)
+        if varreduras:
+            falhas[nome] = varreduras
+    db.rollback()
+    return falhas
+
+
+if __name__ == "__main__":
+    # python -m app.services.plano_consultas
+    db = SessionLocal()
+    try:
+        falhas = verificar(db)
+    finally:
+        db.close()
+
+    for nome, tabelas in falhas.items():
+        print(f"{nome}: leitura completa de {', '.join(tabelas)}")
+    if falhas:
+        sys.exit(1)
+    print("Nenhuma consulta frequente faz leitura completa das tabelas.")
@@ -0,0 +1,155 @@
+import sys
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import cast, delete, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .. import models
+from . import arquivo
+
+ESCOPO_TOTAL = "total"
+ESCOPO_AGENTE = "agente"
+ESCOPO_DIA = "dia"
+
+def acoes_das_linhas(db: Session, linhas: list[dict]) -> dict:
+    """
+    Retorna {acao_id: (agent_id, user_id)} das ações das análises, em uma consulta.
+    """
+    acao_ids = {linha["acao_id"] for linha in linhas}
+    resultado = db.execute(
+        select(models.Acao.acao_id, models.Acao.agent_id, models.Acao.user_id).where(models.Acao.acao_id.in_(acao_ids))
+    )
+    return {acao_id: (agent_id, user_id) for acao_id, agent_id, user_id in resultado}
+
+def _deltas(linhas: list[dict], acoes: dict) -> dict:
+    """
+    Agrupa as análises recém-gravadas em incrementos por (escopo, chave, sentimento).
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0), 0])
+    for linha in linhas:
+        score = linha.get("score")
+        chaves = [(ESCOPO_TOTAL, "")]
+        agent_id, _ = acoes.get(linha["acao_id"], (None, None))
+        if agent_id is not None:
+            chaves.append((ESCOPO_AGENTE, str(agent_id)))
+        if linha.get("data_analise") is not None:
+            chaves.append((ESCOPO_DIA, linha["data_analise"].date().isoformat()))
+
+        for escopo, chave in chaves:
+            delta = deltas[(escopo, chave, linha["sentimento"])]
+            delta[0] += 1
+            if score is not None:
+                delta[1] += Decimal(str(score))
+                delta[2] += 1
+    return deltas
+
+def atualizar(db: Session, linhas: list[dict], acoes: dict | None = None):
+    """
+    Incrementa os rollups com as análises gravadas, na mesma transação da gravação.
+
+    Args:
+        db (Session): A sessão em que as análises foram inseridas (o commit fica com quem chamou).
+        linhas (list[dict]): As análises inseridas, com acao_id, sentimento, score e data_analise.
+        acoes (dict | None): O resultado de acoes_das_linhas, se já consultado.
+    """
+    tabela = models.SentimentoRollup.__table__
+    dialeto = db.get_bind().dialect.name
+    if acoes is None:
+        acoes = acoes_das_linhas(db, linhas)
+
+    # Ordem fixa das chaves evita deadlock entre processos gravando ao mesmo tempo
+    for (escopo, chave, sentimento), (quantidade, soma_score, com_score) in sorted(_deltas(linhas, acoes).items()):
+        valores = {
+            "escopo": escopo, "chave": chave, "sentimento": sentimento,
+            "quantidade": quantidade, "soma_score": soma_score, "com_score": com_score
+        }
+
+        if dialeto in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+            stmt = dialect_insert(tabela).values(**valores)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[tabela.c.escopo, tabela.c.chave, tabela.c.sentimento],
+                set_={
+                    "quantidade": tabela.c.quantidade + stmt.excluded.quantidade,
+                    "soma_score": tabela.c.soma_score + stmt.excluded.soma_score,
+                    "com_score": tabela.c.com_score + stmt.excluded.com_score
+                }
+            ))
+            continue
+
+        resultado = db.execute(
+            update(tabela)
+            .where(tabela.c.escopo == escopo, tabela.c.chave == chave, tabela.c.sentimento == sentimento)
+            .values(
+                quantidade=tabela.c.quantidade + quantidade,
+                soma_score=tabela.c.soma_score + soma_score,
+                com_score=tabela.c.com_score + com_score
+            )
+        )
+        if resultado.rowcount == 0:
+            db.execute(insert(tabela).values(**valores))
+
+def reconstruir(db: Session):
+    """
+    Recalcula todos os rollups a partir de cs_analise_sentimento e do arquivo frio.
+
+    Usado para corrigir divergências (ex.: análises gravadas por fora do
+    BufferPersistencia ou tabela criada depois dos dados). As análises já
+    movidas por app.services.arquivo são somadas arquivo por arquivo, então
+    o histórico arquivado não se perde; o processo precisa ver ARQUIVO_DIRETORIO.
+    """
+    tabela = models.SentimentoRollup.__table__
+    analise = models.AnaliseSentimento
+    tipo_chave = tabela.c.chave.type
+    quantidade = func.count(analise.analise_id)
+    soma_score = func.coalesce(func.sum(analise.score), 0)
+    com_score = func.count(analise.score)
+    dia = func.date(analise.data_analise)
+
+    consultas = [
+        select(literal(ESCOPO_TOTAL), literal(""), analise.sentimento, quantidade, soma_score, com_score)
+            .group_by(analise.sentimento),
+        select(literal(ESCOPO_AGENTE), cast(models.Acao.agent_id, tipo_chave), analise.sentimento, quantidade, soma_score, com_score)
+            .join(models.Acao, models.Acao.acao_id == analise.acao_id)
+            .where(models.Acao.agent_id.is_not(None))
+            .group_by(models.Acao.agent_id, analise.sentimento),
+        select(literal(ESCOPO_DIA), cast(dia, tipo_chave), analise.sentimento, quantidade, soma_score, com_score)
+            .where(analise.data_analise.is_not(None))
+            .group_by(dia, analise.sentimento),
+    ]
+
+    db.execute(delete(tabela))
+    colunas = ["escopo", "chave", "sentimento", "quantidade", "soma_score", "com_score"]
+    for consulta in consultas:
+        db.execute(insert(tabela).from_select(colunas, consulta))
+    for linhas, acoes in arquivo.lotes():
+        atualizar(db, linhas, acoes)
+
+async def contagens(db: AsyncSession, escopo: str = ESCOPO_TOTAL, chave: str = "") -> list:
+    """
+    Retorna (sentimento, quantidade) do escopo, do mais frequente para o menos frequente.
+    """
+    rollup = models.SentimentoRollup
+    resultado = await db.execute(
+        select(rollup.sentimento, rollup.quantidade)
+        .where(rollup.escopo == escopo, rollup.chave == chave, rollup.quantidade > 0)
+        .order_by(rollup.quantidade.desc())
+    )
+    return resultado.all()
+
+
+if __name__ == "__main__":
+    # python -m app.services.rollups reconstruir
+    if sys.argv[1:] != ["reconstruir"]:
+        print("Uso: python -m app.services.rollups reconstruir")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        reconstruir(db)
+        db.commit()
+        print("Rollups de sentimento reconstruídos.")
+    finally:
+        db.close()
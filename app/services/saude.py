@@ -0,0 +1,137 @@
+import asyncio
+from os import getenv
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from ..database import DATABASE_URL, DB_POOL_SIZE, async_engine, engine, roteador_leitura
+from ..producers.producer import RABBITMQ_PUBLISH_MODE, get_publicador_background, get_publisher
+from ..producers.admissao import get_controle_admissao
+from ..producers.outbox import OUTBOX_RELAY_NA_API, get_relay_outbox
+from .persistencia import get_buffer_persistencia
+
+load_dotenv()
+
+# Conexões abertas com o banco durante o aquecimento (padrão: DB_POOL_SIZE; 1 no SQLite)
+AQUECIMENTO_CONEXOES = int(getenv("AQUECIMENTO_CONEXOES", "1" if make_url(DATABASE_URL).get_backend_name() == "sqlite" else str(DB_POOL_SIZE)))
+# Tempo máximo da verificação do banco em /health/ready
+HEALTH_TIMEOUT_S = float(getenv("HEALTH_TIMEOUT_S", "2"))
+
+def _aquecer_banco_sync():
+    conexoes = [engine.connect() for _ in range(AQUECIMENTO_CONEXOES)]
+    try:
+        for conexao in conexoes:
+            conexao.execute(text("SELECT 1"))
+    finally:
+        # Fechar devolve as conexões abertas ao pool
+        for conexao in conexoes:
+            conexao.close()
+
+async def _aquecer_banco():
+    await run_in_threadpool(_aquecer_banco_sync)
+    conexoes = await asyncio.gather(*(async_engine.connect() for _ in range(AQUECIMENTO_CONEXOES)))
+    try:
+        for conexao in conexoes:
+            await conexao.execute(text("SELECT 1"))
+    finally:
+        for conexao in conexoes:
+            await conexao.close()
+
+def _aquecer_rabbitmq():
+    # As threads são iniciadas antes de conectar: com o broker fora, elas tentam novamente sozinhas
+    if RABBITMQ_PUBLISH_MODE == "thread":
+        get_publicador_background()
+    elif RABBITMQ_PUBLISH_MODE == "outbox" and OUTBOX_RELAY_NA_API:
+        # Publica também o que sobrou no outbox de execuções anteriores
+        get_relay_outbox()
+    get_controle_admissao()
+    get_publisher().aquecer()
+
+def _aquecer_senhas():
+    # A primeira verificação carrega o backend do bcrypt
+    from ..routers.create_user import pwd_context
+    pwd_context.hash("aquecimento")
+
+
+class Prontidao:
+    """
+    Aquecimento da API no startup e estado usado por /health/ready.
+
+    Cada etapa roda uma vez no startup; as obrigatórias que falharem são
+    tentadas de novo a cada verificação de prontidão, e a API só fica pronta
+    depois que todas concluírem. A cada verificação o banco e (fora do modo
+    "outbox", em que as requisições não dependem dele) o RabbitMQ são
+    consultados de novo, para uma queda depois do startup tirar a API do ar.
+    """
+    def __init__(self):
+        self.__etapas = [
+            ("banco", _aquecer_banco, True),
+            # Réplicas fora do ar não impedem a prontidão: as leituras vão para o primário
+            ("replicas", roteador_leitura.verificar_todas, False),
+            ("persistencia", lambda: run_in_threadpool(get_buffer_persistencia), True),
+            ("rabbitmq", lambda: run_in_threadpool(_aquecer_rabbitmq), RABBITMQ_PUBLISH_MODE != "outbox"),
+            ("senhas", lambda: run_in_threadpool(_aquecer_senhas), False),
+        ]
+        self.__estado = {}
+        self.__aquecido = False
+        self.__encerrando = False
+        self.__lock = asyncio.Lock()
+
+    async def __executar(self, nome: str, etapa):
+        try:
+            await etapa()
+            self.__estado[nome] = "ok"
+        except Exception as e:
+            print(f"Falha no aquecimento ({nome}): {repr(e)}")
+            self.__estado[nome] = f"erro: {repr(e)}"
+
+    async def aquecer(self):
+        for nome, etapa, _ in self.__etapas:
+            await self.__executar(nome, etapa)
+        self.__aquecido = True
+
+    def encerrar(self):
+        """
+        Marca a API como não pronta, para o orquestrador parar de enviar tráfego.
+        """
+        self.__encerrando = True
+
+    async def verificar(self) -> tuple[bool, dict]:
+        """
+        Retorna se a API está pronta para receber tráfego e o estado de cada etapa.
+        """
+        if self.__encerrando or not self.__aquecido:
+            return False, {"status": "encerrando" if self.__encerrando else "aquecendo", **self.__estado}
+
+        async with self.__lock:
+            for nome, etapa, obrigatoria in self.__etapas:
+                if obrigatoria and self.__estado.get(nome) != "ok":
+                    await self.__executar(nome, etapa)
+
+        async def ping():
+            async with async_engine.connect() as conexao:
+                await conexao.execute(text("SELECT 1"))
+
+        try:
+            await asyncio.wait_for(ping(), timeout=HEALTH_TIMEOUT_S)
+            banco = "ok"
+        except Exception as e:
+            banco = f"erro: {repr(e)}"
+
+        estado = {**self.__estado, "banco": banco}
+        if RABBITMQ_PUBLISH_MODE != "outbox" and estado.get("rabbitmq") == "ok":
+            try:
+                await asyncio.wait_for(run_in_threadpool(get_publisher().verificar), timeout=HEALTH_TIMEOUT_S)
+            except Exception as e:
+                estado["rabbitmq"] = f"erro: {repr(e)}"
+
+        pronto = banco == "ok" and all(
+            estado.get(nome) == "ok" for nome, _, obrigatoria in self.__etapas if obrigatoria
+        )
+        detalhes = {"status": "pronto" if pronto else "indisponivel", **estado}
+        if roteador_leitura.estado():
+            detalhes["replicas"] = roteador_leitura.estado()
+        return pronto, detalhes
+
+
+prontidao = Prontidao()
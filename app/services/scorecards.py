@@ -0,0 +1,238 @@
+import sys
+from decimal import Decimal
+from os import getenv
+from dotenv import load_dotenv
+from sqlalchemy import Float, and_, case, cast, delete, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from .. import models
+from . import arquivo
+from .rollups import acoes_das_linhas
+
+load_dotenv()
+
+TIPO_AGENTE = "agente"
+TIPO_CLIENTE = "cliente"
+TIPOS = (TIPO_AGENTE, TIPO_CLIENTE)
+SENTIMENTOS = ("positivo", "neutro", "negativo")
+ORDENS = ("score_medio", "score_minimo", "total", "ultima_analise") + SENTIMENTOS
+
+# Quantidade máxima de IDs em uma consulta de scorecards
+SCORECARD_MAX_IDS = int(getenv("SCORECARD_MAX_IDS", "1000"))
+
+def validar(tipo: str, ids: list[int] | None = None, ordem: str | None = None):
+    """
+    Raises:
+        ValueError: Se os parâmetros forem inválidos.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo deve ser um de {', '.join(TIPOS)}")
+    if ids is not None and not 1 <= len(ids) <= SCORECARD_MAX_IDS:
+        raise ValueError(f"Informe de 1 a {SCORECARD_MAX_IDS} ids")
+    if ordem is not None and ordem not in ORDENS:
+        raise ValueError(f"ordem deve ser uma de {', '.join(ORDENS)}")
+
+def _deltas(linhas: list[dict], acoes: dict) -> dict:
+    """
+    Agrupa as análises recém-gravadas em incrementos por (tipo, entidade_id).
+    """
+    deltas = {}
+    for linha in linhas:
+        agent_id, user_id = acoes.get(linha["acao_id"], (None, None))
+        sentimento = linha["sentimento"].lower()
+        score = Decimal(str(linha["score"])) if linha.get("score") is not None else None
+        data_analise = linha.get("data_analise")
+
+        for tipo, entidade_id in ((TIPO_AGENTE, agent_id), (TIPO_CLIENTE, user_id)):
+            if entidade_id is None:
+                continue
+            delta = deltas.get((tipo, entidade_id))
+            if delta is None:
+                delta = deltas[(tipo, entidade_id)] = {
+                    "total": 0, **{s: 0 for s in SENTIMENTOS}, "soma_score": Decimal(0), "com_score": 0,
+                    "score_minimo": None, "ultima_analise": None,
+                }
+            delta["total"] += 1
+            if sentimento in SENTIMENTOS:
+                delta[sentimento] += 1
+            if score is not None:
+                delta["soma_score"] += score
+                delta["com_score"] += 1
+                if delta["score_minimo"] is None or score < delta["score_minimo"]:
+                    delta["score_minimo"] = score
+            if data_analise is not None and (delta["ultima_analise"] is None or data_analise > delta["ultima_analise"]):
+                delta["ultima_analise"] = data_analise
+    return deltas
+
+def _menor(atual, novo):
+    # min() de duas colunas ignorando NULL, igual no PostgreSQL e no SQLite
+    return case((atual.is_(None), novo), (novo < atual, novo), else_=atual)
+
+def _maior(atual, novo):
+    return case((atual.is_(None), novo), (novo > atual, novo), else_=atual)
+
+def atualizar(db: Session, linhas: list[dict], acoes: dict | None = None):
+    """
+    Incrementa os scorecards com as análises gravadas, na mesma transação da gravação.
+
+    Args:
+        db (Session): A sessão em que as análises foram inseridas (o commit fica com quem chamou).
+        linhas (list[dict]): As análises inseridas, com acao_id, sentimento, score e data_analise.
+        acoes (dict | None): O resultado de rollups.acoes_das_linhas, se já consultado.
+    """
+    tabela = models.Scorecard.__table__
+    dialeto = db.get_bind().dialect.name
+    if acoes is None:
+        acoes = acoes_das_linhas(db, linhas)
+    somas = ("total",) + SENTIMENTOS + ("soma_score", "com_score")
+
+    # Ordem fixa das chaves evita deadlock entre processos gravando ao mesmo tempo
+    for (tipo, entidade_id), delta in sorted(_deltas(linhas, acoes).items()):
+        valores = {"tipo": tipo, "entidade_id": entidade_id, **delta}
+
+        if dialeto in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+            stmt = dialect_insert(tabela).values(**valores)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[tabela.c.tipo, tabela.c.entidade_id],
+                set_={
+                    **{coluna: tabela.c[coluna] + stmt.excluded[coluna] for coluna in somas},
+                    "score_minimo": _menor(tabela.c.score_minimo, stmt.excluded.score_minimo),
+                    "ultima_analise": _maior(tabela.c.ultima_analise, stmt.excluded.ultima_analise),
+                }
+            ))
+            continue
+
+        resultado = db.execute(
+            update(tabela)
+            .where(tabela.c.tipo == tipo, tabela.c.entidade_id == entidade_id)
+            .values(
+                **{coluna: tabela.c[coluna] + delta[coluna] for coluna in somas},
+                score_minimo=_menor(tabela.c.score_minimo, literal(delta["score_minimo"], tabela.c.score_minimo.type)),
+                ultima_analise=_maior(tabela.c.ultima_analise, literal(delta["ultima_analise"], tabela.c.ultima_analise.type)),
+            )
+        )
+        if resultado.rowcount == 0:
+            db.execute(insert(tabela).values(**valores))
+
+def reconstruir(db: Session):
+    """
+    Recalcula todos os scorecards a partir de cs_analise_sentimento e do arquivo frio.
+
+    Usado para corrigir divergências (ex.: análises gravadas por fora do
+    BufferPersistencia). As análises arquivadas entram com o agent_id e o
+    user_id gravados no arquivo; o processo precisa ver ARQUIVO_DIRETORIO.
+    """
+    tabela = models.Scorecard.__table__
+    analise = models.AnaliseSentimento
+    sentimento = func.lower(analise.sentimento)
+
+    db.execute(delete(tabela))
+    colunas = ["tipo", "entidade_id", "total", *SENTIMENTOS, "soma_score", "com_score", "score_minimo", "ultima_analise"]
+    for tipo, coluna in ((TIPO_AGENTE, models.Acao.agent_id), (TIPO_CLIENTE, models.Acao.user_id)):
+        consulta = select(
+            literal(tipo),
+            coluna,
+            func.count(analise.analise_id),
+            *(func.sum(case((sentimento == s, 1), else_=0)) for s in SENTIMENTOS),
+            func.coalesce(func.sum(analise.score), 0),
+            func.count(analise.score),
+            func.min(analise.score),
+            func.max(analise.data_analise),
+        ).join(models.Acao, models.Acao.acao_id == analise.acao_id).where(coluna.is_not(None)).group_by(coluna)
+        db.execute(insert(tabela).from_select(colunas, consulta))
+    for linhas, acoes in arquivo.lotes():
+        atualizar(db, linhas, acoes)
+
+def _entidade(tipo: str):
+    """
+    Retorna (coluna de id, coluna de nome, nome do campo de id na resposta) do tipo.
+    """
+    if tipo == TIPO_AGENTE:
+        return models.Agent.agent_id, models.Agent.nome, "agent_id"
+    return models.User.user_id, models.User.name, "user_id"
+
+def _colunas():
+    scorecard = models.Scorecard
+    score_medio = cast(scorecard.soma_score, Float) / func.nullif(scorecard.com_score, 0)
+    return score_medio, [
+        scorecard.total,
+        *(scorecard.__table__.c[s] for s in SENTIMENTOS),
+        score_medio.label("score_medio"),
+        scorecard.score_minimo,
+        scorecard.ultima_analise,
+    ]
+
+def _item(campo_id: str, entidade_id: int, nome, total, positivo, neutro, negativo, score_medio, score_minimo, ultima_analise) -> dict:
+    return {
+        campo_id: entidade_id,
+        "nome": nome,
+        "total": total or 0,
+        "sentimentos": {"positivo": positivo or 0, "neutro": neutro or 0, "negativo": negativo or 0},
+        "score_medio": round(score_medio, 4) if score_medio is not None else None,
+        "score_minimo": score_minimo,
+        "ultima_analise": ultima_analise,
+    }
+
+async def buscar(db: AsyncSession, tipo: str, ids: list[int]) -> list[dict]:
+    """
+    Retorna os scorecards dos técnicos ou clientes em `ids`, em uma consulta.
+
+    Entidades sem análises voltam com total 0; IDs inexistentes ficam de fora.
+    """
+    coluna_id, coluna_nome, campo_id = _entidade(tipo)
+    scorecard = models.Scorecard
+    _, colunas = _colunas()
+
+    resultado = await db.execute(
+        select(coluna_id, coluna_nome, *colunas)
+        .outerjoin(scorecard, and_(scorecard.tipo == tipo, scorecard.entidade_id == coluna_id))
+        .where(coluna_id.in_(set(ids)))
+        .order_by(coluna_id)
+    )
+    return [_item(campo_id, *linha) for linha in resultado]
+
+async def ranking(
+    db: AsyncSession,
+    tipo: str,
+    ordem: str = "score_medio",
+    decrescente: bool = True,
+    limit: int = 20,
+    minimo_analises: int = 1,
+) -> list[dict]:
+    """
+    Retorna os scorecards do tipo ordenados por `ordem`, em uma consulta.
+
+    `minimo_analises` evita que entidades com poucas análises dominem a
+    ordenação por score. Valores nulos ficam sempre no fim.
+    """
+    coluna_id, coluna_nome, campo_id = _entidade(tipo)
+    scorecard = models.Scorecard
+    score_medio, colunas = _colunas()
+    criterio = score_medio if ordem == "score_medio" else scorecard.__table__.c[ordem]
+
+    resultado = await db.execute(
+        select(scorecard.entidade_id, coluna_nome, *colunas)
+        .outerjoin(coluna_id.table, coluna_id == scorecard.entidade_id)
+        .where(scorecard.tipo == tipo, scorecard.total >= minimo_analises)
+        .order_by((criterio.desc() if decrescente else criterio.asc()).nulls_last(), scorecard.entidade_id)
+        .limit(limit)
+    )
+    return [_item(campo_id, *linha) for linha in resultado]
+
+
+if __name__ == "__main__":
+    # python -m app.services.scorecards reconstruir
+    if sys.argv[1:] != ["reconstruir"]:
+        print("Uso: python -m app.services.scorecards reconstruir")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        reconstruir(db)
+        db.commit()
+        print("Scorecards reconstruídos.")
+    finally:
+        db.close()
@@ -0,0 +1,46 @@
+import json
+from decimal import Decimal
+from fastapi import Response
+from fastapi.encoders import decimal_encoder, jsonable_encoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _converter(valor):
+    """
+    Converte os tipos que o encoder não conhece (Decimal, modelos Pydantic, ...).
+    """
+    if isinstance(valor, Decimal):
+        return decimal_encoder(valor)
+    return jsonable_encoder(valor)
+
+def dumps(valor) -> bytes:
+    """
+    Codifica em JSON (bytes) com o orjson, se instalado.
+
+    Listas, dicts, números, strings e datas são codificados diretamente;
+    só os demais tipos passam pelo jsonable_encoder. O resultado é o mesmo
+    do jsonable_encoder seguido de json.dumps.
+    """
+    if orjson is not None:
+        return orjson.dumps(valor, default=_converter)
+    return json.dumps(valor, default=_converter, separators=(",", ":")).encode()
+
+def linhas(resultado, colunas: list[str] | None = None) -> list[dict]:
+    """
+    Converte as linhas de um select de colunas em dicts, sem instanciar objetos ORM ou Pydantic.
+    """
+    colunas = colunas or list(resultado.keys())
+    return [dict(zip(colunas, linha)) for linha in resultado]
+
+
+class RespostaJSON(Response):
+    """
+    Resposta JSON codificada com `dumps`, sem validação pelo response_model.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -1,36 +1,177 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 
 from app.schemas import Agent, Atendimento, SentimentoRecorrente, User
+from app import schemas
 from .. import models
-from ..producers.producer import RabbitMQProducer
+from ..producers.producer import ACOES_POR_MENSAGEM, RABBITMQ_PUBLISH_MODE, get_publicador_background, get_publisher
+from ..producers.producer import FilaDePublicacaoCheia
+from ..producers import outbox
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError
+from pydantic import ValidationError
+from os import getenv
+from concurrent.futures import Future
+from datetime import date, datetime, time
+import heapq
+from .persistencia import get_buffer_persistencia
+from .paginacao import paginar, stream_json
+from . import arquivo, rollups, scorecards
+from . import serializacao
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool
 from app.models import AnaliseSentimento
 from app.models import Acao
 
-# salvar analise 
-def save_analise(db: Session, analise: models.AnaliseSentimento):
+# enviar ação para análise
+async def enviar_menssagem(acao: schemas.Acao, db: AsyncSession, routing_key: str | None = None):
+    """
+    Publica a ação na fila para que o consumer realize a análise de sentimento.
 
-    publisher = RabbitMQProducer()
-    
-    publisher.send_menssage(db.descricao)
-    
-    publisher.close_connection()  
+    No modo "thread" a mensagem é apenas entregue à thread publicadora e a
+    função retorna imediatamente; no modo "sync" a publicação é aguardada
+    em uma thread do threadpool, sem bloquear o event loop; no modo "outbox"
+    a ação é gravada em cs_outbox e publicada depois pelo RelayOutbox.
+
+    Args:
+        acao (schemas.Acao): A ação cuja descrição será analisada.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
+        routing_key (str | None): A routing key definida pelo controle de admissão; None usa a padrão.
+
+    Raises:
+        FilaDePublicacaoCheia: Se a fila da thread publicadora estiver cheia.
+    """
+    body = jsonable_encoder(acao)
+    if RABBITMQ_PUBLISH_MODE == "outbox":
+        await outbox.gravar(db, [body], routing_key)
+    elif RABBITMQ_PUBLISH_MODE == "sync":
+        await run_in_threadpool(get_publisher().publicar, body, routing_key)
+    else:
+        get_publicador_background().enfileirar(body, routing_key)
+
+# enviar lote de ações para análise
+async def enviar_lote_menssagens(itens: list, db: AsyncSession, routing_key: str | None = None):
+    """
+    Valida um lote de ações e publica as válidas em mensagens agrupadas.
+
+    Cada mensagem publicada contém uma lista JSON com até ACOES_POR_MENSAGEM
+    ações, em vez de uma mensagem por ação. No modo "outbox" todas as ações
+    válidas são gravadas em cs_outbox em um único commit.
+
+    Args:
+        itens (list): Os objetos JSON recebidos, ainda não validados, ou as linhas NDJSON (bytes) ainda não decodificadas.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
+        routing_key (str | None): A routing key definida pelo controle de admissão; None usa a padrão.
+
+    Returns:
+        schemas.ResultadoLote: O resultado (aceito/rejeitado) de cada item, na ordem recebida.
+    """
+    resultados = []
+    validos = []
+    for indice, item in enumerate(itens):
+        try:
+            if isinstance(item, bytes):
+                acao = schemas.Acao.model_validate_json(item)
+            else:
+                acao = schemas.Acao.model_validate(item)
+        except ValidationError as e:
+            resultados.append(schemas.ResultadoItemLote(
+                indice=indice,
+                status="rejeitado",
+                erros=jsonable_encoder(e.errors(include_url=False, include_context=False))
+            ))
+            continue
+        resultado = schemas.ResultadoItemLote(indice=indice, status="aceito", acao_id=acao.acao_id)
+        resultados.append(resultado)
+        validos.append((resultado, jsonable_encoder(acao)))
+
+    # No modo outbox o lote inteiro é um único grupo, gravado em uma transação
+    tamanho_grupo = max(len(validos), 1) if RABBITMQ_PUBLISH_MODE == "outbox" else ACOES_POR_MENSAGEM
+    for inicio in range(0, len(validos), tamanho_grupo):
+        grupo = validos[inicio:inicio + tamanho_grupo]
+        body = [acao for _, acao in grupo]
+        try:
+            if RABBITMQ_PUBLISH_MODE == "outbox":
+                await outbox.gravar(db, body, routing_key)
+            elif RABBITMQ_PUBLISH_MODE == "sync":
+                await run_in_threadpool(get_publisher().publicar, body, routing_key)
+            else:
+                get_publicador_background().enfileirar(body, routing_key)
+        except FilaDePublicacaoCheia:
+            motivo = "Fila de publicação cheia"
+        except Exception as e:
+            print(f"Erro ao publicar lote de ações: {repr(e)}")
+            motivo = "Erro ao publicar a mensagem"
+        else:
+            continue
+
+        for resultado, _ in grupo:
+            resultado.status = "rejeitado"
+            resultado.erros = [motivo]
+
+    aceitos = sum(1 for resultado in resultados if resultado.status == "aceito")
+    return schemas.ResultadoLote(
+        aceitos=aceitos,
+        rejeitados=len(resultados) - aceitos,
+        resultados=resultados
+    )
+
+def _linha_resultado(dados: dict) -> dict:
+    acao_id = dados.get("acao_id")
+    resultado = dados.get("resultado")
+    if not isinstance(acao_id, int) or not isinstance(resultado, dict) or not resultado.get("sentimento"):
+        raise ValueError("acao_id e resultado.sentimento são obrigatórios.")
+
+    return {
+        "acao_id": acao_id,
+        "sentimento": resultado["sentimento"],
+        "score": resultado.get("score"),
+        "modelo": resultado.get("modelo"),
+        "data_analise": datetime.now()
+    }
+
+# salvar resultados recebidos do consumer
+def salvar_resultados(itens: list[dict]) -> list[Future]:
+    """
+    Enfileira os resultados de um micro-lote do consumer no buffer de persistência.
+
+    Todos os itens são validados antes de enfileirar o primeiro, então um
+    item inválido não deixa o restante do lote gravado pela metade.
+
+    Args:
+        itens (list[dict]): Os payloads recebidos do consumer, com acao_id, texto e resultado.
+
+    Returns:
+        list[Future]: Um por item, concluídos quando o resultado estiver gravado no banco.
+
+    Raises:
+        ValueError: Se algum item não tiver os campos obrigatórios.
+        BufferPersistenciaCheio: Se o banco não estiver acompanhando o volume recebido.
+    """
+    linhas = [_linha_resultado(dados) for dados in itens]
+    buffer = get_buffer_persistencia()
+    return [buffer.adicionar(linha) for linha in linhas]
+
+# Colunas de cs_analise_sentimento retornadas pelos endpoints; selecionar as colunas
+# em vez da entidade evita instanciar objetos ORM e carregar relacionamentos
+COLUNAS_ANALISE = list(models.AnaliseSentimento.__table__.columns)
 
 # Pegar sentimentos
-def get_sentimentos(db: Session):
+async def get_sentimentos(db: AsyncSession, after: int | None = None, limit: int | None = None):
     """
-    Recupera todos os sentimentos.
+    Recupera os sentimentos, paginados pelo analise_id.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
+        after (int | None): Retorna apenas análises com analise_id maior que este cursor.
+        limit (int | None): Quantidade máxima de registros; None retorna todos.
 
     Returns:
-        list[models.AnaliseSentimento]: Uma lista de todos os registros de AnaliseSentimento.
+        list[dict]: As colunas de cada registro de AnaliseSentimento.
     """
     try: 
-        return db.query(models.AnaliseSentimento).all()
+        resultado = await db.execute(paginar(select(*COLUNAS_ANALISE), models.AnaliseSentimento.analise_id, after, limit))
+        return serializacao.linhas(resultado)
     
     except NoResultFound:
         raise Exception("Nenhum sentimento encontrado")
@@ -38,50 +179,57 @@ def get_sentimentos(db: Session):
     except SQLAlchemyError:
         raise Exception("Erro ao buscar os sentimentos")
 
+def stream_sentimentos(after: int | None = None):
+    """
+    Gera o JSON de todos os sentimentos a partir do cursor, com memória constante.
+    """
+    return stream_json(
+        paginar(select(*COLUNAS_ANALISE), models.AnaliseSentimento.analise_id, after, None),
+        lambda row: row._asdict(),
+        escalar=False
+    )
+
 # sentimentos recorrentes
-def sentimentos_recorrentes(db: Session):
+async def sentimentos_recorrentes(db: AsyncSession):
     """
-    Recupera todos os sentimentos.
+    Recupera a quantidade de análises de cada sentimento, a partir dos rollups.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
 
     Returns:
-        list[models.AnaliseSentimento]: Uma lista de todos os registros de AnaliseSentimento.
+        dict: Os sentimentos e suas quantidades, do mais frequente para o menos frequente.
     """
     try: 
-        results = db.query(
-                models.AnaliseSentimento.sentimento,
-                func.count(models.AnaliseSentimento.sentimento).label("count")
-                ).group_by(models.AnaliseSentimento.sentimento)\
-                        .order_by(func.count(models.AnaliseSentimento.sentimento).desc())\
-                        .all()
+        results = await rollups.contagens(db)
     except NoResultFound: 
         raise Exception("Nenhum sentimento encontrado")
     
     except SQLAlchemyError:
         raise Exception("Erro ao buscar os sentimentos")
 
-    data = [SentimentoRecorrente(sentimento=sentimento, count=count) for sentimento, count in results]
-    return jsonable_encoder({"sentimento": data})
+    return {"sentimento": [{"sentimento": sentimento, "count": count} for sentimento, count in results]}
 
 # Sentimentos do técnico por id
-def get_sentimentos_por_id(id: int, db: Session):
+async def get_sentimentos_por_id(id: int, db: AsyncSession):
     """
     Recupera os sentimentos associados a um técnico específico.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
         tecnico_id (int): O ID do técnico.
 
     Returns:
-        list[models.AnaliseSentimento]: Uma lista de registros de AnaliseSentimento associados ao técnico.
+        list[dict]: As colunas dos registros de AnaliseSentimento associados ao técnico.
     """
     try: 
         if not id or id <= 0:
             raise Exception("ID inválido")
         
-        return db.query(models.AnaliseSentimento).join(models.Acao).filter(models.Acao.agent_id == id).all()
+        resultado = await db.execute(
+            select(*COLUNAS_ANALISE).join(models.Acao).where(models.Acao.agent_id == id)
+        )
+        return serializacao.linhas(resultado)
     
     except NoResultFound: 
         raise Exception("Nenhum sentimento encontrado")
@@ -90,27 +238,34 @@ def get_sentimentos_por_id(id: int, db: Session):
         raise Exception("Erro ao buscar os sentimentos")
 
 # retornar uma lista de atendimentos incluindo informações como conversa o sentimento.
-def get_atendimento(db: Session):
+def _query_atendimento(after: int | None, limit: int | None):
+    query = select(
+            models.AnaliseSentimento.analise_id,
+            models.Event.descricao.label("conversa"),
+            models.AnaliseSentimento.score,
+            models.AnaliseSentimento.sentimento.label("termo"),
+            models.AnaliseSentimento.sentimento.label("sentimento_mais"),
+            models.Agent.nome.label("atendente"),
+            models.AnaliseSentimento.sentimento.label("sentimento_atendente")
+            ).join(models.Acao, models.Acao.event_id == models.Event.event_id) \
+                    .join(models.AnaliseSentimento, models.AnaliseSentimento.acao_id == models.Acao.acao_id) \
+                    .join(models.Agent, models.Acao.agent_id == models.Agent.agent_id)
+    return paginar(query, models.AnaliseSentimento.analise_id, after, limit)
+
+async def get_atendimento(db: AsyncSession, after: int | None = None, limit: int | None = None):
     """
     Recupera informações de atendimento incluindo conversas, sentimentos, atendentes, etc.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
+        after (int | None): Retorna apenas atendimentos com analise_id maior que este cursor.
+        limit (int | None): Quantidade máxima de registros; None retorna todos.
 
     Returns:
-        list[tuple]: Uma lista de tuplas contendo informações de atendimento.
+        dict: Os atendimentos em "sentimento", um dict por linha.
     """
     try: 
-        results = db.query(
-                models.Event.descricao.label("conversa"),
-                models.AnaliseSentimento.score,
-                models.AnaliseSentimento.sentimento.label("termo"),
-                models.AnaliseSentimento.sentimento.label("sentimento_mais"),
-                models.Agent.nome.label("atendente"),
-                models.AnaliseSentimento.sentimento.label("sentimento_atendente")
-                ).join(models.Acao, models.Acao.event_id == models.Event.event_id) \
-                        .join(models.AnaliseSentimento, models.AnaliseSentimento.acao_id == models.Acao.acao_id) \
-                        .join(models.Agent, models.Acao.agent_id == models.Agent.agent_id).all()
+        resultado = await db.execute(_query_atendimento(after, limit))
                         
     except NoResultFound: 
         raise Exception("Nenhum sentimento encontrado")
@@ -118,104 +273,159 @@ def get_atendimento(db: Session):
     except SQLAlchemyError:
         raise Exception("Erro ao buscar os sentimentos")
 
-    data = [Atendimento(**row._mapping) for row in results]
-    return jsonable_encoder({"sentimento": data})
+    return {"sentimento": serializacao.linhas(resultado)}
+
+def stream_atendimento(after: int | None = None):
+    """
+    Gera o JSON de todos os atendimentos a partir do cursor, com memória constante.
+    """
+    return stream_json(
+        _query_atendimento(after, None),
+        lambda row: row._asdict(),
+        prefixo='{"sentimento":[',
+        sufixo="]}",
+        escalar=False
+    )
+
+async def _perfil(tipo: str, id: int, db: AsyncSession) -> dict:
+    """
+    Lê o scorecard da entidade e retorna o sentimento predominante e o score médio.
+
+    Raises:
+        HTTPException: 404 se a entidade não existir ou não tiver análises.
+    """
+    if not id or id <= 0:
+        raise HTTPException(status_code=404, detail="ID inválido")
+
+    try:
+        encontrados = await scorecards.buscar(db, tipo, [id])
+    except SQLAlchemyError:
+        raise Exception("Erro ao buscar os sentimentos")
+
+    if not encontrados or not encontrados[0]["total"]:
+        raise HTTPException(status_code=404, detail="Nenhum sentimento encontrado")
+
+    scorecard = encontrados[0]
+    sentimentos = {nome: quantidade for nome, quantidade in scorecard["sentimentos"].items() if quantidade}
+    predominante = max(sentimentos, key=sentimentos.get) if sentimentos else "indefinido"
+    return {"nome": scorecard["nome"], "sentimento": predominante, "score": scorecard["score_medio"] or 0.0}
 
 # Buscar técnico por id
-def get_tecnico(id: int, db: Session):
+async def get_tecnico(id: int, db: AsyncSession):
     """
-    Recupera informações de um técnico específico.
+    Recupera o perfil de sentimento de um técnico, a partir do scorecard.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
         tecnico_id (int): O ID do técnico.
 
     Returns:
-        models.Agent | None: As informações do técnico ou None se não encontrado.
+        Agent: O sentimento predominante nos atendimentos do técnico e o score médio.
     """
-    try: 
-        if not id or id <= 0:
-            raise Exception("ID inválido")
-        
-        agente = db.query(
-                models.Agent.nome.label("atendente"),
-                models.AnaliseSentimento.sentimento.label("sentimento"),
-                models.AnaliseSentimento.sentimento.label("sentimento_clientes"),
-                models.AnaliseSentimento.sentimento.label("termo"),
-                models.AnaliseSentimento.score
-                ).join(models.Acao, models.Acao.agent_id == models.Agent.agent_id)\
-                        .join(models.AnaliseSentimento, models.AnaliseSentimento.acao_id == models.Acao.acao_id)\
-                        .filter(models.Agent.agent_id == id).first()
-
-        
-    except NoResultFound or agente == None: 
-        raise Exception("Nenhum sentimento encontrado")
-    
-    except SQLAlchemyError:
-        raise Exception("Erro ao buscar os sentimentos")
-
-    return Agent(**agente._asdict())
+    perfil = await _perfil(scorecards.TIPO_AGENTE, id, db)
+    return Agent(
+        atendente=perfil["nome"] or "",
+        sentimento=perfil["sentimento"],
+        sentimento_clientes=perfil["sentimento"],
+        termo=perfil["sentimento"],
+        score=perfil["score"],
+    )
 
 # Buscar cliente por id 
 
-def get_cliente(id: int, db: Session):
+async def get_cliente(id: int, db: AsyncSession):
     """
-    Recupera informações de um cliente específico.
+    Recupera o perfil de sentimento de um cliente, a partir do scorecard.
 
     Args:
-        db (Session): A sessão do banco de dados SQLAlchemy.
+        db (AsyncSession): A sessão do banco de dados SQLAlchemy.
         cliente_id (int): O ID do cliente.
 
     Returns:
-        models.User | None: As informações do cliente ou None se não encontrado.
+        User: O sentimento predominante nas ações do cliente e o score médio.
     """
-    
-    try: 
-        if not id or id <= 0:
-            raise Exception("ID inválido")
-            
-        cliente = db.query(
-                models.User.name.label("cliente"),
-                models.AnaliseSentimento.sentimento,
-                models.AnaliseSentimento.sentimento.label("termo"),
-                models.AnaliseSentimento.score
-                ).join(models.Acao, models.Acao.user_id == models.User.user_id)\
-                        .join(models.AnaliseSentimento, models.AnaliseSentimento.acao_id == models.Acao.acao_id)\
-                        .filter(models.User.user_id == id).first()
-
-    except NoResultFound or cliente == None: 
-        raise Exception("Nenhum sentimento encontrado")
-    
-    except SQLAlchemyError:
-        raise Exception("Erro ao buscar os sentimentos")
+    perfil = await _perfil(scorecards.TIPO_CLIENTE, id, db)
+    return User(
+        cliente=perfil["nome"],
+        sentimento=perfil["sentimento"],
+        termo=perfil["sentimento"],
+        score=perfil["score"],
+    )
+
+async def get_tecnicos(db: AsyncSession, after: int | None = None, limit: int | None = None):
+    resultado = await db.execute(paginar(select(models.Agent), models.Agent.agent_id, after, limit))
+    return resultado.scalars().all()
+
+def stream_tecnicos(after: int | None = None):
+    return stream_json(paginar(select(models.Agent), models.Agent.agent_id, after, None))
+
+async def get_clientes(db: AsyncSession, after: int | None = None, limit: int | None = None):
+    resultado = await db.execute(paginar(select(models.User), models.User.user_id, after, limit))
+    return resultado.scalars().all()
+
+def stream_clientes(after: int | None = None):
+    return stream_json(paginar(select(models.User), models.User.user_id, after, None))
+
+def _query_by_score(min_score: float, max_score: float):
+    return select(models.AnaliseSentimento).where(
+        models.AnaliseSentimento.score >= min_score,
+        models.AnaliseSentimento.score <= max_score
+    )
 
-    return User(**cliente._asdict())
+async def get_sentimentos_by_score(min_score: float, max_score: float, db: AsyncSession, after: int | None = None, limit: int | None = None):
+    resultado = await db.execute(paginar(_query_by_score(min_score, max_score), models.AnaliseSentimento.analise_id, after, limit))
+    return resultado.scalars().all()
 
-def get_tecnicos(db: Session):
-    return db.query(models.Agent).all()
+def stream_sentimentos_by_score(min_score: float, max_score: float, after: int | None = None):
+    return stream_json(paginar(_query_by_score(min_score, max_score), models.AnaliseSentimento.analise_id, after, None))
 
-def get_clientes(db: Session):
-    return db.query(models.User).all()
+def _query_by_data(start, end):
+    return select(*COLUNAS_ANALISE).where(
+        models.AnaliseSentimento.data_analise >= start,
+        models.AnaliseSentimento.data_analise <= end
+    )
 
-def get_sentimentos_by_score(min_score: float, max_score: float, db: Session):
-    return db.query(models.AnaliseSentimento).filter(
-        models.AnaliseSentimento.score >= min_score,
-        models.AnaliseSentimento.score <= max_score
-    ).all()
+def _instante(valor) -> datetime:
+    # As datas dos filtros valem como meia-noite, como na comparação feita pelo banco
+    return valor if isinstance(valor, datetime) else datetime.combine(valor, time())
 
-def get_sentimentos_by_data(start: str, end: str, db: Session):
-    start_date = start
-    end_date = end
-    return db.query(models.AnaliseSentimento).filter(
-        models.AnaliseSentimento.data_analise >= start_date,
-        models.AnaliseSentimento.data_analise <= end_date
-    ).all()
+async def get_sentimentos_by_data(start: date, end: date, db: AsyncSession, after: int | None = None, limit: int | None = None):
+    """
+    Recupera as análises do período, somando a tabela e o arquivo frio.
+
+    As análises já movidas para o arquivo (app.services.arquivo) são lidas
+    só das partições dos meses do período e intercaladas pelo analise_id,
+    então a paginação por cursor atravessa os dois sem diferença.
+
+    Returns:
+        list[dict]: As colunas de cada análise, em ordem de analise_id.
+    """
+    resultado = await db.execute(paginar(_query_by_data(start, end), models.AnaliseSentimento.analise_id, after, limit))
+    recentes = serializacao.linhas(resultado)
+    arquivadas = await run_in_threadpool(arquivo.ler_analises, _instante(start), _instante(end), after, limit)
+    if not arquivadas:
+        return recentes
+    return list(heapq.merge(arquivadas, recentes, key=lambda linha: linha["analise_id"]))[:limit]
+
+def stream_sentimentos_by_data(start: date, end: date, after: int | None = None):
+    """
+    Gera o JSON das análises do período com memória constante: primeiro as arquivadas, mês a mês, depois as da tabela.
+    """
+    return stream_json(
+        paginar(_query_by_data(start, end), models.AnaliseSentimento.analise_id, after, None),
+        lambda row: row._asdict(),
+        escalar=False,
+        iniciais=arquivo.iterar_analises(_instante(start), _instante(end), after)
+    )
 
 # Sentimento negativo com o menor score
-def get_sentimento_mais_negativo(db: Session):
-    resultado = db.query(models.AnaliseSentimento).filter(
+def _query_mais_negativo():
+    return select(models.AnaliseSentimento).where(
         func.lower(models.AnaliseSentimento.sentimento) == "negativo"
-    ).order_by(models.AnaliseSentimento.score.asc()).first()
+    ).order_by(models.AnaliseSentimento.score.asc()).limit(1)
+
+async def get_sentimento_mais_negativo(db: AsyncSession):
+    resultado = (await db.execute(_query_mais_negativo())).scalars().first()
 
     if not resultado:
         return None
@@ -230,28 +440,16 @@ def get_sentimento_mais_negativo(db: Session):
     }
 
 
-def get_quantidade_sentimentos(db: Session):
+async def get_quantidade_sentimentos(db: AsyncSession):
     """
-    Conta a quantidade de cada sentimento no banco de dados.
+    Conta a quantidade de análises no banco de dados, a partir dos rollups.
     """
-    # Agrupar os sentimentos e contar a quantidade de cada um
-    result = db.query(AnaliseSentimento.sentimento, func.count(AnaliseSentimento.sentimento).label('quantidade'))\
-               .group_by(AnaliseSentimento.sentimento)\
-               .all()
-    
-    return db.query(models.AnaliseSentimento).count()
-
-def get_sentimento_mais_frequente(db):
-    resultado = db.query(
-        models.AnaliseSentimento.sentimento,
-        func.count(models.AnaliseSentimento.sentimento).label("quantidade")
-    ).group_by(
-        models.AnaliseSentimento.sentimento
-    ).order_by(
-        func.count(models.AnaliseSentimento.sentimento).desc()
-    ).first()
+    return sum(quantidade for _, quantidade in await rollups.contagens(db))
+
+async def get_sentimento_mais_frequente(db):
+    resultado = await rollups.contagens(db)
 
     if resultado:
-        return {"sentimento_predominante": resultado[0], "quantidade": resultado[1]}
+        return {"sentimento_predominante": resultado[0][0], "quantidade": resultado[0][1]}
     else:
         return {"message": "Não há sentimentos registrados ainda."}
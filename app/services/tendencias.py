@@ -0,0 +1,166 @@
+import datetime
+from collections import defaultdict
+from os import getenv
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from . import arquivo
+from .rollups import ESCOPO_DIA
+
+load_dotenv()
+
+INTERVALOS = ("hora", "dia", "semana")
+AGRUPAMENTOS = ("agente", "cliente")
+FONTES = ("auto", "analises", "rollup")
+
+# A partir de quantos dias, sem agrupamento, a fonte "auto" usa os rollups diários
+TENDENCIA_DIAS_ROLLUP = int(getenv("TENDENCIA_DIAS_ROLLUP", "31"))
+# Quantidade máxima de buckets por consulta (ex.: 5000 horas ~ 7 meses)
+TENDENCIA_MAX_BUCKETS = int(getenv("TENDENCIA_MAX_BUCKETS", "5000"))
+
+_DURACAO = {
+    "hora": datetime.timedelta(hours=1),
+    "dia": datetime.timedelta(days=1),
+    "semana": datetime.timedelta(weeks=1),
+}
+
+def _bucket(coluna, intervalo: str, dialeto: str):
+    """
+    Expressão SQL do início do bucket de `coluna` (semanas começam na segunda-feira).
+    """
+    if dialeto == "postgresql":
+        unidade = {"hora": "hour", "dia": "day", "semana": "week"}[intervalo]
+        return func.date_trunc(unidade, coluna)
+    if intervalo == "hora":
+        return func.strftime("%Y-%m-%d %H:00:00", coluna)
+    if intervalo == "dia":
+        return func.date(coluna)
+    return func.date(coluna, "weekday 0", "-6 days")
+
+def _inicio_semana(dia: datetime.date) -> datetime.date:
+    return dia - datetime.timedelta(days=dia.weekday())
+
+def _como_datetime(valor) -> datetime.datetime:
+    if isinstance(valor, datetime.datetime):
+        return valor
+    if isinstance(valor, datetime.date):
+        return datetime.datetime.combine(valor, datetime.time())
+    return datetime.datetime.fromisoformat(valor)
+
+def validar(start: datetime.date, end: datetime.date, intervalo: str, agrupar: str | None, fonte: str):
+    """
+    Raises:
+        ValueError: Se os parâmetros forem inválidos ou o período gerar buckets demais.
+    """
+    if intervalo not in INTERVALOS:
+        raise ValueError(f"intervalo deve ser um de {', '.join(INTERVALOS)}")
+    if agrupar is not None and agrupar not in AGRUPAMENTOS:
+        raise ValueError(f"agrupar deve ser um de {', '.join(AGRUPAMENTOS)}")
+    if fonte not in FONTES:
+        raise ValueError(f"fonte deve ser uma de {', '.join(FONTES)}")
+    if end < start:
+        raise ValueError("end deve ser igual ou posterior a start")
+    if fonte == "rollup" and (intervalo == "hora" or agrupar is not None):
+        raise ValueError("Os rollups diários não atendem intervalo por hora nem agrupamento")
+    if (end - start + datetime.timedelta(days=1)) / _DURACAO[intervalo] > TENDENCIA_MAX_BUCKETS:
+        raise ValueError(f"O período gera mais de {TENDENCIA_MAX_BUCKETS} buckets; use um intervalo maior")
+
+def _montar(linhas, intervalo: str, agrupar: str | None, fonte: str) -> dict:
+    """
+    Monta a resposta a partir de linhas (inicio, grupo, sentimento, quantidade, soma_score, com_score).
+    """
+    buckets = {}
+    for inicio, grupo, sentimento, quantidade, soma_score, com_score in linhas:
+        chave = (_como_datetime(inicio), grupo)
+        bucket = buckets.get(chave)
+        if bucket is None:
+            bucket = buckets[chave] = {"total": 0, "soma_score": 0.0, "com_score": 0, "sentimentos": defaultdict(int)}
+        bucket["total"] += quantidade
+        bucket["soma_score"] += float(soma_score or 0)
+        bucket["com_score"] += com_score
+        bucket["sentimentos"][sentimento] += quantidade
+
+    campo_grupo = {"agente": "agent_id", "cliente": "user_id"}.get(agrupar)
+    resultado = []
+    for (inicio, grupo), bucket in sorted(buckets.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+        item = {"inicio": inicio.isoformat()}
+        if campo_grupo:
+            item[campo_grupo] = grupo
+        item["total"] = bucket["total"]
+        item["score_medio"] = round(bucket["soma_score"] / bucket["com_score"], 4) if bucket["com_score"] else None
+        item["sentimentos"] = dict(bucket["sentimentos"])
+        resultado.append(item)
+
+    return {"intervalo": intervalo, "agrupar": agrupar, "fonte": fonte, "buckets": resultado}
+
+async def _das_analises(db: AsyncSession, inicio: datetime.datetime, fim: datetime.datetime, intervalo: str, agrupar: str | None):
+    analise = models.AnaliseSentimento
+    bucket = _bucket(analise.data_analise, intervalo, db.get_bind().dialect.name)
+    grupo = {"agente": models.Acao.agent_id, "cliente": models.Acao.user_id}.get(agrupar)
+
+    consulta = select(
+        bucket,
+        grupo if grupo is not None else literal(None),
+        analise.sentimento,
+        func.count(),
+        func.sum(analise.score),
+        func.count(analise.score),
+    ).where(analise.data_analise >= inicio, analise.data_analise < fim)
+
+    if grupo is not None:
+        consulta = consulta.join(models.Acao, models.Acao.acao_id == analise.acao_id).group_by(bucket, grupo, analise.sentimento)
+    else:
+        consulta = consulta.group_by(bucket, analise.sentimento)
+    linhas = (await db.execute(consulta)).all()
+
+    # Análises já arquivadas entram pelos arquivos dos meses do período; _montar soma os buckets repetidos
+    return linhas + await run_in_threadpool(arquivo.agregar, inicio, fim, intervalo, agrupar)
+
+async def _dos_rollups(db: AsyncSession, start: datetime.date, end: datetime.date, intervalo: str):
+    rollup = models.SentimentoRollup
+    resultado = await db.execute(
+        select(rollup.chave, rollup.sentimento, rollup.quantidade, rollup.soma_score, rollup.com_score)
+        .where(rollup.escopo == ESCOPO_DIA, rollup.chave >= start.isoformat(), rollup.chave <= end.isoformat())
+    )
+    linhas = []
+    for chave, sentimento, quantidade, soma_score, com_score in resultado:
+        dia = datetime.date.fromisoformat(chave)
+        inicio = _inicio_semana(dia) if intervalo == "semana" else dia
+        linhas.append((inicio, None, sentimento, quantidade, soma_score, com_score))
+    return linhas
+
+async def calcular(
+    db: AsyncSession,
+    start: datetime.date,
+    end: datetime.date,
+    intervalo: str = "dia",
+    agrupar: str | None = None,
+    fonte: str = "auto",
+) -> dict:
+    """
+    Agrega as análises de `start` a `end` (dias inclusivos) em buckets de tempo.
+
+    Cada bucket traz o total de análises, a quantidade por sentimento e o
+    score médio. Por hora ou com agrupamento por agente/cliente a agregação
+    é feita sobre cs_analise_sentimento e o arquivo frio; por dia ou semana, em períodos longos
+    (fonte "auto"), os rollups diários já mantidos em cs_sentimento_rollup
+    respondem sem ler as análises.
+
+    Raises:
+        ValueError: Se os parâmetros forem inválidos.
+    """
+    validar(start, end, intervalo, agrupar, fonte)
+
+    if fonte == "auto":
+        longo = (end - start).days + 1 >= TENDENCIA_DIAS_ROLLUP
+        fonte = "rollup" if longo and intervalo != "hora" and agrupar is None else "analises"
+
+    if fonte == "rollup":
+        linhas = await _dos_rollups(db, start, end, intervalo)
+    else:
+        inicio = datetime.datetime.combine(start, datetime.time())
+        fim = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time())
+        linhas = await _das_analises(db, inicio, fim, intervalo, agrupar)
+    return _montar(linhas, intervalo, agrupar, fonte)
@@ -0,0 +1,47 @@
+"""
+Compara dois resultados de benchmarks.executar e aponta regressões de latência.
+
+    python -m benchmarks.comparar benchmarks/resultados/abc1234.json benchmarks/resultados/def5678.json
+
+Sai com código 1 se o p95 de algum endpoint piorar mais que --tolerancia.
+"""
+import argparse
+import json
+import sys
+
+def comparar(base: dict, atual: dict, tolerancia: float) -> list[str]:
+    regressoes = []
+    print(f"{'endpoint':<36} {'p95 base':>10} {'p95 atual':>10} {'variação':>9} {'req/s base':>11} {'req/s atual':>11}")
+    for nome, resultado in atual["resultados"].items():
+        anterior = base["resultados"].get(nome)
+        if anterior is None:
+            print(f"{nome:<36} {'-':>10} {resultado['p95_ms']:>10.2f}")
+            continue
+        variacao = (resultado["p95_ms"] - anterior["p95_ms"]) / anterior["p95_ms"] if anterior["p95_ms"] else 0.0
+        print(
+            f"{nome:<36} {anterior['p95_ms']:>10.2f} {resultado['p95_ms']:>10.2f} {variacao:>+8.1%} "
+            f"{anterior['vazao_rps']:>11.1f} {resultado['vazao_rps']:>11.1f}"
+        )
+        if variacao > tolerancia:
+            regressoes.append(nome)
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark.")
+    parser.add_argument("base")
+    parser.add_argument("atual")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Aumento máximo aceito no p95 (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as arquivo:
+        base = json.load(arquivo)
+    with open(args.atual) as arquivo:
+        atual = json.load(arquivo)
+
+    if base["configuracao"] != atual["configuracao"]:
+        print("Aviso: as execuções usaram configurações diferentes")
+    regressoes = comparar(base, atual, args.tolerancia)
+    if regressoes:
+        print(f"Regressão de p95 acima de {args.tolerancia:.0%} em: {', '.join(regressoes)}")
+        sys.exit(1)
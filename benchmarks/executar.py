@@ -0,0 +1,228 @@
+"""
+Mede vazão e latência (p50/p95/p99) de cada endpoint com concorrência configurável.
+
+Sem --url, a aplicação roda no próprio processo (httpx.ASGITransport) contra
+o banco da DATABASE_URL, com o BrokerEmMemoria no lugar do RabbitMQ. O
+resultado é gravado em JSON, junto com o commit, para comparar execuções
+com `python -m benchmarks.comparar`.
+
+    python -m benchmarks.executar --concorrencia 32 --requisicoes 2000
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import httpx
+
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+class Endpoint:
+    """
+    Um endpoint medido e a função que gera os parâmetros de cada requisição.
+
+    `grava` marca os endpoints que alteram o banco; eles só rodam com --incluir-gravacao.
+    """
+    def __init__(self, nome: str, metodo: str, requisicao, grava: bool = False):
+        self.nome = nome
+        self.metodo = metodo
+        self.requisicao = requisicao
+        self.grava = grava
+
+
+def endpoints(aleatorio: random.Random, acoes: int, agentes: int, usuarios: int) -> list[Endpoint]:
+    def acao():
+        acao_id = aleatorio.randint(1, acoes)
+        return {
+            "acao_id": acao_id,
+            "event_id": 1,
+            "descricao": "Atendimento rápido, problema resolvido.",
+            "agent_id": aleatorio.randint(1, agentes),
+            "user_id": aleatorio.randint(1, usuarios),
+            "data_acao": None,
+        }
+
+    def periodo():
+        inicio = datetime.date(2024, 1, 1) + datetime.timedelta(days=aleatorio.randrange(360))
+        return {"start": inicio.isoformat(), "end": (inicio + datetime.timedelta(days=1)).isoformat(), "limit": 100}
+
+    def faixa_score():
+        minimo = round(aleatorio.random() * 0.9, 2)
+        return {"min": minimo, "max": minimo + 0.01, "limit": 100}
+
+    return [
+        Endpoint("POST /sentimento/create", "POST", lambda: ("/sentimento/create", {"json": acao()})),
+        Endpoint("POST /sentimento/create/lote", "POST", lambda: ("/sentimento/create/lote", {"json": [acao() for _ in range(100)]})),
+        Endpoint("POST /sentimento/recebido", "POST", lambda: ("/sentimento/recebido", {"json": {
+            "acao_id": aleatorio.randint(1, acoes),
+            "texto": "ok, obrigado",
+            "resultado": {"sentimento": "positivo", "score": 0.9, "modelo": "benchmark"},
+        }}), grava=True),
+        Endpoint("GET /sentimento/all", "GET", lambda: ("/sentimento/all", {"params": {"after": aleatorio.randint(0, acoes), "limit": 100}})),
+        Endpoint("GET /sentimento/recorrente", "GET", lambda: ("/sentimento/recorrente", {})),
+        Endpoint("GET /sentimento/tecnico/{id}", "GET", lambda: (f"/sentimento/tecnico/{aleatorio.randint(1, agentes)}", {})),
+        Endpoint("GET /atendimento", "GET", lambda: ("/atendimento", {"params": {"after": aleatorio.randint(0, acoes), "limit": 100}})),
+        Endpoint("GET /tecnico/{id}", "GET", lambda: (f"/tecnico/{aleatorio.randint(1, agentes)}", {})),
+        Endpoint("GET /cliente/{id}", "GET", lambda: (f"/cliente/{aleatorio.randint(1, usuarios)}", {})),
+        Endpoint("GET /scorecard/agente", "GET", lambda: ("/scorecard/agente", {"params": {"ids": aleatorio.sample(range(1, agentes + 1), min(agentes, 50))}})),
+        Endpoint("GET /scorecard/agente/ranking", "GET", lambda: ("/scorecard/agente/ranking", {"params": {"ordem": "score_medio", "limit": agentes}})),
+        Endpoint("GET /tecnicos-lista", "GET", lambda: ("/tecnicos-lista", {"params": {"limit": 100}})),
+        Endpoint("GET /clientes-lista", "GET", lambda: ("/clientes-lista", {"params": {"after": aleatorio.randint(0, usuarios), "limit": 100}})),
+        Endpoint("GET /sentimento/by-score", "GET", lambda: ("/sentimento/by-score", {"params": faixa_score()})),
+        Endpoint("GET /sentimento/by-data", "GET", lambda: ("/sentimento/by-data", {"params": periodo()})),
+        Endpoint("GET /sentimento/mais-negativo", "GET", lambda: ("/sentimento/mais-negativo", {})),
+        Endpoint("GET /sentimento/quantidade", "GET", lambda: ("/sentimento/quantidade", {})),
+        Endpoint("GET /sentimento/mais-frequente", "GET", lambda: ("/sentimento/mais-frequente", {})),
+    ]
+
+def percentil(ordenadas: list[float], p: float) -> float:
+    """
+    Percentil pelo método nearest-rank; `ordenadas` deve estar em ordem crescente.
+    """
+    if not ordenadas:
+        return 0.0
+    indice = max(0, min(len(ordenadas) - 1, round(p / 100 * len(ordenadas) + 0.5) - 1))
+    return ordenadas[indice]
+
+async def medir(cliente: httpx.AsyncClient, endpoint: Endpoint, requisicoes: int, concorrencia: int, aquecimento: int) -> dict:
+    latencias = []
+    status = {}
+    restantes = requisicoes + aquecimento
+
+    async def trabalhador():
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            aquecendo = restantes >= requisicoes
+            caminho, opcoes = endpoint.requisicao()
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.request(endpoint.metodo, caminho, **opcoes)
+                codigo = str(resposta.status_code)
+            except httpx.HTTPError as e:
+                codigo = type(e).__name__
+            if aquecendo:
+                continue
+            latencias.append(time.perf_counter() - inicio)
+            status[codigo] = status.get(codigo, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    erros = sum(quantidade for codigo, quantidade in status.items() if not codigo.startswith(("2", "3")))
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "status": status,
+        # Inclui o aquecimento na duração, que é curta perto da medição
+        "vazao_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "max_ms": round(latencias[-1] * 1000, 3) if latencias else 0.0,
+    }
+
+def commit_atual() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def criar_cliente(url: str | None, sem_cache: bool):
+    """
+    Retorna o cliente HTTP e, no modo em processo, o broker em memória usado pela aplicação.
+    """
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60), None
+
+    # Precisa ser definido antes de importar a aplicação
+    os.environ.setdefault("ADMISSAO_ATIVA", "false")
+    if sem_cache:
+        os.environ["CACHE_TTL_SEGUNDOS"] = "0"
+
+    from main import app
+    from app.producers import producer
+    from app.consumers.broker_memoria import BrokerEmMemoria
+
+    broker = BrokerEmMemoria()
+    producer._publisher = broker
+    transporte = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transporte, base_url="http://benchmark", timeout=60), broker
+
+async def executar(args) -> dict:
+    aleatorio = random.Random(args.semente)
+    selecionados = [
+        endpoint for endpoint in endpoints(aleatorio, args.acoes, args.agentes, args.usuarios)
+        if (not args.endpoints or any(filtro in endpoint.nome for filtro in args.endpoints))
+        and (args.incluir_gravacao or not endpoint.grava)
+    ]
+
+    cliente, broker = criar_cliente(args.url, args.sem_cache)
+    resultados = {}
+    async with cliente:
+        for endpoint in selecionados:
+            resultado = await medir(cliente, endpoint, args.requisicoes, args.concorrencia, args.aquecimento)
+            resultados[endpoint.nome] = resultado
+            print(
+                f"{endpoint.nome:<36} {resultado['vazao_rps']:>9.1f} req/s  "
+                f"p50 {resultado['p50_ms']:>8.2f}ms  p95 {resultado['p95_ms']:>8.2f}ms  "
+                f"p99 {resultado['p99_ms']:>8.2f}ms  erros {resultado['erros']}"
+            )
+
+    if broker is not None:
+        from app.producers.producer import fechar_publisher
+        from app.services.persistencia import fechar_buffer_persistencia
+        fechar_publisher()
+        fechar_buffer_persistencia()
+
+    return {
+        "commit": commit_atual(),
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "url": args.url or "asgi",
+            "banco": None if args.url else os.getenv("DATABASE_URL", "").split("://")[0],
+        },
+        "configuracao": {
+            "concorrencia": args.concorrencia,
+            "requisicoes": args.requisicoes,
+            "aquecimento": args.aquecimento,
+            "semente": args.semente,
+            "sem_cache": args.sem_cache,
+        },
+        "resultados": resultados,
+        # Mensagens publicadas durante a execução (apenas em processo)
+        "mensagens_publicadas": broker.pendentes() if broker is not None else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de vazão e latência dos endpoints.")
+    parser.add_argument("--url", help="URL de uma API em execução; sem ela, a aplicação roda no próprio processo")
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--requisicoes", type=int, default=1000, help="Requisições medidas por endpoint")
+    parser.add_argument("--aquecimento", type=int, default=50, help="Requisições descartadas antes da medição")
+    parser.add_argument("--endpoints", nargs="*", help="Mede apenas os endpoints cujo nome contém um destes textos")
+    parser.add_argument("--incluir-gravacao", action="store_true", help="Inclui endpoints que gravam no banco")
+    parser.add_argument("--sem-cache", action="store_true", help="Desativa o cache de respostas (apenas em processo)")
+    parser.add_argument("--acoes", type=int, default=1_000_000, help="Mesmo valor usado em gerar_dados")
+    parser.add_argument("--agentes", type=int, default=200)
+    parser.add_argument("--usuarios", type=int, default=50_000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="Arquivo JSON do resultado (padrão: benchmarks/resultados/<commit>.json)")
+    args = parser.parse_args()
+
+    relatorio = asyncio.run(executar(args))
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"{relatorio['commit'] or 'sem-commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w") as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f"Resultado gravado em {saida}")
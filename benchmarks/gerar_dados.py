@@ -0,0 +1,132 @@
+"""
+Gera dados sintéticos para os benchmarks.
+
+Preenche cs_agents, cs_user, cs_events, cs_acoes e cs_analise_sentimento no
+banco da DATABASE_URL (SQLite ou PostgreSQL) e reconstrói os rollups. Com a
+mesma semente, os dados gerados são sempre os mesmos.
+
+    alembic upgrade head
+    python -m benchmarks.gerar_dados --acoes 1000000
+"""
+import argparse
+import datetime
+import random
+import time
+from sqlalchemy import insert, text
+from app.database import Base, SessionLocal, engine
+from app import models
+from app.services import rollups, scorecards
+
+LOTE_INSERCAO = 10000
+
+SENTIMENTOS = ["positivo", "neutro", "negativo"]
+PESOS_SENTIMENTOS = [0.45, 0.35, 0.20]
+
+# Respostas prontas se repetem muito nos dados reais
+TEXTOS = [
+    "ok, obrigado",
+    "Bom dia, em que posso ajudar?",
+    "O problema foi resolvido, obrigado pelo atendimento.",
+    "Ainda aguardo retorno sobre o chamado.",
+    "Atendimento péssimo, ninguém resolve o problema.",
+    "Estou insatisfeito com a demora.",
+    "Chamado encerrado pelo técnico.",
+    "Excelente atendimento, muito rápido!",
+]
+
+def _inserir(conexao, tabela, linhas):
+    total = 0
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE_INSERCAO:
+            conexao.execute(insert(tabela), lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        conexao.execute(insert(tabela), lote)
+        total += len(lote)
+    return total
+
+def gerar(acoes: int, agentes: int, usuarios: int, eventos: int, dias: int, semente: int):
+    aleatorio = random.Random(semente)
+    fim = datetime.datetime(2025, 1, 1)
+    inicio = fim - datetime.timedelta(days=dias)
+    segundos = dias * 86400
+
+    def data_aleatoria():
+        return inicio + datetime.timedelta(seconds=aleatorio.randrange(segundos))
+
+    with engine.begin() as conexao:
+        _inserir(conexao, models.Agent.__table__, (
+            {"agent_id": i, "nome": f"Técnico {i}", "email": f"tecnico{i}@example.com", "username": f"tecnico{i}"}
+            for i in range(1, agentes + 1)
+        ))
+        _inserir(conexao, models.User.__table__, (
+            {"user_id": i, "name": f"Cliente {i}", "email": f"cliente{i}@example.com", "username": f"cliente{i}"}
+            for i in range(1, usuarios + 1)
+        ))
+        _inserir(conexao, models.Event.__table__, (
+            {"event_id": i, "descricao": f"Chamado {i}", "data_abertura": data_aleatoria(), "data_baixa": None, "status_id": 1}
+            for i in range(1, eventos + 1)
+        ))
+
+    # Ações e análises em transações separadas por lote, para não manter tudo em uma transação só
+    for primeiro in range(1, acoes + 1, LOTE_INSERCAO):
+        ids = range(primeiro, min(primeiro + LOTE_INSERCAO, acoes + 1))
+        datas = [data_aleatoria() for _ in ids]
+        with engine.begin() as conexao:
+            conexao.execute(insert(models.Acao.__table__), [
+                {
+                    "acao_id": acao_id,
+                    "event_id": aleatorio.randint(1, eventos),
+                    "descricao": aleatorio.choice(TEXTOS),
+                    "agent_id": aleatorio.randint(1, agentes),
+                    "user_id": aleatorio.randint(1, usuarios),
+                    "data_acao": data,
+                }
+                for acao_id, data in zip(ids, datas)
+            ])
+            conexao.execute(insert(models.AnaliseSentimento.__table__), [
+                {
+                    "acao_id": acao_id,
+                    "sentimento": aleatorio.choices(SENTIMENTOS, PESOS_SENTIMENTOS)[0],
+                    "score": round(aleatorio.random(), 2),
+                    "modelo": "sintetico",
+                    "data_analise": data + datetime.timedelta(minutes=aleatorio.randint(1, 120)),
+                }
+                for acao_id, data in zip(ids, datas)
+            ])
+        print(f"{ids[-1]}/{acoes} ações", end="\r", flush=True)
+    print()
+
+    db = SessionLocal()
+    try:
+        rollups.reconstruir(db)
+        scorecards.reconstruir(db)
+        db.commit()
+    finally:
+        db.close()
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexao:
+            conexao.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para os benchmarks.")
+    parser.add_argument("--acoes", type=int, default=1_000_000)
+    parser.add_argument("--agentes", type=int, default=200)
+    parser.add_argument("--usuarios", type=int, default=50_000)
+    parser.add_argument("--eventos", type=int, default=200_000)
+    parser.add_argument("--dias", type=int, default=365, help="Período coberto pelas datas geradas, terminando em 2025-01-01")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--criar-esquema", action="store_true", help="Cria as tabelas sem Alembic (bancos descartáveis)")
+    args = parser.parse_args()
+
+    if args.criar_esquema:
+        Base.metadata.create_all(bind=engine)
+
+    inicio = time.perf_counter()
+    gerar(args.acoes, args.agentes, args.usuarios, args.eventos, args.dias, args.semente)
+    print(f"Dados gerados em {time.perf_counter() - inicio:.1f}s")
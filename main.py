@@ -1,12 +1,40 @@
 # main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from app.routers import sentimento, auth # Importe o roteador de autenticação
-from app.database import Base, engine
+from app.database import async_engine, engine, roteador_leitura
+from app.producers.producer import fechar_publisher
+from app.producers.outbox import fechar_relay_outbox
+from app.producers.admissao import fechar_controle_admissao
+from app.services.persistencia import fechar_buffer_persistencia
+from app.services.saude import prontidao
+from app.services import metricas
 from fastapi.middleware.cors import CORSMiddleware
 
-Base.metadata.create_all(bind=engine)
+# O esquema do banco é criado e atualizado pelas migrações: alembic upgrade head
 
-app = FastAPI()
+def encerrar():
+    # Aguarda as publicações em andamento e fecha as conexões com o RabbitMQ
+    fechar_controle_admissao()
+    fechar_relay_outbox()
+    fechar_publisher()
+    # Grava os resultados que ainda estão no buffer de persistência
+    fechar_buffer_persistencia()
+    engine.dispose()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Abre as conexões com o banco e o RabbitMQ antes da primeira requisição
+    await prontidao.aquecer()
+    yield
+    prontidao.encerrar()
+    await run_in_threadpool(encerrar)
+    await async_engine.dispose()
+    await roteador_leitura.fechar()
+
+app = FastAPI(lifespan=lifespan)
 
 origins=[
     "http://localhost",
@@ -23,9 +51,33 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+# Latência por rota, exposta em /metrics
+app.add_middleware(metricas.MiddlewareMetricas)
 app.include_router(sentimento.router)
 app.include_router(auth.router) # Inclua o roteador de autenticação
 
+@app.get("/health/live", include_in_schema=False)
+def health_live():
+    """
+    Liveness: o processo está respondendo (não verifica dependências).
+    """
+    return {"status": "ok"}
+
+@app.get("/health/ready", include_in_schema=False)
+async def health_ready():
+    """
+    Readiness: aquecimento concluído e banco (e RabbitMQ, fora do modo outbox) disponíveis.
+    """
+    pronto, detalhes = await prontidao.verificar()
+    return JSONResponse(status_code=200 if pronto else 503, content=detalhes)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Métricas do processo no formato de texto do Prometheus.
+    """
+    return Response(content=metricas.registro.gerar(), media_type=metricas.CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the FastAPI service 🚀"}
@@ -0,0 +1,103 @@
+"""esquema inicial
+
+Tabelas existentes antes do uso de migrações. Bancos criados com
+Base.metadata.create_all devem ser marcados com `alembic stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cs_user',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=150), nullable=False),
+        sa.Column('email', sa.String(length=70), nullable=True),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index('ix_cs_user_user_id', 'cs_user', ['user_id'])
+
+    op.create_table(
+        'cs_agents',
+        sa.Column('agent_id', sa.Integer(), nullable=False),
+        sa.Column('nome', sa.String(length=150), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('agent_id'),
+    )
+    op.create_index('ix_cs_agents_agent_id', 'cs_agents', ['agent_id'])
+
+    op.create_table(
+        'cs_events',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('descricao', sa.String(), nullable=False),
+        sa.Column('data_abertura', sa.TIMESTAMP(), nullable=False),
+        sa.Column('data_baixa', sa.TIMESTAMP(), nullable=True),
+        sa.Column('status_id', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('event_id'),
+    )
+    op.create_index('ix_cs_events_event_id', 'cs_events', ['event_id'])
+
+    op.create_table(
+        'cs_acoes',
+        sa.Column('acao_id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('descricao', sa.Text(), nullable=False),
+        sa.Column('agent_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('data_acao', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['agent_id'], ['cs_agents.agent_id']),
+        sa.ForeignKeyConstraint(['event_id'], ['cs_events.event_id']),
+        sa.ForeignKeyConstraint(['user_id'], ['cs_user.user_id']),
+        sa.PrimaryKeyConstraint('acao_id'),
+    )
+    op.create_index('ix_cs_acoes_acao_id', 'cs_acoes', ['acao_id'])
+
+    op.create_table(
+        'cs_analise_sentimento',
+        sa.Column('analise_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('acao_id', sa.Integer(), nullable=False),
+        sa.Column('sentimento', sa.String(length=50), nullable=False),
+        sa.Column('score', sa.DECIMAL(precision=5, scale=2), nullable=True),
+        sa.Column('modelo', sa.String(length=100), nullable=True),
+        sa.Column('data_analise', sa.TIMESTAMP(), nullable=True),
+        sa.ForeignKeyConstraint(['acao_id'], ['cs_acoes.acao_id']),
+        sa.PrimaryKeyConstraint('analise_id'),
+    )
+    op.create_index('ix_cs_analise_sentimento_analise_id', 'cs_analise_sentimento', ['analise_id'])
+
+    op.create_table(
+        'users',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index('ix_users_user_id', 'users', ['user_id'])
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('users')
+    op.drop_table('cs_analise_sentimento')
+    op.drop_table('cs_acoes')
+    op.drop_table('cs_events')
+    op.drop_table('cs_agents')
+    op.drop_table('cs_user')
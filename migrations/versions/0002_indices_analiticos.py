@@ -0,0 +1,47 @@
+"""índices para as consultas analíticas
+
+Índices usados pelos filtros por score, data_analise e lower(sentimento) e
+pelos joins de cs_acoes (agent_id, user_id, event_id) e
+cs_analise_sentimento (acao_id). No PostgreSQL são criados com
+CREATE INDEX CONCURRENTLY, sem bloquear escritas nas tabelas.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = [
+    ('ix_cs_acoes_event_id', 'cs_acoes', ['event_id']),
+    ('ix_cs_acoes_agent_id', 'cs_acoes', ['agent_id']),
+    ('ix_cs_acoes_user_id', 'cs_acoes', ['user_id']),
+    ('ix_cs_analise_sentimento_acao_id', 'cs_analise_sentimento', ['acao_id']),
+    ('ix_cs_analise_sentimento_score', 'cs_analise_sentimento', ['score']),
+    ('ix_cs_analise_sentimento_data_analise', 'cs_analise_sentimento', ['data_analise']),
+    ('ix_cs_analise_sentimento_lower_sentimento_score', 'cs_analise_sentimento', [sa.text('lower(sentimento)'), 'score']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in INDICES:
+            op.create_index(nome, tabela, colunas, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nome, tabela, _ in reversed(INDICES):
+            op.drop_index(nome, table_name=tabela, postgresql_concurrently=True, if_exists=True)
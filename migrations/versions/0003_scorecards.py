@@ -0,0 +1,60 @@
+"""scorecards de técnicos e clientes
+
+Cria cs_scorecard e a preenche a partir das análises já gravadas. Depois
+disso a tabela é mantida pelo BufferPersistencia a cada lote gravado.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREENCHER = """
+INSERT INTO cs_scorecard
+    (tipo, entidade_id, total, positivo, neutro, negativo, soma_score, com_score, score_minimo, ultima_analise)
+SELECT '{tipo}', a.{coluna}, count(*),
+    sum(CASE WHEN lower(s.sentimento) = 'positivo' THEN 1 ELSE 0 END),
+    sum(CASE WHEN lower(s.sentimento) = 'neutro' THEN 1 ELSE 0 END),
+    sum(CASE WHEN lower(s.sentimento) = 'negativo' THEN 1 ELSE 0 END),
+    coalesce(sum(s.score), 0), count(s.score), min(s.score), max(s.data_analise)
+FROM cs_analise_sentimento s
+JOIN cs_acoes a ON a.acao_id = s.acao_id
+WHERE a.{coluna} IS NOT NULL
+GROUP BY a.{coluna}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cs_scorecard',
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('entidade_id', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('positivo', sa.Integer(), nullable=False),
+        sa.Column('neutro', sa.Integer(), nullable=False),
+        sa.Column('negativo', sa.Integer(), nullable=False),
+        sa.Column('soma_score', sa.DECIMAL(precision=14, scale=2), nullable=False),
+        sa.Column('com_score', sa.Integer(), nullable=False),
+        sa.Column('score_minimo', sa.DECIMAL(precision=5, scale=2), nullable=True),
+        sa.Column('ultima_analise', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('tipo', 'entidade_id'),
+    )
+    op.execute(PREENCHER.format(tipo='agente', coluna='agent_id'))
+    op.execute(PREENCHER.format(tipo='cliente', coluna='user_id'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cs_scorecard')
@@ -0,0 +1,41 @@
+"""outbox de mensagens para o RabbitMQ
+
+Tabela usada com RABBITMQ_PUBLISH_MODE=outbox: as requisições gravam as
+ações em cs_outbox e o RelayOutbox as publica em lotes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cs_outbox',
+        sa.Column('outbox_id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('acao_id', sa.Integer(), nullable=False),
+        sa.Column('routing_key', sa.String(length=100), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('criado_em', sa.TIMESTAMP(), nullable=False),
+        sa.PrimaryKeyConstraint('outbox_id'),
+    )
+    op.create_index('ix_cs_outbox_acao_id', 'cs_outbox', ['acao_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cs_outbox_acao_id', table_name='cs_outbox')
+    op.drop_table('cs_outbox')
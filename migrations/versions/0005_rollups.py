@@ -0,0 +1,72 @@
+"""rollups de sentimento
+
+Cria cs_sentimento_rollup e a preenche a partir das análises já gravadas
+(o mesmo cálculo de `python -m app.services.rollups reconstruir`). Depois
+disso a tabela é mantida pelo BufferPersistencia a cada lote gravado.
+
+Bancos em que a tabela já existe (criada por versões anteriores da 0001)
+são mantidos como estão.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREENCHER = [
+    """
+    INSERT INTO cs_sentimento_rollup (escopo, chave, sentimento, quantidade, soma_score)
+    SELECT 'total', '', s.sentimento, count(*), coalesce(sum(s.score), 0)
+    FROM cs_analise_sentimento s
+    GROUP BY s.sentimento
+    """,
+    """
+    INSERT INTO cs_sentimento_rollup (escopo, chave, sentimento, quantidade, soma_score)
+    SELECT 'agente', CAST(a.agent_id AS VARCHAR(50)), s.sentimento, count(*), coalesce(sum(s.score), 0)
+    FROM cs_analise_sentimento s
+    JOIN cs_acoes a ON a.acao_id = s.acao_id
+    WHERE a.agent_id IS NOT NULL
+    GROUP BY a.agent_id, s.sentimento
+    """,
+    """
+    INSERT INTO cs_sentimento_rollup (escopo, chave, sentimento, quantidade, soma_score)
+    SELECT 'dia', CAST(date(s.data_analise) AS VARCHAR(50)), s.sentimento, count(*), coalesce(sum(s.score), 0)
+    FROM cs_analise_sentimento s
+    WHERE s.data_analise IS NOT NULL
+    GROUP BY date(s.data_analise), s.sentimento
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not op.get_context().as_sql and sa.inspect(op.get_bind()).has_table('cs_sentimento_rollup'):
+        return
+
+    op.create_table(
+        'cs_sentimento_rollup',
+        sa.Column('escopo', sa.String(length=20), nullable=False),
+        sa.Column('chave', sa.String(length=50), nullable=False),
+        sa.Column('sentimento', sa.String(length=50), nullable=False),
+        sa.Column('quantidade', sa.Integer(), nullable=False),
+        sa.Column('soma_score', sa.DECIMAL(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('escopo', 'chave', 'sentimento'),
+    )
+    for sql in PREENCHER:
+        op.execute(sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cs_sentimento_rollup')
@@ -0,0 +1,60 @@
+"""com_score nos rollups de sentimento
+
+Adiciona a quantidade de análises com score a cs_sentimento_rollup, para o
+score médio dos rollups excluir as análises sem score (como o AVG da
+tabela). As linhas existentes recebem a quantidade menos as análises sem
+score ainda em cs_analise_sentimento; `python -m app.services.rollups
+reconstruir` recalcula tudo, incluindo o arquivo frio.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREENCHER = """
+UPDATE cs_sentimento_rollup
+SET com_score = quantidade - (
+    SELECT count(*)
+    FROM cs_analise_sentimento s
+    {juncao}
+    WHERE s.score IS NULL AND s.sentimento = cs_sentimento_rollup.sentimento {condicao}
+)
+WHERE escopo = '{escopo}'
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'cs_sentimento_rollup',
+        sa.Column('com_score', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.execute(PREENCHER.format(escopo='total', juncao='', condicao=''))
+    op.execute(PREENCHER.format(
+        escopo='agente',
+        juncao='JOIN cs_acoes a ON a.acao_id = s.acao_id',
+        condicao='AND CAST(a.agent_id AS VARCHAR(50)) = cs_sentimento_rollup.chave',
+    ))
+    op.execute(PREENCHER.format(
+        escopo='dia',
+        juncao='',
+        condicao='AND CAST(date(s.data_analise) AS VARCHAR(50)) = cs_sentimento_rollup.chave',
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cs_sentimento_rollup') as batch_op:
+        batch_op.drop_column('com_score')
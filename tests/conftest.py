@@ -0,0 +1,39 @@
+import datetime
+import os
+import tempfile
+import pytest
+
+# app.database e app.routers.auth leem a configuração na importação
+_diretorio = tempfile.mkdtemp(prefix="sentimentos-testes-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_diretorio, 'primario.db')}")
+os.environ.setdefault("JWT_SECRET_KEY", "segredo-de-teste")
+os.environ.setdefault("ADMISSAO_ATIVA", "false")
+os.environ.setdefault("DATABASE_READ_URLS", "")
+os.environ.setdefault("ARQUIVO_DIRETORIO", os.path.join(_diretorio, "arquivo"))
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """
+    Banco SQLite temporário com o esquema dos modelos e 2 atendentes, 2 clientes
+    e 10 ações (acao_id 1 a 10). Retorna a fábrica de sessões.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import models
+    from app.database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'banco.db'}")
+    Base.metadata.create_all(engine)
+    fabrica = sessionmaker(bind=engine, autoflush=False)
+    with fabrica() as db:
+        db.add_all([models.Agent(agent_id=i, nome=f"Atendente {i}") for i in (1, 2)])
+        db.add_all([models.User(user_id=i, name=f"Cliente {i}") for i in (1, 2)])
+        db.add(models.Event(event_id=1, descricao="Conversa", data_abertura=datetime.datetime(2025, 1, 1), status_id=1))
+        db.add_all([
+            models.Acao(acao_id=i, event_id=1, descricao=f"Ação {i}", agent_id=1 + i % 2, user_id=1 + i % 2)
+            for i in range(1, 11)
+        ])
+        db.commit()
+    yield fabrica
+    engine.dispose()
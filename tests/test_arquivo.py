@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import glob
+import os
+import shutil
+from decimal import Decimal
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app import models
+from app.services import arquivo, rollups, scorecards, services_sentimentos
+
+pytest.importorskip("pyarrow")
+
+# Análises ímpares em janeiro (arquivadas com o corte em 1º de fevereiro), pares em março
+CORTE = datetime.datetime(2025, 2, 1)
+
+
+@pytest.fixture
+def analises(banco):
+    with banco() as db:
+        db.add_all([
+            models.AnaliseSentimento(
+                analise_id=i,
+                acao_id=i,
+                sentimento="positivo" if i % 3 else "negativo",
+                score=None if i == 5 else Decimal(f"0.{i}0"),
+                modelo="teste",
+                data_analise=datetime.datetime(2025, 1 if i % 2 else 3, i, 12),
+            )
+            for i in range(1, 11)
+        ])
+        db.commit()
+    return banco
+
+@pytest.fixture
+def diretorio():
+    # O diretório padrão (ARQUIVO_DIRETORIO do conftest), lido pelos serviços
+    yield arquivo.ARQUIVO_DIRETORIO
+    shutil.rmtree(arquivo.ARQUIVO_DIRETORIO, ignore_errors=True)
+
+def _na_tabela(banco) -> list[int]:
+    with banco() as db:
+        return sorted(db.scalars(select(models.AnaliseSentimento.analise_id)))
+
+def _arquivadas(diretorio) -> list[int]:
+    linhas = arquivo.ler_analises(datetime.datetime(2025, 1, 1), datetime.datetime(2025, 12, 31), diretorio=diretorio)
+    return [linha["analise_id"] for linha in linhas]
+
+def _arquivar(banco, diretorio, **parametros) -> int:
+    with banco() as db:
+        return arquivo.arquivar(db, CORTE, diretorio=diretorio, **parametros)
+
+
+def test_arquivar_e_ler_de_volta(analises, tmp_path):
+    with analises() as db:
+        originais = [dict(linha) for linha in db.execute(
+            select(*services_sentimentos.COLUNAS_ANALISE).where(models.AnaliseSentimento.data_analise < CORTE)
+        ).mappings()]
+
+    assert _arquivar(analises, tmp_path, tamanho_lote=2) == 5
+    assert _na_tabela(analises) == [2, 4, 6, 8, 10]
+    assert arquivo.ler_analises(datetime.datetime(2025, 1, 1), datetime.datetime(2025, 1, 31), diretorio=tmp_path) == originais
+    # Nada mais a arquivar
+    assert _arquivar(analises, tmp_path) == 0
+
+def test_commit_com_falha_nao_publica_o_arquivo(analises, tmp_path, monkeypatch):
+    def falhar(self):
+        raise RuntimeError("commit falhou")
+
+    with analises() as db:
+        monkeypatch.setattr(type(db), "commit", falhar)
+        with pytest.raises(RuntimeError):
+            arquivo.arquivar(db, CORTE, diretorio=tmp_path)
+    monkeypatch.undo()
+
+    assert _na_tabela(analises) == list(range(1, 11))
+    assert glob.glob(os.path.join(tmp_path, "**", "parte-*"), recursive=True) == []
+    assert _arquivar(analises, tmp_path) == 5
+    assert _arquivadas(tmp_path) == [1, 3, 5, 7, 9]
+
+def test_temporarios_de_execucao_interrompida(analises, tmp_path, monkeypatch):
+    # Interrompida depois do commit e antes de publicar o arquivo
+    monkeypatch.setattr(arquivo, "_publicar", lambda temporario: None)
+    assert _arquivar(analises, tmp_path) == 5
+    monkeypatch.undo()
+    assert _arquivadas(tmp_path) == []
+
+    # Temporário de um lote cujo commit não aconteceu: as análises continuam na tabela
+    with analises() as db:
+        linhas = [dict(linha) for linha in db.execute(
+            select(*services_sentimentos.COLUNAS_ANALISE, models.Acao.agent_id, models.Acao.user_id)
+            .join(models.Acao).where(models.AnaliseSentimento.analise_id == 2)
+        ).mappings()]
+    descartado = arquivo._gravar_parte(linhas, tmp_path)
+
+    assert _arquivar(analises, tmp_path) == 0
+    assert _arquivadas(tmp_path) == [1, 3, 5, 7, 9]
+    assert not os.path.exists(descartado)
+    assert _na_tabela(analises) == [2, 4, 6, 8, 10]
+
+def test_leitura_por_data_intercala_tabela_e_arquivo(analises, diretorio):
+    _arquivar(analises, diretorio)
+
+    async def ler(**parametros):
+        engine = create_async_engine(str(analises.kw["bind"].url).replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+                return await services_sentimentos.get_sentimentos_by_data(
+                    datetime.date(2025, 1, 1), datetime.date(2025, 3, 31), db, **parametros
+                )
+        finally:
+            await engine.dispose()
+
+    assert [linha["analise_id"] for linha in asyncio.run(ler())] == list(range(1, 11))
+    assert [linha["analise_id"] for linha in asyncio.run(ler(after=3, limit=4))] == [4, 5, 6, 7]
+
+def test_reconstruir_conta_o_historico_arquivado(analises, diretorio):
+    def tabelas() -> tuple:
+        with analises() as db:
+            rollups.reconstruir(db)
+            scorecards.reconstruir(db)
+            db.commit()
+            rollup = sorted(
+                (r.escopo, r.chave, r.sentimento, r.quantidade, round(float(r.soma_score), 2), r.com_score)
+                for r in db.scalars(select(models.SentimentoRollup))
+            )
+            scorecard = sorted(
+                (s.tipo, s.entidade_id, s.total, s.positivo, s.negativo, round(float(s.soma_score), 2), s.com_score, s.ultima_analise)
+                for s in db.scalars(select(models.Scorecard))
+            )
+        return rollup, scorecard
+
+    antes = tabelas()
+    _arquivar(analises, diretorio)
+    assert tabelas() == antes
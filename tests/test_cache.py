@@ -0,0 +1,93 @@
+import asyncio
+from starlette.requests import Request
+from app.services import cache
+from app.services.cache import CacheRespostas, MemoryCacheBackend
+
+
+def _request(caminho: str = "/sentimento/all", headers: dict | None = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": caminho,
+        "query_string": b"",
+        "headers": [(nome.lower().encode(), valor.encode()) for nome, valor in (headers or {}).items()],
+    })
+
+class Produtor:
+    def __init__(self):
+        self.chamadas = 0
+
+    async def __call__(self):
+        self.chamadas += 1
+        return {"versao": self.chamadas}
+
+
+def test_repete_a_resposta_e_responde_304_ao_etag():
+    respostas = CacheRespostas(MemoryCacheBackend())
+    produzir = Produtor()
+
+    async def requisicoes():
+        primeira = await respostas.responder(_request(), produzir)
+        segunda = await respostas.responder(_request(), produzir)
+        condicional = await respostas.responder(_request(headers={"If-None-Match": primeira.headers["etag"]}), produzir)
+        return primeira, segunda, condicional
+
+    primeira, segunda, condicional = asyncio.run(requisicoes())
+    assert produzir.chamadas == 1
+    assert primeira.body == segunda.body
+    assert condicional.status_code == 304
+
+def test_invalidacao_descarta_as_respostas():
+    respostas = CacheRespostas(MemoryCacheBackend())
+    produzir = Produtor()
+
+    async def requisicoes():
+        await respostas.responder(_request(), produzir)
+        respostas.invalidar()
+        return await respostas.responder(_request(), produzir)
+
+    assert asyncio.run(requisicoes()).body == b'{"versao":2}'
+
+def test_com_replicas_o_cache_acerta_durante_gravacoes(monkeypatch):
+    monkeypatch.setattr(cache, "DATABASE_READ_URLS", ["sqlite:///replica.db"])
+    # Réplicas com 50 ms de atraso medido e uma gravação a cada 100 ms
+    respostas = CacheRespostas(MemoryCacheBackend(), atraso_replicas=lambda: 0.05)
+    produzir = Produtor()
+
+    async def requisicoes():
+        acertos = 0
+        for _ in range(5):
+            respostas.invalidar()
+            await asyncio.sleep(0.06)
+            chamadas = produzir.chamadas
+            for _ in range(3):
+                await respostas.responder(_request(), produzir)
+            acertos += 3 - (produzir.chamadas - chamadas)
+            await asyncio.sleep(0.04)
+        return acertos
+
+    # Depois de cada gravação, só a primeira leitura vai ao banco
+    assert asyncio.run(requisicoes()) == 10
+
+def test_leitura_da_replica_dentro_do_atraso_nao_e_guardada(monkeypatch):
+    monkeypatch.setattr(cache, "DATABASE_READ_URLS", ["sqlite:///replica.db"])
+    respostas = CacheRespostas(MemoryCacheBackend(), atraso_replicas=lambda: 30.0)
+    produzir = Produtor()
+
+    async def requisicoes():
+        respostas.invalidar()
+        await respostas.responder(_request(), produzir)
+        await respostas.responder(_request(), produzir)
+
+    asyncio.run(requisicoes())
+    assert produzir.chamadas == 2
+
+def test_leitura_no_primario_nao_usa_o_cache():
+    respostas = CacheRespostas(MemoryCacheBackend())
+    produzir = Produtor()
+
+    async def requisicoes():
+        await respostas.responder(_request(), produzir)
+        return await respostas.responder(_request(headers={"X-Leitura": "primario"}), produzir)
+
+    assert asyncio.run(requisicoes()).body == b'{"versao":2}'
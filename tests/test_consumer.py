@@ -0,0 +1,135 @@
+import json
+import threading
+import httpx
+import pytest
+from app.consumers.broker_memoria import BrokerEmMemoria
+from app.consumers.consumer import ConsumidorSentimentos, PersistenciaCallback
+from app.services.inferencia import ClienteInferencia
+
+
+class ServidorInferenciaFalso:
+    """
+    Serviço de inferência falso para o httpx.MockTransport: registra cada lote
+    recebido e classifica como positivo os textos com "bom".
+    """
+    def __init__(self, falhar_com: str | None = None):
+        self.lotes = []
+        self.__falhar_com = falhar_com
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/predict/batch"
+        textos = json.loads(request.content)["textos"]
+        self.lotes.append(textos)
+        if self.__falhar_com is not None and any(self.__falhar_com in texto for texto in textos):
+            return httpx.Response(500)
+        return httpx.Response(200, json={
+            "modelo": "falso-v1",
+            "resultados": [
+                {"sentimento": "positivo" if "bom" in texto else "neutro", "score": 0.9} for texto in textos
+            ],
+        })
+
+
+class Persistidos:
+    def __init__(self):
+        self.acoes = []
+        self.resultados = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, acoes: list, resultados: list):
+        with self.__lock:
+            self.acoes.extend(acoes)
+            self.resultados.extend(resultados)
+
+
+def _consumidor(servidor, persistir, tamanho_lote: int = 4):
+    cliente = ClienteInferencia("http://inferencia", transport=httpx.MockTransport(servidor))
+    return ConsumidorSentimentos(cliente, persistir, tamanho_lote=tamanho_lote, espera_max=0.01, concorrencia=2)
+
+def _acao(i: int, texto: str = "atendimento bom") -> dict:
+    return {"acao_id": i, "descricao": f"{texto} {i}"}
+
+
+def test_cliente_inferencia_inclui_o_modelo_em_cada_resultado():
+    cliente = ClienteInferencia("http://inferencia", transport=httpx.MockTransport(ServidorInferenciaFalso()))
+    assert cliente(["bom", "ok"]) == [
+        {"modelo": "falso-v1", "sentimento": "positivo", "score": 0.9},
+        {"modelo": "falso-v1", "sentimento": "neutro", "score": 0.9},
+    ]
+    cliente.close()
+
+def test_cliente_inferencia_rejeita_quantidade_errada_de_resultados():
+    transporte = httpx.MockTransport(lambda request: httpx.Response(200, json={"modelo": "x", "resultados": []}))
+    cliente = ClienteInferencia("http://inferencia", transport=transporte)
+    with pytest.raises(ValueError):
+        cliente(["um texto"])
+    cliente.close()
+
+def test_agrupa_acoes_em_microlotes_e_confirma_as_mensagens():
+    servidor = ServidorInferenciaFalso()
+    persistidos = Persistidos()
+    consumidor = _consumidor(servidor, persistidos)
+    broker = BrokerEmMemoria(prefetch=10)
+
+    # Mensagens do endpoint de lote (listas) e do unitário (uma ação)
+    broker.publicar_lote([[_acao(1), _acao(2), _acao(3)], _acao(4), [_acao(5), _acao(6)]])
+    broker.entregar(consumidor)
+    consumidor.fechar()
+
+    assert broker.confirmadas == 3
+    assert broker.rejeitadas == []
+    assert broker.pendentes() == 0
+    assert sorted(acao["acao_id"] for acao in persistidos.acoes) == [1, 2, 3, 4, 5, 6]
+    assert all(len(lote) <= 4 for lote in servidor.lotes)
+    assert sum(len(lote) for lote in servidor.lotes) == 6
+    assert {resultado["modelo"] for resultado in persistidos.resultados} == {"falso-v1"}
+
+def test_mensagem_sem_acoes_validas_recebe_ack_sem_inferencia():
+    servidor = ServidorInferenciaFalso()
+    consumidor = _consumidor(servidor, Persistidos())
+    broker = BrokerEmMemoria()
+
+    broker.publicar_lote([{"acao_id": 1, "descricao": ""}, []])
+    broker.entregar(consumidor)
+    consumidor.fechar()
+
+    assert broker.confirmadas == 2
+    assert servidor.lotes == []
+
+def test_falha_na_inferencia_devolve_a_mensagem_uma_vez_e_depois_rejeita():
+    servidor = ServidorInferenciaFalso(falhar_com="quebra")
+    persistidos = Persistidos()
+    # Um micro-lote por mensagem, para a falha atingir só a mensagem com o texto problemático
+    consumidor = _consumidor(servidor, persistidos, tamanho_lote=1)
+    broker = BrokerEmMemoria(prefetch=1)
+
+    broker.publicar_lote([_acao(1, "quebra"), _acao(2)])
+    broker.entregar(consumidor)
+    consumidor.fechar()
+
+    assert broker.confirmadas == 1
+    assert [json.loads(body)["acao_id"] for body in broker.rejeitadas] == [1]
+    # Entregue de novo (redelivered) antes de ser rejeitada
+    assert sum(1 for lote in servidor.lotes if "quebra 1" in lote) == 2
+    assert [acao["acao_id"] for acao in persistidos.acoes] == [2]
+
+def test_callback_envia_o_microlote_em_uma_requisicao():
+    recebidos = []
+
+    def api(request: httpx.Request) -> httpx.Response:
+        recebidos.append(json.loads(request.content))
+        return httpx.Response(201, json={"message": "Sentimento recebido"})
+
+    callback = PersistenciaCallback("http://api/sentimento/recebido", transport=httpx.MockTransport(api))
+    consumidor = _consumidor(ServidorInferenciaFalso(), callback, tamanho_lote=3)
+    broker = BrokerEmMemoria(prefetch=10)
+
+    broker.publicar_lote([[_acao(1), _acao(2), _acao(3)]])
+    broker.entregar(consumidor)
+    consumidor.fechar()
+    callback.close()
+
+    assert broker.confirmadas == 1
+    assert len(recebidos) == 1
+    assert [item["acao_id"] for item in recebidos[0]] == [1, 2, 3]
+    assert all(item["resultado"]["modelo"] == "falso-v1" for item in recebidos[0])
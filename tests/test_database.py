@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from sqlalchemy import text
+from app import database
+from app.database import AsyncSessionLocal, RoteadorLeitura
+
+
+def _replica(diretorio, nome: str) -> str:
+    """
+    Cria um banco SQLite com uma tabela que identifica a réplica e retorna a URL.
+    """
+    caminho = os.path.join(diretorio, f"{nome}.db")
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute("CREATE TABLE origem (nome TEXT)")
+        conexao.execute("INSERT INTO origem VALUES (?)", (nome,))
+    return f"sqlite:///{caminho}"
+
+async def _origem(fabrica) -> str:
+    async with fabrica() as db:
+        return (await db.execute(text("SELECT nome FROM origem"))).scalar()
+
+def _executar(roteador: RoteadorLeitura, corrotina):
+    async def executar():
+        try:
+            return await corrotina
+        finally:
+            await roteador.fechar()
+    return asyncio.run(executar())
+
+
+def test_sem_replicas_usa_o_primario():
+    roteador = RoteadorLeitura([])
+    assert _executar(roteador, roteador.sessionmaker()) is AsyncSessionLocal
+
+def test_replicas_saudaveis_em_rodizio(tmp_path):
+    roteador = RoteadorLeitura([_replica(tmp_path, "a"), _replica(tmp_path, "b")])
+
+    async def leituras():
+        return [await _origem(await roteador.sessionmaker()) for _ in range(4)]
+
+    assert _executar(roteador, leituras()) == ["a", "b", "a", "b"]
+    assert set(roteador.estado().values()) == {"ok"}
+
+def test_leitura_forcada_no_primario(tmp_path):
+    roteador = RoteadorLeitura([_replica(tmp_path, "a"), _replica(tmp_path, "b")])
+    assert _executar(roteador, roteador.sessionmaker(forcar_primario=True)) is AsyncSessionLocal
+
+def test_replica_indisponivel_sai_do_rodizio(tmp_path):
+    # Diretório inexistente: o SQLite não consegue abrir o arquivo
+    indisponivel = f"sqlite:///{tmp_path / 'ausente' / 'b.db'}"
+    roteador = RoteadorLeitura([_replica(tmp_path, "a"), indisponivel])
+
+    async def leituras():
+        return [await _origem(await roteador.sessionmaker()) for _ in range(3)]
+
+    assert _executar(roteador, leituras()) == ["a", "a", "a"]
+    assert sorted(roteador.estado().values()) == ["indisponivel", "ok"]
+
+def test_sem_replicas_saudaveis_usa_o_primario(tmp_path):
+    threads = set(threading.enumerate())
+    roteador = RoteadorLeitura([f"sqlite:///{tmp_path / 'ausente' / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"])
+    assert _executar(roteador, roteador.sessionmaker()) is AsyncSessionLocal
+    # Nenhuma thread do driver fica para trás depois da falha ao conectar
+    assert set(threading.enumerate()) <= threads
+    # Um arquivo ausente não é criado pela verificação
+    assert not os.path.exists(tmp_path / "b.db")
+
+def test_replica_volta_ao_rodizio_apos_nova_verificacao(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_REPLICA_VERIFICACAO_S", 0)
+    roteador = RoteadorLeitura([_replica(tmp_path, "a"), f"sqlite:///{tmp_path / 'b' / 'b.db'}"])
+
+    async def recuperar():
+        assert await _origem(await roteador.sessionmaker()) == "a"
+        assert sorted(roteador.estado().values()) == ["indisponivel", "ok"]
+
+        # A réplica volta: a verificação em segundo plano a recoloca no rodízio
+        os.makedirs(tmp_path / "b")
+        _replica(tmp_path / "b", "b")
+        await roteador.sessionmaker()
+        await asyncio.sleep(0.1)
+        return {await _origem(await roteador.sessionmaker()) for _ in range(2)}
+
+    assert _executar(roteador, recuperar()) == {"a", "b"}
+    assert set(roteador.estado().values()) == {"ok"}
+
+def test_atraso_medido_das_replicas(tmp_path):
+    roteador = RoteadorLeitura([_replica(tmp_path, "a")])
+    assert roteador.atraso() == database.DB_REPLICA_MAX_ATRASO_S
+    _executar(roteador, roteador.verificar_todas())
+    # SQLite não tem replicação: o atraso medido é zero
+    assert roteador.atraso() == 0.0
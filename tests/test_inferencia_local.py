@@ -0,0 +1,73 @@
+import pytest
+from app.services.inferencia_local import CLASSES, MAX_LEN, ModeloDeterministico, MotorInferencia, carregar_modelo
+
+
+class ModeloRegistrando(ModeloDeterministico):
+    """
+    ModeloDeterministico que registra o tamanho de cada lote recebido.
+    """
+    def __init__(self):
+        self.lotes = []
+
+    def prever(self, lote):
+        self.lotes.append([len(ids) for ids in lote])
+        return super().prever(lote)
+
+
+@pytest.fixture
+def motor():
+    motor = MotorInferencia(ModeloDeterministico(), workers=2)
+    yield motor
+    motor.close()
+
+
+def test_carregar_modelo_deterministico():
+    assert isinstance(carregar_modelo("deterministico"), ModeloDeterministico)
+
+def test_tokenizar_marca_inicio_fim_e_palavras_do_lexico():
+    modelo = ModeloDeterministico()
+    ids = modelo.tokenizar("Atendimento ÓTIMO, sem problema!")
+    assert ids[0] == 1 and ids[-1] == 2
+    assert ids[2] == 3 and ids[4] == 4
+    assert modelo.tokenizar("Atendimento ÓTIMO, sem problema!") == ids
+
+def test_tokenizar_trunca_em_max_len():
+    assert len(ModeloDeterministico().tokenizar("palavra " * (MAX_LEN * 2))) == MAX_LEN
+
+def test_prever_retorna_probabilidades_por_classe():
+    modelo = ModeloDeterministico()
+    for probabilidades in modelo.prever([modelo.tokenizar("bom"), modelo.tokenizar("ruim demora")]):
+        assert len(probabilidades) == len(CLASSES)
+        assert sum(probabilidades) == pytest.approx(1.0)
+
+@pytest.mark.parametrize("texto, sentimento", [
+    ("Excelente atendimento, obrigado!", "positivo"),
+    ("Péssimo, nunca resolvem o problema", "negativo"),
+    ("Quero saber o horário da loja", "neutro"),
+])
+def test_motor_classifica_pelo_lexico(motor, texto, sentimento):
+    [resultado] = motor([texto])
+    assert resultado["sentimento"] == sentimento
+    assert resultado["modelo"] == ModeloDeterministico.nome
+    assert 0 < resultado["score"] <= 1
+
+def test_motor_preserva_a_ordem_dos_textos(motor):
+    textos = ["ruim " * n if n % 2 else "bom " * n for n in range(1, 40)]
+    resultados = motor(textos)
+    assert [resultado["sentimento"] for resultado in resultados] == [
+        "negativo" if n % 2 else "positivo" for n in range(1, 40)
+    ]
+    assert motor([]) == []
+
+def test_motor_respeita_o_orcamento_de_tokens():
+    modelo = ModeloRegistrando()
+    motor = MotorInferencia(modelo, workers=1, tokens_por_lote=64)
+    textos = ["palavra " * n for n in (1, 30, 2, 3, 25, 4, 5, 60)]
+    motor(textos)
+    motor.close()
+
+    assert sum(len(lote) for lote in modelo.lotes) == len(textos)
+    for lote in modelo.lotes:
+        # Lotes de um texto só podem passar do orçamento; os demais, não
+        assert len(lote) == 1 or len(lote) * max(lote) <= 64
+        assert lote == sorted(lote)
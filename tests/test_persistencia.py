@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import json
+from concurrent.futures import wait
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from app import models
+from app.services.persistencia import BufferPersistencia
+
+
+def _linha(acao_id, sentimento: str | None = "positivo") -> dict:
+    return {
+        "acao_id": acao_id,
+        "sentimento": sentimento,
+        "score": 0.9,
+        "modelo": "teste",
+        "data_analise": datetime.datetime(2025, 1, 2, 10),
+    }
+
+def _gravadas(banco) -> list[int]:
+    with banco() as db:
+        return sorted(db.scalars(select(models.AnaliseSentimento.acao_id)))
+
+
+def test_linha_invalida_falha_so_o_proprio_future(banco):
+    buffer = BufferPersistencia(session_factory=banco, tamanho_lote=100, intervalo=0.2)
+    linhas = [_linha(i) for i in range(1, 11)]
+    # sentimento é NOT NULL
+    linhas[6]["sentimento"] = None
+    futuros = [buffer.adicionar(linha) for linha in linhas]
+    wait(futuros, timeout=10)
+    buffer.fechar()
+
+    assert isinstance(futuros[6].exception(), IntegrityError)
+    assert all(futuro.exception() is None for i, futuro in enumerate(futuros) if i != 6)
+    assert _gravadas(banco) == [1, 2, 3, 4, 5, 6, 8, 9, 10]
+    with banco() as db:
+        total = db.scalar(select(func.sum(models.SentimentoRollup.quantidade)).where(models.SentimentoRollup.escopo == "total"))
+    assert total == 9
+
+def test_lote_valido_e_gravado_em_uma_transacao(banco):
+    buffer = BufferPersistencia(session_factory=banco, tamanho_lote=100, intervalo=0.05)
+    futuros = [buffer.adicionar(_linha(i)) for i in (1, 2, 3)]
+    wait(futuros, timeout=10)
+    buffer.fechar()
+
+    assert [futuro.result() for futuro in futuros] == [None, None, None]
+    assert _gravadas(banco) == [1, 2, 3]
+
+def test_buffer_encerrado_recusa_novas_linhas(banco):
+    buffer = BufferPersistencia(session_factory=banco)
+    buffer.fechar()
+    with pytest.raises(RuntimeError):
+        buffer.adicionar(_linha(1))
+
+def test_erro_do_copy_vira_erro_do_sqlalchemy_e_desfaz_a_transacao():
+    psycopg2 = pytest.importorskip("psycopg2")
+
+    class Conexao:
+        desfeita = False
+
+        def cursor(self):
+            return self
+
+        def copy_expert(self, sql, dados):
+            raise psycopg2.IntegrityError("duplicate key value violates unique constraint")
+
+        def close(self):
+            pass
+
+        def rollback(self):
+            self.desfeita = True
+
+    class Sessao:
+        """
+        Sessão falsa em um PostgreSQL com psycopg2, só com o que o caminho do COPY usa.
+        """
+        conexao = Conexao()
+
+        def execute(self, sql, parametros):
+            # Reserva dos analise_id na sequência
+            ids = list(range(1, parametros["quantidade"] + 1))
+            return type("Resultado", (), {"scalars": lambda self: type("Escalares", (), {"all": lambda self: ids})()})()
+
+        def get_bind(self):
+            dialeto = type("Dialeto", (), {"name": "postgresql", "driver": "psycopg2", "dbapi": psycopg2})
+            return type("Bind", (), {"dialect": dialeto})
+
+        def connection(self):
+            return type("Conexao", (), {"connection": self.conexao})
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    buffer = BufferPersistencia(session_factory=Sessao)
+    try:
+        with pytest.raises(IntegrityError):
+            buffer.gravar([_linha(1)])
+    finally:
+        buffer.fechar()
+    assert Sessao.conexao.desfeita
+
+def test_erro_fora_da_gravacao_nao_derruba_a_thread(banco, monkeypatch):
+    from app.services import persistencia
+
+    class CacheQuebrado:
+        falhas = 1
+
+        def invalidar(self):
+            if self.falhas:
+                self.falhas -= 1
+                raise RuntimeError("falha ao invalidar")
+
+    monkeypatch.setattr(persistencia, "cache_respostas", CacheQuebrado())
+    buffer = BufferPersistencia(session_factory=banco, intervalo=0.01)
+    try:
+        primeiro = buffer.adicionar(_linha(1))
+        assert isinstance(primeiro.exception(timeout=10), RuntimeError)
+        assert buffer.adicionar(_linha(2)).result(timeout=10) is None
+    finally:
+        buffer.fechar()
+
+def test_linhas_gravadas_recebem_o_analise_id(banco):
+    buffer = BufferPersistencia(session_factory=banco)
+    linhas = [_linha(i) for i in (3, 1, 2)]
+    try:
+        buffer.gravar(linhas)
+    finally:
+        buffer.fechar()
+
+    with banco() as db:
+        ids = dict(db.execute(select(models.AnaliseSentimento.acao_id, models.AnaliseSentimento.analise_id)).all())
+    assert [linha["analise_id"] for linha in linhas] == [ids[3], ids[1], ids[2]]
+
+def test_evento_de_notificacao_traz_analise_id_e_acao_id(banco):
+    from app.services.notificacoes import eventos_sse, hub
+
+    async def receber():
+        assinatura = hub.assinar(acao_ids={7})
+        buffer = BufferPersistencia(session_factory=banco, intervalo=0.01)
+        try:
+            await asyncio.wrap_future(buffer.adicionar(_linha(7)))
+            stream = eventos_sse(assinatura)
+            await anext(stream)
+            evento = await asyncio.wait_for(anext(stream), timeout=5)
+            await stream.aclose()
+            return evento
+        finally:
+            buffer.fechar()
+
+    evento = asyncio.run(receber())
+    with banco() as db:
+        analise_id = db.scalar(select(models.AnaliseSentimento.analise_id).where(models.AnaliseSentimento.acao_id == 7))
+    assert evento.startswith(b"id: %d\nevent: analise\n" % analise_id)
+    dados = json.loads(evento.split(b"data: ", 1)[1])
+    assert (dados["analise_id"], dados["acao_id"], dados["agent_id"], dados["user_id"]) == (analise_id, 7, 2, 2)
@@ -0,0 +1,41 @@
+import os
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app import models
+from app.database import Base, engine
+from app.services import plano_consultas
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic.ini")
+
+
+@pytest.fixture
+def db():
+    engine_teste = create_engine("sqlite://")
+    Base.metadata.create_all(engine_teste)
+    with Session(engine_teste) as db:
+        yield db
+    engine_teste.dispose()
+
+
+def test_modelos_cobrem_as_consultas_frequentes(db):
+    assert plano_consultas.verificar(db) == {}
+
+def test_leitura_completa_sem_indice_e_apontada(db):
+    db.execute(text("DROP INDEX ix_cs_analise_sentimento_data_analise"))
+    assert plano_consultas.verificar(db) == {"by-data": [models.AnaliseSentimento.__tablename__]}
+
+def test_migracoes_criam_os_indices_das_consultas_frequentes():
+    # As migrações usam o engine da aplicação (o banco temporário do conftest)
+    config = Config(ALEMBIC_INI)
+
+    # 0001 é o esquema original, sem os índices analíticos
+    command.upgrade(config, "0001")
+    with Session(engine) as db:
+        assert set(plano_consultas.verificar(db)) == set(plano_consultas.consultas_frequentes())
+
+    command.upgrade(config, "head")
+    with Session(engine) as db:
+        assert plano_consultas.verificar(db) == {}
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.services import rollups, tendencias
+from app.services.persistencia import BufferPersistencia
+
+
+def _calcular(banco, **parametros) -> dict:
+    async def calcular():
+        engine = create_async_engine(str(banco.kw["bind"].url).replace("sqlite://", "sqlite+aiosqlite://"))
+        try:
+            async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+                return await tendencias.calcular(db, **parametros)
+        finally:
+            await engine.dispose()
+    return asyncio.run(calcular())
+
+def _gravar(banco):
+    """
+    Grava pelo mesmo caminho do BufferPersistencia, que mantém os rollups, com parte das análises sem score.
+    """
+    linhas = [
+        {
+            "acao_id": i,
+            "sentimento": "positivo" if i % 3 else "negativo",
+            "score": None if i % 4 == 0 else round(0.1 * i, 2),
+            "modelo": "teste",
+            "data_analise": datetime.datetime(2025, 1, 1 + i % 3, 10),
+        }
+        for i in range(1, 11)
+    ]
+    buffer = BufferPersistencia(session_factory=banco)
+    try:
+        buffer.gravar(linhas)
+    finally:
+        buffer.fechar()
+
+def _buckets(resultado: dict) -> list:
+    return resultado["buckets"]
+
+
+def test_rollups_e_analises_dao_o_mesmo_score_medio(banco):
+    _gravar(banco)
+    periodo = {"start": datetime.date(2025, 1, 1), "end": datetime.date(2025, 1, 3)}
+    das_analises = _calcular(banco, fonte="analises", **periodo)
+    dos_rollups = _calcular(banco, fonte="rollup", **periodo)
+
+    assert dos_rollups["fonte"] == "rollup"
+    assert _buckets(dos_rollups) == _buckets(das_analises)
+    # Análises sem score ficam fora da média
+    assert [bucket["score_medio"] for bucket in _buckets(das_analises)] == [0.6, 0.6, 0.35]
+
+def test_reconstruir_mantem_a_quantidade_com_score(banco):
+    _gravar(banco)
+    periodo = {"start": datetime.date(2025, 1, 1), "end": datetime.date(2025, 1, 3), "intervalo": "semana"}
+    antes = _calcular(banco, fonte="rollup", **periodo)
+    with banco() as db:
+        rollups.reconstruir(db)
+        db.commit()
+    assert _calcular(banco, fonte="rollup", **periodo) == antes
+    assert _buckets(antes) == _buckets(_calcular(banco, fonte="analises", **periodo))